@@ -1,9 +1,17 @@
 import streamlit as st
 from src.database import init_database
+from src.instrumentation import timed, start_metrics_server, maybe_dump_metrics
+from src.profiling import profiled
+from src.change_feed import start_change_listener
+from src.health import register_health_checks, start_warm_up
 from src.utils import setup_page_config, setup_directories
 from pages.share_story import share_story_page
 from pages.read_stories import read_stories_page
+from pages.inbox import connections_inbox_page
+from pages.analytics import analytics_page
 
+@timed("app.main")
+@profiled("app.main")
 def main():
     """Main application entry point"""
     setup_page_config()
@@ -80,7 +88,7 @@ def main():
     init_database()
 
     # Create tabs for navigation
-    tab1, tab2 = st.tabs(["✍️ Share a Story", "📖 Read Stories"])
+    tab1, tab2, tab3, tab4 = st.tabs(["✍️ Share a Story", "📖 Read Stories", "📬 Elder Inbox", "📊 Analytics"])
 
     with tab1:
         share_story_page()
@@ -88,5 +96,16 @@ def main():
     with tab2:
         read_stories_page()
 
+    with tab3:
+        connections_inbox_page()
+
+    with tab4:
+        analytics_page()
+
 if __name__ == "__main__":
+    register_health_checks()
+    start_metrics_server()
     main()
+    start_change_listener()  # After main(), which creates the tables it watches
+    start_warm_up()  # Already done when started through serve.py
+    maybe_dump_metrics()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Transcript cold storage job for ElderWise
+
+Moves long and old transcripts into the compressed archive table. Run once
+(e.g. from cron) or keep running with --every SECONDS. --report shows the
+space saved and the read latency of archived against inline transcripts.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database
+from src.cold_storage import archive_stories, train_dictionary, restore_stories, storage_report
+
+def _megabytes(size):
+    return f"{size / 1_000_000:.2f} MB"
+
+def run_once():
+    """Run a single archive pass and print a short summary"""
+    started = time.perf_counter()
+    result = archive_stories()
+    elapsed = time.perf_counter() - started
+    dictionary = f"dictionary {result['dictionary_id']}" if result['dictionary_id'] else "no dictionary"
+    print(
+        f"✅ Archived {result['stories_archived']} transcripts in {elapsed:.2f}s: "
+        f"{_megabytes(result['raw_bytes'])} -> {_megabytes(result['stored_bytes'])} ({dictionary})"
+    )
+
+def print_report(sample):
+    report = storage_report(sample)
+    print("📦 Transcript storage")
+    print(f"   Inline:   {report.inline_stories} stories, {_megabytes(report.inline_bytes)}")
+    print(f"   Archived: {report.archived_stories} stories, {_megabytes(report.raw_bytes)} -> "
+          f"{_megabytes(report.stored_bytes)} ({report.ratio:.1f}x, "
+          f"{_megabytes(report.raw_bytes - report.stored_bytes)} saved)")
+    print(f"   Dictionary: {report.dictionary_id or 'none trained'}")
+    print("⏱️  Batched read latency")
+    print(f"   Inline:   {report.inline_read_ms:.2f} ms for {report.inline_sample} transcripts")
+    print(f"   Archived: {report.archived_read_ms:.2f} ms for {report.archived_sample} transcripts")
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive long and old transcripts with zstd")
+    parser.add_argument(
+        "--every", type=int, nargs="?", const=Config.COLD_STORAGE_JOB_INTERVAL_SECONDS, default=None,
+        help="Keep running and archive every N seconds (default interval from COLD_STORAGE_JOB_INTERVAL_SECONDS)"
+    )
+    parser.add_argument(
+        "--train-dictionary", action="store_true",
+        help="Train a new zstd dictionary on the transcripts before archiving"
+    )
+    parser.add_argument("--report", action="store_true", help="Show space saved and read latency, then exit")
+    parser.add_argument("--sample", type=int, default=100, help="Transcripts read for the --report latency")
+    parser.add_argument("--restore", action="store_true", help="Move every archived transcript back inline, then exit")
+    args = parser.parse_args()
+
+    init_database()
+
+    if args.report:
+        print_report(args.sample)
+        return
+
+    if args.restore:
+        print(f"✅ Restored {restore_stories()} transcripts")
+        return
+
+    if args.train_dictionary:
+        try:
+            print(f"✅ Trained dictionary {train_dictionary()}")
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"❌ Archive pass failed: {e}")
+            if args.every is None:
+                sys.exit(1)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Database and media backup job for ElderWise
+
+Takes an online backup while the app keeps running. Run once (e.g. from
+cron) or keep running with --every SECONDS. Restore with restore_database.py.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database
+from src.backup import create_backup, list_backups
+
+def _megabytes(size):
+    return f"{size / 1_000_000:.1f} MB"
+
+def progress_printer():
+    """on_progress callback that prints every 10%"""
+    last = {}
+
+    def on_progress(phase, fraction):
+        step = int(fraction * 10)
+        if step > last.get(phase, -1):
+            last[phase] = step
+            print(f"   {phase}: {step * 10}%", flush=True)
+
+    return on_progress
+
+def print_report(report):
+    database, timings = report["database"], report["timings"]
+    rate = database["bytes"] / timings["database"] / 1_000_000 if timings["database"] else 0
+    print(f"✅ Backup written to {report['path']}")
+    print(f"   Database: {_megabytes(database['bytes'])} in {timings['database']:.2f}s ({rate:.1f} MB/s)")
+    if "steps" in database:
+        print(f"   SQLite copy: {database['mode']}, {database['steps']} steps, {database['restarts']} restarts")
+    if "rows" in database:
+        print(f"   Rows: {sum(database['rows'].values())} in {len(database['rows'])} tables")
+    if "media" in report:
+        media = report["media"]
+        print(f"   Media: {media['files']} files ({_megabytes(media['bytes'])}), {media['copied']} new "
+              f"({_megabytes(media['copied_bytes'])}), {media['hashed']} hashed, in {timings['media']:.2f}s")
+    if report["pruned"]:
+        print(f"   Pruned {report['pruned']} old backups")
+
+def run_once(media=True, quiet=False):
+    """Take a single backup and print its timing report"""
+    report = create_backup(media=media, on_progress=None if quiet else progress_printer())
+    print_report(report)
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up the database and media files")
+    parser.add_argument(
+        "--every", type=int, nargs="?", const=Config.BACKUP_INTERVAL_SECONDS, default=None,
+        help="Keep running and back up every N seconds (default interval from BACKUP_INTERVAL_SECONDS)"
+    )
+    parser.add_argument("--no-media", action="store_true", help="Only back up the database")
+    parser.add_argument("--quiet", action="store_true", help="Don't print progress")
+    parser.add_argument("--list", action="store_true", help="List existing backups, then exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for backup in list_backups():
+            print(backup)
+        return
+
+    init_database()
+
+    while True:
+        try:
+            run_once(media=not args.no_media, quiet=args.quiet)
+        except Exception as e:
+            print(f"❌ Backup failed: {e}")
+            if args.every is None:
+                sys.exit(1)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark cover photo processing: full decode + LANCZOS vs src.images.process_cover
+
+Generates phone-sized JPEGs (12, 24 and 48 megapixels) in a scratch directory
+and processes each one in a fresh subprocess so peak RSS is per variant. The
+"+RSS MB" column is peak RSS above the process's RSS after importing Pillow.
+Run from the project root:
+    python benchmarks/bench_cover_resize.py
+    python benchmarks/bench_cover_resize.py --sizes 4000x3000,8000x6000 --repeat 5
+"""
+
+import io
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+def make_photo(path, width, height):
+    """Write a JPEG with smooth gradients and grain, sized like a phone photo"""
+    from PIL import Image, ImageFilter
+    base = Image.merge("RGB", [Image.linear_gradient("L").rotate(angle).resize((width, height)) for angle in (0, 90, 45)])
+    grain = Image.effect_noise((width // 2, height // 2), 30).filter(ImageFilter.GaussianBlur(1))
+    grain = grain.resize((width, height), Image.Resampling.BICUBIC)
+    Image.blend(base, Image.merge("RGB", [grain] * 3), 0.35).save(path, format="JPEG", quality=92)
+
+def legacy_cover(path):
+    """The previous share_story_page path"""
+    from PIL import Image
+    image = Image.open(path)
+    if image.width > 800:
+        ratio = 800 / image.width
+        image = image.resize((800, int(image.height * ratio)), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", optimize=True, quality=85)
+    return buffer.getvalue()
+
+def worker(variant, path, repeat):
+    """Run one variant in this process and print timing and peak RSS as JSON"""
+    sys.path.insert(0, str(ROOT))
+    from PIL import Image  # noqa: F401  Loaded before the baseline RSS reading
+    from src.images import process_cover
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    process = legacy_cover if variant == "legacy" else process_cover
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = process(path)
+        timings.append(time.perf_counter() - started)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "best": min(timings),
+        "mean": sum(timings) / len(timings),
+        "peak_mb": peak_kb / 1024,
+        "delta_mb": (peak_kb - baseline_kb) / 1024,
+        "output_kb": len(output) / 1024,
+    }))
+
+def run_variant(variant, path, repeat):
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", variant, str(path), "--repeat", str(repeat)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cover photo processing")
+    parser.add_argument("--sizes", default="4000x3000,5664x4248,8000x6000", help="Comma separated WxH sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (best and mean are reported)")
+    parser.add_argument("--worker", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    parser.add_argument("--make", nargs=3, metavar=("PATH", "WIDTH", "HEIGHT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], args.worker[1], args.repeat)
+        return
+    if args.make:
+        make_photo(args.make[0], int(args.make[1]), int(args.make[2]))
+        return
+
+    scratch = Path(tempfile.mkdtemp(prefix="elderwise-bench-"))
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+
+    print(f"{'image':>16} {'variant':>8} {'best ms':>9} {'mean ms':>9} {'peak MB':>9} {'+RSS MB':>9} {'out KB':>8}")
+    for size in args.sizes.split(","):
+        width, height = (int(value) for value in size.lower().split("x"))
+        path = scratch / f"photo-{width}x{height}.jpg"
+        # Generated in a subprocess so this process's peak RSS, which children inherit, stays small
+        subprocess.run([sys.executable, __file__, "--make", str(path), str(width), str(height)], check=True)
+        label = f"{width * height / 1e6:.0f}MP {path.stat().st_size / 1e6:.1f}MB"
+        results = {variant: run_variant(variant, path, args.repeat) for variant in ("legacy", "fast")}
+        for variant, result in results.items():
+            print(f"{label:>16} {variant:>8} {result['best'] * 1000:>9.1f} {result['mean'] * 1000:>9.1f} "
+                  f"{result['peak_mb']:>9.1f} {result['delta_mb']:>9.1f} {result['output_kb']:>8.1f}")
+        speedup = results["legacy"]["best"] / results["fast"]["best"]
+        print(f"{'':>16} {'':>8} {speedup:.1f}x faster, "
+              f"{results['legacy']['delta_mb'] - results['fast']['delta_mb']:.0f} MB less peak memory")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark feed page construction: detached ORM objects vs StoryRow tuples
+
+Uses a throwaway SQLite database. Run from the project root:
+    python benchmarks/bench_feed_rows.py
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import time
+import tempfile
+import argparse
+import tracemalloc
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before importing it
+SCRATCH_DIR = tempfile.mkdtemp(prefix="elderwise-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DIR}/bench.db"
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database import init_database, get_db_session, get_stories_page, Story
+
+def seed(count):
+    """Insert `count` stories with realistic transcript sizes"""
+    with get_db_session() as session:
+        session.bulk_save_objects([
+            Story(
+                title=f"Story {i}",
+                category="life_lessons",
+                transcript="Once upon a time... " * 150,
+                summary="Once upon a time... " * 10,
+                thumbnail_image_path=f"data/images/{i}.jpg",
+                author_id=1,
+                created_at=datetime(2025, 1, 1) + timedelta(minutes=i),
+            )
+            for i in range(count)
+        ])
+        session.commit()
+
+def orm_page(page, page_size):
+    """The previous read path: full ORM instances used after the session closed"""
+    with get_db_session() as session:
+        return (
+            session.query(Story)
+            .order_by(Story.created_at.desc(), Story.id.desc())
+            .offset(page * page_size)
+            .limit(page_size)
+            .all()
+        )
+
+def measure(loader, page_size, repeat):
+    """Average seconds per page and peak traced bytes while holding one page"""
+    loader(0, page_size)  # Warm up statement caches
+
+    started = time.perf_counter()
+    for i in range(repeat):
+        loader(i % 5, page_size)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    rows = loader(0, page_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM objects with StoryRow tuples per feed page")
+    parser.add_argument("--stories", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    init_database()
+    seed(args.stories)
+
+    print(f"📊 Feed page construction over {args.stories} stories")
+    for page_size in (10, 100):
+        orm_time, orm_peak = measure(orm_page, page_size, args.repeat)
+        row_time, row_peak = measure(get_stories_page, page_size, args.repeat)
+        print(f"   {page_size:>3} per page  ORM: {orm_time * 1000:.2f} ms, {orm_peak / 1024:.0f} KiB peak"
+              f"  |  StoryRow: {row_time * 1000:.2f} ms, {row_peak / 1024:.0f} KiB peak")
+
+if __name__ == "__main__":
+    main()
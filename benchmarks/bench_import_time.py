@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the ElderWise startup path (python -X importtime)
+
+Each target is imported in a fresh interpreter. The report lists the total
+import time, whether heavy modules were pulled in, and the slowest imports.
+Run from the project root:
+    python benchmarks/bench_import_time.py [--output benchmarks/results/import_time.txt]
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Modules on the startup path of the app, the CLI tools and the worker
+TARGETS = [
+    "src.config",
+    "src.database",
+    "src.scoring",
+    "src.rendering",
+    "score_stories",
+    "setup_database",
+    "set_password",
+    "pages.read_stories",
+    "pages.share_story",
+]
+
+# Modules that should only load when they are actually used
+HEAVY_MODULES = ["streamlit", "PIL"]
+
+LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile_import(module):
+    """Import `module` in a fresh interpreter and parse -X importtime output"""
+    code = (
+        f"import {module}; "
+        "from src import database; "
+        "state = vars(database); "
+        "state.get('_db_manager', state.get('db_manager')) is not None and print('ENGINE_CREATED')"
+    )
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Lines are (depth, name, cumulative_us), children are printed before parents
+    lines = []
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            _, cumulative_us, indent, name = match.groups()
+            lines.append((len(indent), name, int(cumulative_us)))
+            if name == module:
+                break  # Anything after this line was imported by the probe itself
+
+    imports = {name: cumulative for _, name, cumulative in lines}
+
+    # Direct children of the target: the contiguous deeper block just before it
+    depth = lines[-1][0]
+    children = []
+    for child_depth, name, cumulative in reversed(lines[:-1]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 2:
+            children.append((cumulative, name))
+    return imports, children, "ENGINE_CREATED" in result.stdout
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of ElderWise modules")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target, the median is reported")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per target")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    lines = [f"ElderWise import-time report (python {sys.version.split()[0]}, median of {args.repeat} runs)", ""]
+    for target in TARGETS:
+        runs = [profile_import(target) for _ in range(args.repeat)]
+        totals = [imports.get(target, 0) for imports, _, _ in runs]
+        imports, children, engine_created = runs[-1]
+
+        heavy = [name for name in HEAVY_MODULES if name in imports]
+        lines.append(f"{target}: {statistics.median(totals) / 1000:.1f} ms")
+        lines.append(f"    engine created at import: {'yes' if engine_created else 'no'}")
+        lines.append(f"    heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+
+        # Slowest direct imports made by this target
+        slowest = sorted(children, reverse=True)[:args.top]
+        for cumulative, name in slowest:
+            lines.append(f"    {cumulative / 1000:8.1f} ms  {name}")
+        lines.append("")
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(report + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark story card rendering: browser messages and render time per page
+
+Compares the old per-story element loop with the single HTML grid block.
+Run from the project root:  python benchmarks/bench_story_cards.py
+"""
+
+import sys
+import time
+import tempfile
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add project root to path
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from src.config import Config
+from src.rendering import render_story_grid_html
+
+def make_stories(count, image_path):
+    """Synthetic feed rows shaped like Story objects"""
+    return [
+        SimpleNamespace(
+            id=i,
+            title=f"Story <{i}> & friends",
+            category="life_lessons",
+            transcript=("Once upon a time... " * 80) + "\n\nThe end.",
+            thumbnail_image_path=str(image_path),
+            created_at=datetime(2025, 1, 1) + timedelta(days=i),
+            comments_count=i,
+            author_name=f"Elder {i}",
+        )
+        for i in range(count)
+    ]
+
+def make_cover(directory):
+    """Write an 800px cover like the ones share_story_page stores"""
+    from PIL import Image
+    path = Path(directory) / "cover.jpg"
+    Image.new("RGB", (800, 600), (102, 126, 234)).save(path, quality=85)
+    return path
+
+def legacy_page(root, count, image_path):
+    """The per-story element loop read_stories_page used before the grid renderer"""
+    import sys
+    sys.path.append(root)
+    import streamlit as st
+    from benchmarks.bench_story_cards import make_stories
+
+    for story in make_stories(count, image_path):
+        with st.container():
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                st.image(story.thumbnail_image_path, caption="Story Cover")
+            with col2:
+                st.subheader(story.title)
+                st.badge(story.category.replace('_', ' ').title())
+                st.write(story.transcript[:150] + "...")
+                st.caption(f"📅 Shared on {story.created_at.strftime('%B %d, %Y')}")
+                st.button("📖 Read Full Story", key=f"read_{story.id}", type="secondary")
+            st.markdown("---")
+
+def grid_page(root, count, image_path):
+    """The single-element grid renderer"""
+    import sys
+    sys.path.append(root)
+    import streamlit as st
+    from benchmarks.bench_story_cards import make_stories
+    from src.rendering import render_story_grid_html
+
+    st.markdown(render_story_grid_html(make_stories(count, image_path)), unsafe_allow_html=True)
+
+def count_elements(node):
+    """Count every element and block in an AppTest tree (one delta each)"""
+    children = getattr(node, "children", {}) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+def run_app(script, count, image_path):
+    """Run a page once with AppTest and return (message_count, seconds)"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(script, args=(str(ROOT), count, str(image_path)), default_timeout=60)
+    started = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return count_elements(app.main) - 1, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        image_path = make_cover(directory)
+        stories = make_stories(args.page_size, image_path)
+
+        # Pure render time for the HTML block; thumbnails are written to the temporary directory
+        Config.FEED_THUMBNAIL_DIR = Path(directory) / "thumbs"
+        started = time.perf_counter()
+        html_block = render_story_grid_html(stories)
+        cold = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            render_story_grid_html(stories)
+        warm = (time.perf_counter() - started) / args.repeat
+
+        print(f"📊 Story card rendering, {args.page_size} cards per page")
+        print(f"   HTML block: {len(html_block) / 1024:.1f} KiB")
+        print(f"   Render (cold thumbnails): {cold * 1000:.2f} ms")
+        print(f"   Render (warm thumbnails): {warm * 1000:.3f} ms")
+
+        try:
+            legacy_messages, legacy_time = run_app(legacy_page, args.page_size, image_path)
+            grid_messages, grid_time = run_app(grid_page, args.page_size, image_path)
+        except ImportError:
+            print("ℹ️  Streamlit not installed, skipping message counts")
+            return
+
+        print(f"   Legacy loop: {legacy_messages} elements, {legacy_time * 1000:.1f} ms per script run")
+        print(f"   Grid block:  {grid_messages} elements, {grid_time * 1000:.1f} ms per script run")
+
+if __name__ == "__main__":
+    main()
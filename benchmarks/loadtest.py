@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load test for the ElderWise Streamlit app
+
+Starts one `streamlit run app.py` server against a seeded database and drives
+N simulated browser sessions against it at once. Each session is a headless
+client on its own websocket that speaks Streamlit's protobuf protocol:
+it sends the widget states a browser would send and waits for the script (or
+fragment) run to finish. All sessions therefore share one server process, with
+its connection pool, caches, GIL and script threads, as real visitors do.
+
+Every session runs scripted scenarios and each rerun is timed from the
+request to the server's script_finished message. The report gives p50/p95/p99
+rerun latency and throughput per scenario. Query budgets are strict here, so a
+feed page that runs more SQL statements than FEED_QUERY_BUDGET counts as an
+error.
+
+Run from the project root:
+    python benchmarks/loadtest.py --sessions 8 --iterations 5
+    python benchmarks/loadtest.py --scenarios browse_feed,submit_story --database-url postgresql://...
+    python benchmarks/loadtest.py --url http://localhost:8501   # An already running server, not seeded
+
+submit_story uploads a file, which needs the server to run with
+--server.enableXsrfProtection false (the server started here does).
+
+read_story opens full stories, which are loaded from the database on demand.
+"""
+
+import io
+import os
+import sys
+import time
+import uuid
+import socket
+import random
+import shutil
+import asyncio
+import atexit
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from pathlib import Path
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+ROOT = Path(__file__).parent.parent
+APP_PATH = str(ROOT / "app.py")
+
+# Same choices as the category selectbox in share_story_page
+FORM_CATEGORIES = ["Life Lessons", "Travel Adventures", "Career Journey", "Family Stories",
+                   "Historical Memories", "Creative Fiction", "Inspirational", "Other"]
+
+def make_cover(width=1600, height=1200, seed=0):
+    """JPEG bytes for a cover photo"""
+    from PIL import Image
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def seed_database(story_count, image_dir):
+    """Create tables and insert `story_count` stories with cover photos"""
+    from src.database import init_database, get_db_session, Story
+
+    init_database()
+    image_dir.mkdir(parents=True, exist_ok=True)
+    covers = []
+    for i in range(min(story_count, 20)):  # A handful of distinct files is enough
+        path = image_dir / f"seed-{i}.jpg"
+        path.write_bytes(make_cover(800, 600, seed=i))
+        covers.append(str(path))
+
+    with get_db_session() as session:
+        session.bulk_save_objects([
+            Story(
+                title=f"Seeded story {i}",
+                category=FORM_CATEGORIES[i % len(FORM_CATEGORIES)].lower().replace(' ', '_'),
+                transcript=("A long time ago we learned something worth sharing. " * 40),
+                thumbnail_image_path=covers[i % len(covers)] if covers else None,
+                author_id=1,
+                created_at=datetime.utcnow() - timedelta(minutes=i),
+            )
+            for i in range(story_count)
+        ])
+        session.commit()
+
+# Server
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def start_server(workdir, timeout):
+    """Start `streamlit run app.py` on a free port; returns (base url, process)"""
+    port = _free_port()
+    log = open(workdir / "server.log", "wb")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", APP_PATH,
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--server.address", "127.0.0.1",
+            "--server.enableXsrfProtection", "false",  # The client below has no XSRF cookie to upload with
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+    )
+    atexit.register(_stop_server, process)  # Before the scratch directory is removed
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return url, process
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"Streamlit server did not start, see {workdir / 'server.log'}")
+
+# Headless browser session
+
+class Session:
+    """One browser tab on its own websocket; every call to rerun() is timed"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.timings = []
+        self.session_id = None
+        self.widgets = {}  # widget id -> (element type, element proto, fragment id), latest version
+        self.values = {}  # widget id -> WidgetState, sent with every rerun as the browser does
+        self.elements = []  # (element type, element proto) drawn by the latest run
+
+    async def __aenter__(self):
+        from websockets.asyncio.client import connect
+
+        ws_url = self.url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = await connect(ws_url, subprotocols=["streamlit"], max_size=None, open_timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.ws.close()
+
+    async def _receive(self):
+        """Read one ForwardMsg and keep track of the elements it draws"""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = ForwardMsg()
+        message.ParseFromString(await self.ws.recv())
+        kind = message.WhichOneof("type")
+        if kind == "new_session":
+            self.session_id = message.new_session.initialize.session_id
+        elif kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+            element = message.delta.new_element
+            element_type = element.WhichOneof("type")
+            proto = getattr(element, element_type)
+            self.elements.append((element_type, proto))
+            widget_id = getattr(proto, "id", "")
+            if widget_id:
+                self.widgets[widget_id] = (element_type, proto, message.delta.fragment_id)
+        return message
+
+    async def _wait_for_run(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            message = await self._receive()
+            if message.WhichOneof("type") != "script_finished":
+                continue
+            if message.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        """Send the current widget states (plus a button press) and wait for the run to finish"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        message = BackMsg()
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(self.values.values())
+        if trigger is not None:
+            message.rerun_script.widget_states.widgets.append(WidgetState(id=trigger, trigger_value=True))
+
+        self.elements = []
+        started = time.perf_counter()
+        await self.ws.send(message.SerializeToString())
+        await asyncio.wait_for(self._wait_for_run(), self.timeout)
+        self.timings.append(time.perf_counter() - started)
+
+        exceptions = [proto for element_type, proto in self.elements if element_type == "exception"]
+        if exceptions:
+            raise RuntimeError(exceptions[0].message)
+
+    def widget(self, key=None, label=None):
+        """(widget id, element proto, fragment id) of a widget by its key or label"""
+        for widget_id, (_, proto, fragment_id) in self.widgets.items():
+            if (key is not None and widget_id.endswith(f"-{key}")) or (label is not None and proto.label == label):
+                return widget_id, proto, fragment_id
+        raise LookupError(f"No widget with key={key!r} label={label!r}")
+
+    def set_value(self, widget_id, **value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        self.values[widget_id] = WidgetState(id=widget_id, **value)
+
+    async def click(self, key=None, label=None):
+        """Press a button, rerunning only its fragment as the browser does; False if it is disabled"""
+        widget_id, proto, fragment_id = self.widget(key, label)
+        if proto.disabled:
+            return False
+        await self.rerun(trigger=widget_id, fragment_id=fragment_id)
+        return True
+
+    async def select(self, key, option):
+        """Pick a selectbox option by its displayed label"""
+        widget_id, _, fragment_id = self.widget(key)
+        self.set_value(widget_id, string_value=option)
+        await self.rerun(fragment_id=fragment_id)
+
+    async def upload(self, label, name, data, content_type):
+        """Upload a file as the file uploader does, ready to be sent with the next rerun"""
+        import requests
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import UploadedFileInfo
+
+        widget_id, _, _ = self.widget(label=label)
+        message = BackMsg()
+        message.file_urls_request.request_id = uuid.uuid4().hex
+        message.file_urls_request.file_names.append(name)
+        message.file_urls_request.session_id = self.session_id
+        await self.ws.send(message.SerializeToString())
+        while True:
+            response = await asyncio.wait_for(self._receive(), self.timeout)
+            if (response.WhichOneof("type") == "file_urls_response"
+                    and response.file_urls_response.response_id == message.file_urls_request.request_id):
+                break
+        file_urls = response.file_urls_response.file_urls[0]
+
+        def put():
+            requests.put(
+                self.url + file_urls.upload_url, files={"file": (name, data, content_type)}, timeout=self.timeout
+            ).raise_for_status()
+
+        await asyncio.to_thread(put)
+        info = UploadedFileInfo(name=name, size=len(data), file_id=file_urls.file_id, file_urls=file_urls)
+        self.set_value(widget_id, file_uploader_state_value={"uploaded_file_info": [info]})
+
+    def alerts(self, kind):
+        from streamlit.proto.Alert_pb2 import Alert
+
+        wanted = Alert.SUCCESS if kind == "success" else Alert.ERROR
+        return [proto.body for element_type, proto in self.elements
+                if element_type == "alert" and proto.format == wanted]
+
+# Scenarios
+
+async def browse_feed(session, rng):
+    """Open the app and page forward through the feed"""
+    await session.rerun()
+    for _ in range(3):
+        if not await session.click(key="feed_next"):
+            break
+
+async def filter_category(session, rng):
+    """Open the app and switch between categories"""
+    await session.rerun()
+    options = list(session.widget(key="category_filter")[1].options)
+    for _ in range(2):
+        if len(options) < 2:
+            break
+        await session.select("category_filter", rng.choice(options[1:]))  # options[0] is "All Categories"
+
+async def read_story(session, rng):
+    """Open the app and read a few full stories from the first page"""
+    await session.rerun()
+    widget_id, proto, fragment_id = session.widget(key="show_full_story")
+    session.set_value(widget_id, bool_value=True)
+    await session.rerun(fragment_id=fragment_id)
+    options = list(session.widget(key="comments_story")[1].options)
+    for _ in range(2):
+        await session.select("comments_story", rng.choice(options))
+
+async def submit_story(session, rng):
+    """Open the app and share a story with a cover photo"""
+    await session.rerun()
+    # Form widgets only reach the server with the submit, as in the browser
+    session.set_value(session.widget(label="Story Title *")[0],
+                      string_value=f"Load test story {rng.randrange(10 ** 9)}")
+    # Random words, so submissions aren't refused as near-duplicates of each other
+    words = ["story", "garden", "river", "letter", "harvest", "journey", "kitchen", "school", "winter", "music"]
+    session.set_value(session.widget(label="Your Story *")[0],
+                      string_value=" ".join(f"{rng.choice(words)}{rng.randrange(1000)}" for _ in range(200)))
+    session.set_value(session.widget(label="Story Category *")[0], string_value=rng.choice(FORM_CATEGORIES))
+    await session.upload("Choose a cover photo *", "cover.jpg", COVER_UPLOAD, "image/jpeg")
+    await session.click(label="📤 Share Story")
+    if not session.alerts("success"):
+        errors = session.alerts("error")
+        raise RuntimeError(errors[0] if errors else "Story was not shared")
+
+SCENARIOS = {
+    "browse_feed": browse_feed,
+    "filter_category": filter_category,
+    "read_story": read_story,
+    "submit_story": submit_story,
+}
+
+COVER_UPLOAD = b""
+
+def percentile(values, fraction):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+async def run_session(index, url, scenarios, iterations, timeout, results, errors):
+    """Run `iterations` randomly chosen scenarios, each in a fresh browser session"""
+    rng = random.Random(index)
+    for _ in range(iterations):
+        name = rng.choice(scenarios)
+        session = Session(url, timeout)
+        try:
+            async with session:
+                await SCENARIOS[name](session, rng)
+        except Exception as e:
+            errors[name].append(f"{type(e).__name__}: {e}")
+        results[name].extend(session.timings)
+
+async def run_sessions(url, session_count, scenarios, iterations, timeout):
+    results, errors = defaultdict(list), defaultdict(list)
+    await asyncio.gather(*(
+        run_session(index, url, scenarios, iterations, timeout, results, errors)
+        for index in range(session_count)
+    ))
+    return results, errors
+
+def main():
+    global COVER_UPLOAD
+
+    parser = argparse.ArgumentParser(description="Load test the ElderWise Streamlit app")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=5, help="Scenarios per session")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated scenario names")
+    parser.add_argument("--stories", type=int, default=200, help="Stories to seed")
+    parser.add_argument("--upload-size", default="3000x2000", help="Uploaded cover size, WxH")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds allowed per rerun")
+    parser.add_argument("--database-url", help="Use this database instead of a scratch SQLite file")
+    parser.add_argument("--url", help="Test this running server instead of starting and seeding one")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    width, height = (int(value) for value in args.upload_size.lower().split("x"))
+    COVER_UPLOAD = make_cover(width, height, seed=42)
+
+    url = args.url
+    if url is None:
+        # Scratch working directory for the database and uploaded covers
+        scratch = Path(tempfile.mkdtemp(prefix="elderwise-loadtest-"))
+        atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{scratch}/loadtest.db"
+        os.environ.setdefault("MEDIA_ROOT", str(scratch / "data"))
+        os.environ.setdefault("QUERY_BUDGET_STRICT", "true")  # A page over its query budget fails the session
+        sys.path.insert(0, str(ROOT))
+
+        print(f"🌱 Seeding {args.stories} stories...")
+        seed_database(args.stories, scratch / "data" / "images")
+        print("🖥️  Starting the Streamlit server...")
+        url, _ = start_server(scratch, args.timeout)
+
+    print(f"🚀 {args.sessions} concurrent sessions x {args.iterations} scenarios ({', '.join(scenarios)}) against {url}")
+    started = time.perf_counter()
+    results, errors = asyncio.run(run_sessions(url, args.sessions, scenarios, args.iterations, args.timeout))
+    elapsed = time.perf_counter() - started
+
+    all_timings = [value for timings in results.values() for value in timings]
+    print(f"\n📊 {len(all_timings)} reruns in {elapsed:.1f}s, {len(all_timings) / elapsed:.1f} reruns/s")
+    print(f"   {'scenario':<16} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name in scenarios + ["all"]:
+        timings = all_timings if name == "all" else results.get(name, [])
+        error_count = sum(len(items) for items in errors.values()) if name == "all" else len(errors.get(name, []))
+        print(f"   {name:<16} {len(timings):>7} "
+              f"{percentile(timings, 0.50) * 1000:>9.1f} {percentile(timings, 0.95) * 1000:>9.1f} "
+              f"{percentile(timings, 0.99) * 1000:>9.1f} {error_count:>7}")
+
+    for name, messages in errors.items():
+        print(f"❌ {name}: {messages[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate story report for ElderWise
+
+Indexes stories that have no MinHash signature yet, then lists groups of
+near-duplicate stories. With --merge, each group is folded into its oldest
+story (interactions move over, the copies are deleted).
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from sqlalchemy import select
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database, get_db_session, Story
+from src.dedupe import index_missing, find_duplicate_groups, merge_duplicates
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge near-duplicate stories")
+    parser.add_argument(
+        "--threshold", type=float, default=Config.DEDUPE_BLOCK_THRESHOLD,
+        help="Minimum estimated similarity (default DEDUPE_BLOCK_THRESHOLD)"
+    )
+    parser.add_argument("--merge", action="store_true", help="Fold each group into its oldest story")
+    args = parser.parse_args()
+
+    init_database()
+
+    started = time.perf_counter()
+    indexed = index_missing()
+    print(f"✅ Indexed {indexed} stories in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    groups = find_duplicate_groups(args.threshold)
+    print(f"🔍 Found {len(groups)} duplicate groups in {time.perf_counter() - started:.2f}s")
+    if not groups:
+        return
+
+    with get_db_session() as session:
+        titles = dict(session.execute(
+            select(Story.id, Story.title).where(Story.id.in_([story_id for group in groups for story_id in group]))
+        ).all())
+    for group in groups:
+        print(f"   {group[0]}: {titles.get(group[0])!r} <- {', '.join(str(story_id) for story_id in group[1:])}")
+
+    if args.merge:
+        removed = merge_duplicates(groups)
+        print(f"🧹 Merged {removed} duplicate stories")
+
+if __name__ == "__main__":
+    main()
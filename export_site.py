@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Static site export for ElderWise
+
+Renders the story archive into STATIC_EXPORT_DIR (default data/site) for any
+static file server. Only stories changed since the last build are rendered.
+Run once (e.g. from cron) or keep running with --every SECONDS.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database
+from src.static_export import export_site
+
+def run_once(output_dir=None, full=False, workers=None):
+    """Run a single export and print a short summary"""
+    started = time.perf_counter()
+    result = export_site(output_dir, full=full, workers=workers)
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Rendered {result['stories_rendered']} of {result['total_stories']} stories, "
+        f"removed {result['stories_removed']}, wrote {result['index_pages_written']} index pages "
+        f"in {elapsed:.2f}s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the story archive as a static site")
+    parser.add_argument("--output", help=f"Output directory (default {Config.STATIC_EXPORT_DIR})")
+    parser.add_argument("--full", action="store_true", help="Re-render every story, ignoring the manifest")
+    parser.add_argument("--workers", type=int, help="Rendering processes (default STATIC_EXPORT_WORKERS or CPU count)")
+    parser.add_argument(
+        "--every", type=int, nargs="?", const=Config.STATIC_EXPORT_INTERVAL_SECONDS, default=None,
+        help="Keep running and export every N seconds (default interval from STATIC_EXPORT_INTERVAL_SECONDS)"
+    )
+    args = parser.parse_args()
+
+    init_database()
+
+    full = args.full
+    while True:
+        try:
+            run_once(args.output, full=full, workers=args.workers)
+            full = False
+        except Exception as e:
+            print(f"❌ Export failed: {e}")
+            if args.every is None:
+                sys.exit(1)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
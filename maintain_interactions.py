@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Story interaction maintenance job for ElderWise
+
+Creates upcoming monthly partitions, compacts old view events into daily
+rollups and applies retention. Run once (e.g. from cron) or keep running with
+--every SECONDS. Use --partition once to convert an existing PostgreSQL table.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database
+from src.interactions import run_maintenance, partition_existing_interactions
+
+def run_once():
+    """Run a single maintenance pass and print a short summary"""
+    started = time.perf_counter()
+    result = run_maintenance()
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Compacted {result['views_compacted']} views over {result['days_compacted']} days, "
+        f"created {len(result['partitions_created'])} partitions and dropped "
+        f"{len(result['tables_dropped'])} old tables in {elapsed:.2f}s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact and rotate story interactions")
+    parser.add_argument(
+        "--every", type=int, nargs="?", const=Config.INTERACTION_JOB_INTERVAL_SECONDS, default=None,
+        help="Keep running every N seconds (default interval from INTERACTION_JOB_INTERVAL_SECONDS)"
+    )
+    parser.add_argument(
+        "--partition", action="store_true",
+        help="Convert an existing story_interactions table to monthly partitions (PostgreSQL) and exit"
+    )
+    args = parser.parse_args()
+
+    init_database()
+
+    if args.partition:
+        try:
+            copied = partition_existing_interactions()
+        except Exception as e:
+            print(f"❌ Partitioning failed: {e}")
+            sys.exit(1)
+        print(f"✅ story_interactions is partitioned by month ({copied} rows copied)")
+        return
+
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"❌ Interaction maintenance failed: {e}")
+            if args.every is None:
+                sys.exit(1)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import streamlit as st
+from src.auth import authenticate
+from src.config import Config
+from src.analytics import get_category_totals, get_daily_totals
+from src.interactions import get_most_viewed_stories, get_daily_views
+from src.viewers import get_category_unique_viewers, get_total_unique_viewers, get_unique_viewers
+from src.rendering import category_label
+from src.instrumentation import timed
+from src.profiling import profiled
+
+PERIODS = [7, 30, 90]
+
+def _category_name(category):
+    return Config.STORY_CATEGORIES.get(category) or category_label(category)
+
+def _sign_in():
+    """Sign-in form callback; only admins see the dashboard"""
+    user = authenticate(st.session_state.get("analytics_username"), st.session_state.get("analytics_password"))
+    if user is None or user.user_type != 'admin':
+        st.session_state.analytics_message = "Incorrect username or password for an admin account."
+        return
+    st.session_state.analytics_user = user
+
+def _sign_out():
+    st.session_state.pop("analytics_user", None)
+
+@st.fragment
+@timed("fragment.analytics_dashboard")
+def analytics_dashboard():
+    """Category dashboard from category_daily_stats, and per-story views from the rollups"""
+    days = st.selectbox(
+        "Period",
+        PERIODS,
+        index=1,
+        format_func=lambda value: f"Last {value} days",
+        key="analytics_days"
+    )
+
+    totals = get_category_totals(days)
+    if not totals:
+        st.info("No analytics yet. Run `python update_analytics.py` to build them.")
+        return
+
+    # Unique readers come from merged HyperLogLog sketches, so they are estimates
+    unique_viewers = {row.category: row.unique_viewers for row in get_category_unique_viewers(days)}
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Stories Shared", sum(row.stories_created for row in totals))
+    col2.metric("Views", sum(row.views for row in totals))
+    col3.metric("Unique Readers", f"~{get_total_unique_viewers(days):,}")
+    col4.metric("Likes", sum(row.likes for row in totals))
+    col5.metric("Shares", sum(row.shares for row in totals))
+
+    st.subheader("By Category")
+    st.dataframe(
+        [
+            {
+                "Category": _category_name(row.category),
+                "Stories": row.stories_created,
+                "Views": row.views,
+                "Unique Readers": unique_viewers.get(row.category, 0),
+                "Likes": row.likes,
+                "Shares": row.shares,
+            }
+            for row in totals
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+
+    st.subheader("Daily Activity")
+    daily = get_daily_totals(days)
+    st.line_chart(
+        {
+            "Day": [row.day for row in daily],
+            "Views": [row.views for row in daily],
+            "Likes": [row.likes for row in daily],
+            "Shares": [row.shares for row in daily],
+        },
+        x="Day",
+        y=["Views", "Likes", "Shares"]
+    )
+
+    # Per-story views come from story_daily_stats plus the views not compacted yet
+    st.subheader("Most Read Stories")
+    top_stories = get_most_viewed_stories(days)
+    if not top_stories:
+        st.caption("No views in this period.")
+        return
+    # The story sketches cover every view since they were built, not just this period
+    readers = get_unique_viewers(row.story_id for row in top_stories)
+    st.dataframe(
+        [
+            {
+                "Story": row.title,
+                "Category": _category_name(row.category),
+                "Views": row.views,
+                "Unique Readers (all time)": readers[row.story_id],
+            }
+            for row in top_stories
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+    titles = {row.story_id: row.title for row in top_stories}
+    story_id = st.selectbox(
+        "Daily views of",
+        list(titles),
+        format_func=lambda key: titles[key],
+        key="analytics_story"
+    )
+    story_daily = get_daily_views(story_id, days)
+    st.line_chart(
+        {"Day": [day for day, _ in story_daily], "Views": [views for _, views in story_daily]},
+        x="Day",
+        y="Views"
+    )
+
+@timed("page.analytics")
+@profiled("page.analytics")
+def analytics_page():
+    """Admin page with per-category reading and writing activity"""
+
+    st.header("📊 Category Analytics")
+    st.write("Which categories are being written and read.")
+
+    try:
+        user = st.session_state.get("analytics_user")
+        if user is None:
+            message = st.session_state.pop("analytics_message", None)
+            if message:
+                st.error(f"❌ {message}")
+            # Nothing is read until an admin signs in
+            with st.form("analytics_sign_in", clear_on_submit=True):
+                st.text_input("Username", key="analytics_username")
+                st.text_input("Password", type="password", key="analytics_password")
+                st.form_submit_button("🔐 Sign In", on_click=_sign_in)
+            return
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"Signed in as {user.full_name or user.username}")
+        with col2:
+            st.button("Sign Out", key="analytics_sign_out", on_click=_sign_out)
+        analytics_dashboard()
+    except Exception as e:
+        st.error(f"❌ Error loading analytics: {str(e)}")
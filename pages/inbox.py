@@ -0,0 +1,121 @@
+import streamlit as st
+from src.auth import authenticate
+from src.connections import (
+    get_pending_requests, count_pending_requests,
+    get_unread_count, mark_requests_read, respond_to_requests
+)
+from src.instrumentation import timed
+from src.profiling import profiled
+
+def _signed_in_id():
+    user = st.session_state.get("inbox_user")
+    return user.id if user else None
+
+def _sign_in():
+    """Sign-in form callback; only elders have an inbox"""
+    user = authenticate(st.session_state.get("inbox_username"), st.session_state.get("inbox_password"))
+    if user is None or user.user_type != 'elder':
+        st.session_state.inbox_message = ("error", "Incorrect username or password for an elder account.")
+        return
+    st.session_state.inbox_user = user
+
+def _sign_out():
+    st.session_state.pop("inbox_user", None)
+
+def _mark_read(elder_id, connection_ids):
+    """Mark the requests on screen as seen, when the elder asks to"""
+    mark_requests_read(elder_id, connection_ids, _signed_in_id())
+
+def _respond(elder_id, status):
+    """Bulk accept/decline callback for the selected requests"""
+    selected = [
+        int(key.rsplit("_", 1)[-1])
+        for key, checked in st.session_state.items()
+        if key.startswith(f"inbox_select_{elder_id}_") and checked
+    ]
+    if not selected:
+        st.session_state.inbox_message = ("warning", "Select at least one request first.")
+        return
+    updated = respond_to_requests(elder_id, selected, status, _signed_in_id())
+    for connection_id in selected:
+        st.session_state.pop(f"inbox_select_{elder_id}_{connection_id}", None)
+    st.session_state.inbox_message = ("success", f"{updated} request(s) {status}.")
+
+@st.fragment
+@timed("fragment.connection_inbox")
+def connection_inbox(elder_id):
+    """Pending requests for one elder; actions rerun only this fragment"""
+    unread = get_unread_count(elder_id)
+    pending_total = count_pending_requests(elder_id)
+    st.subheader(f"📬 {pending_total} Pending Requests" + (f" · {unread} new" if unread else ""))
+
+    message = st.session_state.pop("inbox_message", None)
+    if message:
+        getattr(st, message[0])(message[1])
+
+    requests = get_pending_requests(elder_id)
+    if not requests:
+        st.info("No pending connection requests right now.")
+        return
+
+    for request in requests:
+        with st.container(border=True):
+            new_badge = " 🆕" if request.read_at is None else ""
+            st.checkbox(
+                f"**{request.seeker_name or 'A seeker'}**{new_badge}",
+                key=f"inbox_select_{elder_id}_{request.id}"
+            )
+            if request.initial_message:
+                st.write(request.initial_message)
+            details = []
+            if request.topics:
+                details.append("🗂️ " + ", ".join(request.topics))
+            if request.preferred_contact:
+                details.append(f"📞 {request.preferred_contact}")
+            if request.requested_at:
+                details.append(f"📅 {request.requested_at.strftime('%B %d, %Y')}")
+            if details:
+                st.caption(" · ".join(details))
+
+    unread_ids = [request.id for request in requests if request.read_at is None]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("✅ Accept Selected", key="inbox_accept", type="primary", use_container_width=True,
+                  on_click=_respond, args=(elder_id, 'accepted'))
+    with col2:
+        st.button("❌ Decline Selected", key="inbox_decline", use_container_width=True,
+                  on_click=_respond, args=(elder_id, 'declined'))
+    with col3:
+        st.button("👁️ Mark All as Read", key="inbox_mark_read", use_container_width=True,
+                  disabled=not unread_ids, on_click=_mark_read, args=(elder_id, unread_ids))
+
+@timed("page.inbox")
+@profiled("page.inbox")
+def connections_inbox_page():
+    """Page for elders to sign in, then review and answer their connection requests"""
+
+    st.header("📬 Connection Requests")
+    st.write("See who would like to learn from you and choose who to connect with.")
+
+    try:
+        user = st.session_state.get("inbox_user")
+        if user is None:
+            message = st.session_state.pop("inbox_message", None)
+            if message:
+                getattr(st, message[0])(message[1])
+            # Guests only get the form: nothing is read or marked until an elder signs in
+            with st.form("inbox_sign_in", clear_on_submit=True):
+                st.text_input("Username", key="inbox_username")
+                st.text_input("Password", type="password", key="inbox_password")
+                st.form_submit_button("🔐 Sign In", on_click=_sign_in)
+            return
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"Signed in as {user.full_name or user.username}")
+        with col2:
+            st.button("Sign Out", key="inbox_sign_out", on_click=_sign_out)
+        connection_inbox(user.id)
+
+    except Exception as e:
+        st.error(f"❌ Error loading connection requests: {str(e)}")
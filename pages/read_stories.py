@@ -1,109 +1,215 @@
+import uuid
+import logging
 import streamlit as st
-import os
-from PIL import Image
-from datetime import datetime
-from src.database import get_db_session, Story
+from src.config import Config
+from src.database import get_story_categories, count_stories, get_story_transcript
+from src.rendering import missing_thumbnails, render_story_grid_html, render_story_text_html, render_comments_html, category_label
+from src.comments import add_comment, get_comments
+from src.storage import get_storage
+from src.prefetch import PrefetchHandle, prefetch_page, get_feed_page
+from src.instrumentation import timed, limit_queries
+from src.profiling import profiled
+from src.viewers import record_view
 
-def read_stories_page():
-    """Page to display all shared stories with their cover photos"""
-    
-    st.header("� Read Amazing Stories")
-    st.write("Discover inspiring stories shared by our community members!")
+logger = logging.getLogger(__name__)
+
+def _reset_feed_page():
+    """Go back to the first page when the category filter changes"""
+    st.session_state.feed_page = 0
+    # Pages prefetched for the old category are no longer wanted
+    handle = st.session_state.pop("feed_prefetch", None)
+    if handle is not None:
+        handle.cancel()
 
+def _prefetch_handle():
+    if "feed_prefetch" not in st.session_state:
+        st.session_state.feed_prefetch = PrefetchHandle()
+    return st.session_state.feed_prefetch
+
+def _change_feed_page(page):
+    """Pagination callback, runs before the feed fragment reruns"""
+    st.session_state.feed_page = page
+
+@st.fragment
+@timed("fragment.story_feed")
+@profiled("fragment.story_feed")
+@limit_queries("fragment.story_feed", Config.FEED_QUERY_BUDGET)
+def story_feed():
+    """Category filter, story grid and pagination.
+
+    Runs as a fragment so filtering and paging only rerun this subtree, not the
+    whole app. The cards only carry previews; story_reader loads a full story.
+    """
     try:
-        with get_db_session() as session:
-            # Fetch all stories, newest first
-            stories = session.query(Story).order_by(Story.created_at.desc()).all()
+        total_stories = count_stories()
 
-        if not stories:
+        if total_stories == 0:
             st.info("📚 No stories have been shared yet. Be the first to share your story!")
             return
 
-        # Create a grid layout for stories
-        st.subheader(f"📚 {len(stories)} Stories Available")
+        st.subheader(f"📚 {total_stories} Stories Available")
         
         # Add filters
         col1, col2 = st.columns([1, 3])
         with col1:
-            # Category filter
-            all_categories = list(set([story.category.replace('_', ' ').title() for story in stories if story.category]))
             selected_category = st.selectbox(
                 "Filter by Category:",
-                ["All Categories"] + sorted(all_categories),
-                key="category_filter"
+                [None, *get_story_categories()],
+                format_func=lambda category: "All Categories" if category is None else category_label(category),
+                key="category_filter",
+                on_change=_reset_feed_page
             )
         
-        # Filter stories based on selection
-        filtered_stories = stories
-        if selected_category != "All Categories":
-            filtered_stories = [s for s in stories if s.category and s.category.replace('_', ' ').title() == selected_category]
-
-        # Display stories in a grid
-        for i, story in enumerate(filtered_stories):
-            with st.container():
-                # Create columns for layout
-                col1, col2 = st.columns([1, 2])
-                
-                with col1:
-                    # Display cover photo
-                    if story.thumbnail_image_path and os.path.exists(story.thumbnail_image_path):
-                        try:
-                            image = Image.open(story.thumbnail_image_path)
-                            st.image(image, caption="Story Cover", use_column_width=True)
-                        except Exception as e:
-                            st.error("🖼️ Cover photo unavailable")
-                    else:
-                        # Placeholder if no image
-                        st.info("📷 No cover photo available")
-                
-                with col2:
-                    # Story details
-                    st.subheader(story.title)
-                    
-                    # Category badge
-                    if story.category:
-                        category_display = story.category.replace('_', ' ').title()
-                        st.badge(category_display)
-                    
-                    # Story preview
-                    preview_text = story.transcript[:150] + "..." if len(story.transcript) > 150 else story.transcript
-                    st.write(preview_text)
-                    
-                    # Story metadata
-                    story_date = story.created_at.strftime("%B %d, %Y") if story.created_at else "Unknown date"
-                    st.caption(f"📅 Shared on {story_date}")
-                    
-                    # Read full story button
-                    if st.button(f"📖 Read Full Story", key=f"read_{story.id}", type="secondary"):
-                        st.session_state[f"show_story_{story.id}"] = True
-                
-                # Show full story if button was clicked
-                if st.session_state.get(f"show_story_{story.id}", False):
-                    st.markdown("---")
-                    st.subheader(f"📖 {story.title}")
-                    
-                    # Show full cover photo
-                    if story.thumbnail_image_path and os.path.exists(story.thumbnail_image_path):
-                        try:
-                            image = Image.open(story.thumbnail_image_path)
-                            st.image(image, caption="Story Cover", width=400)
-                        except:
-                            pass
-                    
-                    # Full story text
-                    st.write(story.transcript)
-                    
-                    # Close button
-                    if st.button(f"❌ Close", key=f"close_{story.id}"):
-                        st.session_state[f"show_story_{story.id}"] = False
-                        st.rerun()
-                
-                st.markdown("---")
+        # Work out the current page
+        filtered_count = count_stories(selected_category) if selected_category else total_stories
+        page_size = Config.FEED_PAGE_SIZE
+        page_count = max(1, (filtered_count + page_size - 1) // page_size)
+        page = min(st.session_state.get("feed_page", 0), page_count - 1)
+
+        stories = get_feed_page(page, page_size, selected_category)
+
+        # Remote storage: fetch the covers that still need a thumbnail in parallel
+        storage = get_storage()
+        if storage.is_remote:
+            storage.prefetch(missing_thumbnails([story.thumbnail_image_path for story in stories]))
+
+        # Render the whole page of cards as a single element
+        st.markdown(render_story_grid_html(stories), unsafe_allow_html=True)
+
+        # Load the next page's rows and thumbnails while this one is being read
+        if page < page_count - 1:
+            prefetch_page(_prefetch_handle(), page + 1, page_size, selected_category)
+
+        if stories:
+            story_reader(stories)
+
+        # Pagination controls, handled by callbacks so only the fragment reruns
+        if page_count > 1:
+            prev_col, info_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                st.button("◀ Previous", key="feed_prev", disabled=page == 0,
+                          on_click=_change_feed_page, args=(page - 1,))
+            with info_col:
+                st.caption(f"Page {page + 1} of {page_count}")
+            with next_col:
+                st.button("Next ▶", key="feed_next", disabled=page >= page_count - 1,
+                          on_click=_change_feed_page, args=(page + 1,))
 
     except Exception as e:
         st.error(f"❌ Error loading stories: {str(e)}")
         st.write("Please check your database connection and try again.")
 
+def _load_more_comments(story_id, cursor):
+    """Append the next page of comments to the thread kept in session state"""
+    thread = st.session_state[f"comments_{story_id}"]
+    comments, next_cursor = get_comments(story_id, cursor)
+    thread["comments"].extend(comments)
+    thread["cursor"] = next_cursor
+
+def _post_comment(story_id):
+    """Comment form callback, runs before the comments fragment reruns"""
+    try:
+        add_comment(story_id, 1, st.session_state.get(f"comment_text_{story_id}"))  # Default commenter for now
+        st.session_state.pop(f"comments_{story_id}", None)  # Reload the thread
+    except ValueError as e:
+        st.session_state.comment_error = str(e)
+
+def _record_view():
+    """Reader callback: count this session's first read of a story's full text.
+
+    Runs before the fragment, so the write isn't part of the feed's query budget.
+    """
+    if not st.session_state.get("show_full_story"):
+        return
+    story_id = st.session_state.get("comments_story")
+    viewed = st.session_state.setdefault("viewed_stories", set())
+    if story_id in viewed:
+        return
+    # Signed-in elders count as themselves; other readers by their browser session
+    user = st.session_state.get("inbox_user")
+    if "reader_key" not in st.session_state:
+        st.session_state.reader_key = f"session:{uuid.uuid4()}"
+    try:
+        if user is not None:
+            record_view(story_id, user.id)
+        else:
+            record_view(story_id, 1, viewer=st.session_state.reader_key)  # Default reader for now
+        viewed.add(story_id)
+    except Exception as e:
+        logger.warning("Recording a view of story %s failed: %s", story_id, e)
+
+@st.fragment
+@timed("fragment.story_reader")
+def story_reader(stories):
+    """Full text and comments of one story on the current page.
+
+    The transcript is only read and sent when the reader asks for it, so the
+    feed itself stays small.
+    """
+    st.markdown("#### 📖 Read & Discuss")
+    titles = {story.id: story.title for story in stories}
+    story_id = st.selectbox(
+        "Story",
+        list(titles),
+        format_func=lambda key: titles[key],
+        key="comments_story",
+        on_change=_record_view
+    )
+
+    if st.toggle("📖 Read Full Story", key="show_full_story", on_change=_record_view):
+        transcript = get_story_transcript(story_id)
+        if transcript is None:
+            st.warning("This story is no longer available.")
+        else:
+            st.markdown(render_story_text_html(transcript), unsafe_allow_html=True)
+
+    story_comments(story_id)
+
+@st.fragment
+@timed("fragment.story_comments")
+def story_comments(story_id):
+    """Comment thread for one story.
+
+    Runs as its own fragment, so reading, paging and posting comments only
+    rerun this section.
+    """
+    st.markdown("#### 💬 Comments")
+
+    # Threads are loaded page by page and kept until a new comment is posted
+    state_key = f"comments_{story_id}"
+    if state_key not in st.session_state:
+        comments, cursor = get_comments(story_id)
+        st.session_state[state_key] = {"comments": comments, "cursor": cursor}
+    thread = st.session_state[state_key]
+
+    if thread["comments"]:
+        st.markdown(render_comments_html(thread["comments"]), unsafe_allow_html=True)
+    else:
+        st.caption("No comments yet. Start the conversation!")
+
+    if thread["cursor"] is not None:
+        st.button("Load older comments", key=f"more_comments_{story_id}",
+                  on_click=_load_more_comments, args=(story_id, thread["cursor"]))
+
+    with st.form(f"comment_form_{story_id}", clear_on_submit=True):
+        st.text_area("Add a comment", max_chars=Config.COMMENT_MAX_LENGTH, height=80,
+                     key=f"comment_text_{story_id}")
+        st.form_submit_button("💬 Post Comment", on_click=_post_comment, args=(story_id,))
+
+    error = st.session_state.pop("comment_error", None)
+    if error:
+        st.error(f"❌ {error}")
+
+@timed("page.read_stories")
+@profiled("page.read_stories")
+def read_stories_page():
+    """Page to display all shared stories with their cover photos"""
+    
+    st.header("📖 Read Amazing Stories")
+    st.write("Discover inspiring stories shared by our community members!")
+
+    story_feed()
+
     # Footer information
     st.markdown("---")
     with st.expander("ℹ️ About StoryShare"):
@@ -1,10 +1,24 @@
+import math
 import streamlit as st
-import os
-from PIL import Image
 from datetime import datetime
+from src.config import Config
 from src.database import get_db_session, Story
+from src.images import validate_image, process_cover, make_preview
+from src.dedupe import minhash, find_similar, index_story, claim_signature, DuplicateStory
+from src.storage import get_storage
+from src.admission import TokenBucket, AdmissionRejected, get_write_limiter
+from src.instrumentation import timed
+from src.profiling import profiled
 import uuid
 
+def _submit_bucket():
+    """This session's submission token bucket"""
+    if "submit_bucket" not in st.session_state:
+        st.session_state.submit_bucket = TokenBucket()
+    return st.session_state.submit_bucket
+
+@timed("page.share_story")
+@profiled("page.share_story")
 def share_story_page():
     """Page for users to share their stories with mandatory cover photo upload"""
     
@@ -44,10 +58,18 @@ def share_story_page():
             help="Upload an image that represents your story. This will be shown as a thumbnail."
         )
         
-        # Preview uploaded image
+        # Check the upload from its header before decoding anything
+        upload_error = None
         if uploaded_file is not None:
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Cover Photo Preview", width=300)
+            try:
+                validate_image(uploaded_file)
+            except ValueError as e:
+                upload_error = str(e)  # Reported with the other form errors
+        
+        # Preview uploaded image, decoded at preview size
+        if uploaded_file is not None and upload_error is None:
+            st.image(make_preview(uploaded_file), caption="Cover Photo Preview", width=300)
+            uploaded_file.seek(0)
         
         submitted = st.form_submit_button("📤 Share Story", type="primary", use_container_width=True)
 
@@ -60,6 +82,25 @@ def share_story_page():
                 errors.append("Story content is required")
             if uploaded_file is None:
                 errors.append("Cover photo is required")
+            elif upload_error:
+                errors.append(upload_error)
+            
+            # Per-session rate limit, checked before any database work
+            if not errors:
+                try:
+                    _submit_bucket().take()
+                except AdmissionRejected as e:
+                    wait = math.ceil(e.retry_after or 60)
+                    errors.append(f"You're sharing stories very quickly. Please try again in {wait} seconds")
+            
+            # Near-duplicates of stored stories, e.g. a resubmission or a double click
+            signature = None
+            similar = []
+            if not errors:
+                signature = minhash(story_text.strip())
+                similar = find_similar(story_text.strip(), signature=signature)
+                if similar and similar[0].similarity >= Config.DEDUPE_BLOCK_THRESHOLD:
+                    errors.append(f"This story has already been shared as \"{similar[0].title}\"")
             
             if errors:
                 for error in errors:
@@ -71,43 +112,40 @@ def share_story_page():
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
-                # Save uploaded image
-                status_text.text("📁 Saving cover photo...")
-                progress_bar.progress(33)
-                
-                # Create unique filename
-                file_extension = uploaded_file.name.split('.')[-1]
-                unique_filename = f"{uuid.uuid4()}.{file_extension}"
-                image_path = os.path.join("data", "images", unique_filename)
-                
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(image_path), exist_ok=True)
-                
-                # Save the uploaded file
-                image = Image.open(uploaded_file)
-                # Resize image for better performance (max width 800px)
-                if image.width > 800:
-                    ratio = 800 / image.width
-                    new_height = int(image.height * ratio)
-                    image = image.resize((800, new_height), Image.Resampling.LANCZOS)
-                
-                image.save(image_path, optimize=True, quality=85)
+                # Image processing and the commit share a bounded number of slots
+                # per process; a burst of submissions waits its turn
+                def show_queue_position(position):
+                    status_text.text(f"⏳ Many stories are being shared right now. You are number {position} in line...")
 
-                # Save story to database
-                status_text.text("💾 Saving your story...")
-                progress_bar.progress(66)
+                with get_write_limiter("share_story").admit(on_wait=show_queue_position):
+                    # Save uploaded image
+                    status_text.text("📁 Saving cover photo...")
+                    progress_bar.progress(33)
+                    
+                    # Decode near the target size, resize to COVER_MAX_WIDTH and store
+                    # under a unique key; covers are always JPEG
+                    cover_bytes = process_cover(uploaded_file)
+                    image_key = get_storage().save(f"images/{uuid.uuid4()}.jpg", cover_bytes, "image/jpeg")
 
-                with get_db_session() as session:
-                    new_story = Story(
-                        title=title.strip(),
-                        transcript=story_text.strip(),
-                        category=category.lower().replace(' ', '_'),
-                        thumbnail_image_path=image_path,
-                        author_id=1,  # Default author for now
-                        summary=story_text.strip()[:200] + "..." if len(story_text.strip()) > 200 else story_text.strip()
-                    )
-                    session.add(new_story)
-                    session.commit()
+                    # Save story to database
+                    status_text.text("💾 Saving your story...")
+                    progress_bar.progress(66)
+
+                    with get_db_session() as session:
+                        # Checked again under a lock: an identical submission may have landed meanwhile
+                        similar = claim_signature(session, signature)
+                        new_story = Story(
+                            title=title.strip(),
+                            transcript=story_text.strip(),
+                            category=category.lower().replace(' ', '_'),
+                            thumbnail_image_path=image_key,
+                            author_id=1,  # Default author for now
+                            summary=story_text.strip()[:200] + "..." if len(story_text.strip()) > 200 else story_text.strip()
+                        )
+                        session.add(new_story)
+                        session.flush()
+                        index_story(session, new_story.id, new_story.transcript, signature)
+                        session.commit()
 
                 progress_bar.progress(100)
                 status_text.text("✅ Story shared successfully!")
@@ -119,19 +157,37 @@ def share_story_page():
                 st.info(f"📖 Title: {title}")
                 st.info(f"📂 Category: {category}")
                 st.info(f"📝 Story length: {len(story_text.strip())} characters")
+                if similar:
+                    titles = ", ".join(f'"{match.title}"' for match in similar)
+                    st.warning(f"⚠️ Your story looks similar to {titles}")
+
+            except DuplicateStory as e:
+                status_text.empty()
+                progress_bar.empty()
+                st.error(f"❌ {e}")
+                try:
+                    get_storage().delete(image_key)
+                except Exception:
+                    pass
+
+            except AdmissionRejected:
+                _submit_bucket().refund()  # Not the user's fault, don't count it against them
+                status_text.empty()
+                progress_bar.empty()
+                st.error("🚦 ElderWise is very busy right now. Please try sharing your story again in a minute.")
 
             except Exception as e:
                 st.error(f"❌ Error saving story: {str(e)}")
                 # Clean up image file if story save failed
-                if 'image_path' in locals() and os.path.exists(image_path):
+                if 'image_key' in locals():
                     try:
-                        os.remove(image_path)
+                        get_storage().delete(image_key)
                     except:
                         pass
 
     # Instructions section
     with st.expander("💡 Tips for Great Stories"):
-        st.markdown("""
+        st.markdown(f"""
         **📝 Writing Tips:**
         - Start with an engaging opening
         - Use descriptive language to paint a picture
@@ -142,5 +198,5 @@ def share_story_page():
         - Choose high-quality images
         - Ensure the photo relates to your story
         - Use landscape orientation for best results
-        - File size should be under 10MB
+        - JPEG or PNG, up to {Config.MAX_IMAGE_UPLOAD_MB}MB and {Config.MAX_IMAGE_PIXELS // 1_000_000} megapixels
         """)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Aggregate rerun profiles written by src/profiling.py
+
+pstats files are merged and summarized; collapsed stack files are merged into
+one file for flamegraph.pl or speedscope.
+"""
+
+import sys
+import argparse
+import pstats
+from collections import Counter
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+
+def find_profiles(directory, name, extension):
+    """Profile files in `directory`, optionally only for one profiled function"""
+    files = sorted(Path(directory).glob(f"*.{extension}"))
+    if name:
+        files = [path for path in files if f"-{name}-" in path.name]
+    return files
+
+def report_pstats(files, sort, limit, output):
+    """Merge pstats files and print the top functions"""
+    stats = pstats.Stats(str(files[0]))
+    for path in files[1:]:
+        stats.add(str(path))
+    print(f"📊 {len(files)} cProfile runs merged")
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    if output:
+        stats.dump_stats(output)
+        print(f"✅ Merged pstats written to {output}")
+
+def report_collapsed(files, limit, output):
+    """Merge collapsed stack files and print the hottest leaf frames"""
+    stacks = Counter()
+    for path in files:
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    total = sum(stacks.values()) or 1
+
+    print(f"📊 {len(files)} sampled runs merged, {total} samples")
+    for frame, count in leaves.most_common(limit):
+        print(f"   {100 * count / total:5.1f}%  {frame}")
+
+    if output:
+        with open(output, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"✅ Collapsed stacks written to {output} (flamegraph.pl / speedscope)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate ElderWise rerun profiles")
+    parser.add_argument("--dir", default=str(Config.PROFILE_DIR), help="Profile directory")
+    parser.add_argument("--name", help="Only include one profiled function, e.g. app.main")
+    parser.add_argument("--format", choices=["pstats", "collapsed"], default="pstats")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key")
+    parser.add_argument("--limit", type=int, default=30, help="Rows to print")
+    parser.add_argument("--output", help="Write the merged profile to this file")
+    args = parser.parse_args()
+
+    extension = "prof" if args.format == "pstats" else "collapsed"
+    files = find_profiles(args.dir, args.name, extension)
+    if not files:
+        print(f"ℹ️  No .{extension} files found in {args.dir}")
+        sys.exit(1)
+
+    if args.format == "pstats":
+        report_pstats(files, args.sort, args.limit, args.output)
+    else:
+        report_collapsed(files, args.limit, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Database and media restore for ElderWise
+
+Replaces every table with the contents of a backup taken by
+backup_database.py (the newest one by default) and puts back missing or
+changed media files. Stop the app and the workers first.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.backup import restore_backup, list_backups
+from backup_database import progress_printer
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore the database and media files from a backup")
+    parser.add_argument("backup", nargs="?", help="Backup directory (default: the newest one)")
+    parser.add_argument("--no-media", action="store_true", help="Only restore the database")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    args = parser.parse_args()
+
+    backup = args.backup or (list_backups() or [None])[-1]
+    if backup is None:
+        print("❌ No backups found")
+        sys.exit(1)
+
+    if not args.yes:
+        answer = input(f"⚠️  This replaces all data with {backup}. Type 'restore' to continue: ")
+        if answer.strip() != "restore":
+            print("Cancelled")
+            return
+
+    try:
+        result = restore_backup(backup, media=not args.no_media, on_progress=progress_printer())
+    except Exception as e:
+        print(f"❌ Restore failed: {e}")
+        sys.exit(1)
+
+    timings = result["timings"]
+    print(f"✅ Restored {result['path']}")
+    print(f"   Database in {timings['database']:.2f}s")
+    if "media" in timings:
+        print(f"   Media: {result['media_restored']} files put back in {timings['media']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Featured story scoring job for ElderWise
+
+Run once (e.g. from cron) or keep running with --every SECONDS.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database
+from src.scoring import run_scoring_job
+
+def run_once():
+    """Run a single scoring pass and print a short summary"""
+    started = time.perf_counter()
+    result = run_scoring_job()
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Scored {result['stories_rescored']} stories from "
+        f"{result['interactions_processed']} new interactions in {elapsed:.2f}s "
+        f"(watermark: {result['last_interaction_id']})"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Update featured story scores")
+    parser.add_argument(
+        "--every", type=int, nargs="?", const=Config.SCORE_JOB_INTERVAL_SECONDS, default=None,
+        help="Keep running and rescore every N seconds (default interval from SCORE_JOB_INTERVAL_SECONDS)"
+    )
+    args = parser.parse_args()
+
+    init_database()
+
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"❌ Scoring failed: {e}")
+            if args.every is None:
+                sys.exit(1)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
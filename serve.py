@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Production entry point for ElderWise
+
+Warms the process up, then starts Streamlit in the same process, so the
+first users are served from a warm connection pool and warm caches. Warm-up
+creates the tables, opens the pool's connections, and loads the first feed
+page with its thumbnails. Streamlit's /_stcore/health only answers once
+warm-up is done, which is what the Railway health check waits for.
+Arguments are passed on to `streamlit run app.py`:
+
+    python serve.py --server.port=$PORT --server.address=0.0.0.0 --server.headless=true
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.health import warm_up, register_health_checks
+from src.instrumentation import start_metrics_server
+
+def main():
+    register_health_checks()
+    start_metrics_server()  # /healthz and /readyz answer while warming up
+
+    started = time.perf_counter()
+    for attempt in range(1, Config.WARMUP_ATTEMPTS + 1):
+        try:
+            steps = warm_up()
+            break
+        except Exception as e:
+            print(f"❌ Warm-up attempt {attempt}/{Config.WARMUP_ATTEMPTS} failed: {e}")
+            if attempt == Config.WARMUP_ATTEMPTS:
+                sys.exit(1)
+            time.sleep(min(2 ** attempt, 30))
+    details = ", ".join(f"{name} {ms:.0f} ms" for name, ms in steps.items())
+    print(f"✅ Warm in {time.perf_counter() - started:.2f}s ({details})")
+
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", str(Path(__file__).parent / "app.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Set a user's sign-in password for ElderWise
+
+Elders need one to open their connection inbox. Run from the project root:
+    python set_password.py elder_user
+"""
+
+import sys
+import getpass
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.database import init_database
+from src.auth import set_password
+
+def main():
+    parser = argparse.ArgumentParser(description="Set a user's sign-in password")
+    parser.add_argument("username")
+    args = parser.parse_args()
+
+    password = getpass.getpass(f"New password for {args.username}: ")
+    if getpass.getpass("Repeat it: ") != password:
+        print("❌ The passwords do not match")
+        sys.exit(1)
+
+    init_database()
+    try:
+        if not set_password(args.username, password):
+            print(f"❌ No user named {args.username}")
+            sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Password set for {args.username}")
+
+if __name__ == "__main__":
+    main()
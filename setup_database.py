@@ -14,7 +14,7 @@ sys.path.append(str(Path(__file__).parent))
 from dotenv import load_dotenv
 load_dotenv()
 
-from src.database import init_database, get_db_session, User, Story, db_manager
+from src.database import init_database, get_db_session, get_db_manager, User, Story
 
 def setup_database():
     """Set up the database with initial data"""
@@ -24,7 +24,7 @@ def setup_database():
     try:
         # Drop all tables first
         print("⚠️  Dropping all existing tables...")
-        db_manager.drop_tables()
+        get_db_manager().drop_tables()
         print("✅ Tables dropped successfully.")
 
         # Initialize database
@@ -47,10 +47,8 @@ def setup_database():
                 print("ℹ️  Users already exist, skipping sample data creation")
                 
         print("🎉 Database setup completed successfully!")
-        print("\n📝 Default login credentials:")
-        print("   - Admin: admin / admin123")
-        print("   - Elder: margaret_smith / elder123") 
-        print("   - Seeker: alex_johnson / seeker123")
+        print("\n🔑 Sample users have no password. Give one before signing in:")
+        print("   python set_password.py margaret_smith")
         
     except Exception as e:
         print(f"❌ Database setup failed: {e}")
@@ -66,6 +64,7 @@ def create_sample_users(session):
         email='admin@elderwise.com',
         full_name='System Administrator',
         user_type='admin',
+        password_hash=None,  # Set with set_password.py
         profile_complete=True
     )
     session.add(admin)
@@ -76,6 +75,7 @@ def create_sample_users(session):
         email='margaret@example.com',
         full_name='Margaret Smith',
         user_type='elder',
+        password_hash=None,  # Set with set_password.py
         age=67,
         location='Portland, OR',
         bio='Retired teacher with 35 years of experience. Love sharing stories about education and family life.',
@@ -90,6 +90,7 @@ def create_sample_users(session):
         email='alex@example.com',
         full_name='Alex Johnson',
         user_type='seeker',
+        password_hash=None,  # Set with set_password.py
         age=24,
         location='San Francisco, CA',
         bio='Recent college graduate looking for career guidance and life advice.',
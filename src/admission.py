@@ -0,0 +1,174 @@
+"""
+Admission control for ElderWise application
+
+Sharing a story decodes and resizes a cover photo, writes it to media storage
+and commits to the database. A burst of submissions, or a stuck double click,
+could otherwise take every connection in the pool and starve readers. Two
+limits guard these heavy write paths:
+
+- A token bucket per session (SUBMIT_RATE_PER_MINUTE, SUBMIT_BURST) turns
+  away a session that submits faster than a person would.
+- A process-wide WriteLimiter lets HEAVY_WRITE_CONCURRENCY requests run at
+  once. The rest wait in a FIFO queue of at most HEAVY_WRITE_QUEUE_MAX.
+  Waiters see their position in the queue, and anyone still waiting after
+  HEAVY_WRITE_QUEUE_TIMEOUT_SECONDS is turned away.
+
+Admissions, rejections, waits, in-flight and queued requests are all
+recorded as metrics (see src/instrumentation.py).
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from src.config import Config
+
+class AdmissionRejected(Exception):
+    """A request was turned away; retry_after is a hint in seconds"""
+
+    def __init__(self, message, reason, retry_after=None):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+def _record_rejection(reason):
+    if Config.METRICS_ENABLED:
+        from src.instrumentation import registry
+        registry.increment(
+            "elderwise_admission_rejected_total", "reason", reason,
+            help_text="Heavy write requests turned away by admission control"
+        )
+
+class TokenBucket:
+    """Allows `burst` requests at once, refilled at `rate_per_minute`"""
+
+    def __init__(self, rate_per_minute=None, burst=None):
+        self.rate = (rate_per_minute if rate_per_minute is not None else Config.SUBMIT_RATE_PER_MINUTE) / 60.0
+        self.capacity = float(burst if burst is not None else Config.SUBMIT_BURST)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Use one token, or raise AdmissionRejected with the seconds until the next one"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            retry_after = (1 - self.tokens) / self.rate if self.rate > 0 else None
+        _record_rejection("rate_limited")
+        raise AdmissionRejected("Too many submissions", "rate_limited", retry_after)
+
+    def refund(self):
+        """Give back a token, e.g. when the request failed validation"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+class WriteLimiter:
+    """Bounded concurrency with a bounded FIFO queue for one kind of heavy write"""
+
+    def __init__(self, name, limit=None, max_queue=None, timeout=None):
+        self.name = name
+        self.limit = max(1, limit or Config.HEAVY_WRITE_CONCURRENCY)
+        self.max_queue = max_queue if max_queue is not None else Config.HEAVY_WRITE_QUEUE_MAX
+        self.timeout = timeout if timeout is not None else Config.HEAVY_WRITE_QUEUE_TIMEOUT_SECONDS
+        self.in_flight = 0
+        self._waiters = []  # Tickets in arrival order
+        self._condition = threading.Condition()
+
+    def _publish_gauges(self):
+        if Config.METRICS_ENABLED:
+            from src.instrumentation import registry
+            registry.set_gauge(
+                "elderwise_admission_in_flight", "path", self.name, self.in_flight,
+                help_text="Heavy write requests running now"
+            )
+            registry.set_gauge(
+                "elderwise_admission_queued", "path", self.name, len(self._waiters),
+                help_text="Heavy write requests waiting for a slot"
+            )
+
+    def _acquire(self, on_wait):
+        started = time.monotonic()
+        ticket = object()
+        with self._condition:
+            if not self._waiters and self.in_flight < self.limit:
+                self.in_flight += 1
+                self._publish_gauges()
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                _record_rejection("queue_full")
+                raise AdmissionRejected("The server is busy", "queue_full", self.timeout)
+            self._waiters.append(ticket)
+            self._publish_gauges()
+            reported = None
+            try:
+                while True:
+                    position = self._waiters.index(ticket)
+                    if position == 0 and self.in_flight < self.limit:
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        _record_rejection("queue_timeout")
+                        raise AdmissionRejected("The server is busy", "queue_timeout", self.timeout)
+                    if on_wait is not None and position != reported:
+                        reported = position
+                        self._condition.release()  # Callbacks may draw UI, don't hold up the queue
+                        try:
+                            on_wait(position + 1)
+                        finally:
+                            self._condition.acquire()
+                        continue
+                    self._condition.wait(remaining)
+            finally:
+                self._waiters.remove(ticket)
+                self._condition.notify_all()  # Positions moved up
+                self._publish_gauges()
+            self.in_flight += 1
+            self._publish_gauges()
+        return time.monotonic() - started
+
+    def _release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._publish_gauges()
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, on_wait=None):
+        """Hold a slot for the block.
+
+        When every slot is taken, on_wait(position) is called each time the
+        caller's place in the queue changes (1 is next). Raises
+        AdmissionRejected when the queue is full or the wait times out.
+        """
+        waited = self._acquire(on_wait)
+        if Config.METRICS_ENABLED:
+            from src.instrumentation import registry
+            registry.histogram(
+                "elderwise_admission_wait_seconds", "path", self.name,
+                "Time heavy write requests spent queued for a slot"
+            ).observe(waited)
+            registry.increment(
+                "elderwise_admission_admitted_total", "path", self.name,
+                help_text="Heavy write requests admitted"
+            )
+        try:
+            yield
+        finally:
+            self._release()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_write_limiter(name):
+    """Process-wide limiter for one heavy write path, e.g. 'share_story'"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(name, WriteLimiter(name))
+    return limiter
@@ -0,0 +1,230 @@
+"""
+Category analytics for ElderWise application
+
+category_daily_stats holds one row per category and day with the stories
+created and the views, likes and shares they received that day. A job folds
+new stories and interactions into it using high-water marks on their ids, so
+the admin dashboard reads a table whose size depends on the number of
+categories and days, not on the number of stories or events.
+
+Runs lock their watermarks and add their counts in the database
+(col = col + excluded.col), so overlapping runs never count a row twice.
+Rows younger than WATERMARK_COMMIT_LAG_SECONDS wait for the next run, as
+in src/scoring.py.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy import select, func
+from src.database import (
+    get_db_session, dialect_insert, Story, StoryInteraction, StoryDailyStats, CategoryDailyStats, JobWatermark,
+)
+from src.scoring import get_watermark, settled_id
+
+# Watermark names in the job_watermarks table
+STORIES_WATERMARK = 'category_stats.stories'
+INTERACTIONS_WATERMARK = 'category_stats.interactions'
+
+# Interaction type -> CategoryDailyStats column
+COUNTED_INTERACTIONS = {'view': 'views', 'like': 'likes', 'share': 'shares'}
+STAT_COLUMNS = ('stories_created', 'views', 'likes', 'shares')
+
+UNCATEGORIZED = 'uncategorized'
+
+class CategoryStatsRow(NamedTuple):
+    """Totals for one category over a period"""
+    category: str
+    stories_created: int
+    views: int
+    likes: int
+    shares: int
+
+class DailyStatsRow(NamedTuple):
+    """Totals across categories for one day"""
+    day: date
+    stories_created: int
+    views: int
+    likes: int
+    shares: int
+
+def _as_date(value):
+    # SQLite returns date() as text
+    return datetime.strptime(value, "%Y-%m-%d").date() if isinstance(value, str) else value
+
+def _id_ranges(last_id, max_id, batch_size):
+    """Yield (lower, upper] id ranges from `last_id` up to `max_id`"""
+    while last_id < max_id:
+        upper = min(last_id + batch_size, max_id)
+        yield last_id, upper
+        last_id = upper
+
+def add_category_stats(session, increments):
+    """Add {(category, day): {column: count}} to category_daily_stats in the caller's transaction.
+
+    Counts may be negative. Each row is one INSERT ... ON CONFLICT DO UPDATE,
+    so the addition happens in the database, not as a read-modify-write.
+    """
+    if not increments:
+        return
+    rows = [
+        {'category': category, 'day': day, **{column: counts.get(column, 0) for column in STAT_COLUMNS}}
+        for (category, day), counts in increments.items()
+    ]
+    statement = dialect_insert(session, CategoryDailyStats)
+    table = CategoryDailyStats.__table__
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=['category', 'day'],
+            set_={column: table.c[column] + statement.excluded[column] for column in STAT_COLUMNS},
+        ),
+        rows,
+    )
+
+def move_merged_story_stats(session, keep, duplicates):
+    """Correct category_daily_stats before `duplicates` are merged into `keep`.
+
+    The duplicates' stories already folded are no longer created, and their
+    folded views, likes and shares (including compacted views) move to the
+    kept story's category. Run before their interactions are moved; takes
+    both watermarks so it doesn't interleave with update_category_stats.
+    """
+    increments = {}
+
+    def add(category, day, column, count):
+        key = (category or UNCATEGORIZED, _as_date(day))
+        bucket = increments.setdefault(key, dict.fromkeys(STAT_COLUMNS, 0))
+        bucket[column] += count
+
+    stories_mark = get_watermark(session, STORIES_WATERMARK)
+    interactions_mark = get_watermark(session, INTERACTIONS_WATERMARK)
+    keep_category = session.execute(select(Story.category).where(Story.id == keep)).scalar_one()
+
+    rows = session.execute(
+        select(Story.category, func.date(Story.created_at), func.count())
+        .where(Story.id.in_(duplicates), Story.id <= (stories_mark.last_id or 0))
+        .group_by(Story.category, func.date(Story.created_at))
+    )
+    for category, day, count in rows:
+        add(category, day, 'stories_created', -count)
+
+    interaction_day = func.date(StoryInteraction.created_at)
+    rows = session.execute(
+        select(Story.category, interaction_day, StoryInteraction.interaction_type, func.count())
+        .join(Story, Story.id == StoryInteraction.story_id)
+        .where(
+            StoryInteraction.story_id.in_(duplicates),
+            StoryInteraction.id <= (interactions_mark.last_id or 0),
+            StoryInteraction.interaction_type.in_(COUNTED_INTERACTIONS),
+            Story.category != keep_category,
+        )
+        .group_by(Story.category, interaction_day, StoryInteraction.interaction_type)
+    )
+    moved = [(category, day, COUNTED_INTERACTIONS[kind], count) for category, day, kind, count in rows]
+    # Compacted views were folded before compaction removed their events
+    rows = session.execute(
+        select(Story.category, StoryDailyStats.day, func.sum(StoryDailyStats.views))
+        .join(Story, Story.id == StoryDailyStats.story_id)
+        .where(StoryDailyStats.story_id.in_(duplicates), Story.category != keep_category)
+        .group_by(Story.category, StoryDailyStats.day)
+    )
+    moved += [(category, day, 'views', count) for category, day, count in rows]
+    for category, day, column, count in moved:
+        add(category, day, column, -count)
+        add(keep_category, day, column, count)
+
+    add_category_stats(session, increments)
+
+def update_category_stats(batch_size=5000):
+    """Fold stories and interactions added since the last run into category_daily_stats"""
+    increments = {}  # (category, day) -> {column: count}
+
+    def add(category, day, column, count):
+        if day is None:
+            return
+        key = (category or UNCATEGORIZED, _as_date(day))
+        bucket = increments.setdefault(key, dict.fromkeys(STAT_COLUMNS, 0))
+        bucket[column] += count
+
+    with get_db_session() as session:
+        stories_mark = get_watermark(session, STORIES_WATERMARK)
+        interactions_mark = get_watermark(session, INTERACTIONS_WATERMARK)
+
+        story_day = func.date(Story.created_at)
+        last_id = stories_mark.last_id or 0
+        settled = settled_id(session, Story.id, Story.created_at, last_id)
+        for lower, upper in _id_ranges(last_id, settled, batch_size):
+            rows = session.execute(
+                select(Story.category, story_day, func.count())
+                .where(Story.id > lower, Story.id <= upper)
+                .group_by(Story.category, story_day)
+            )
+            for category, day, count in rows:
+                add(category, day, 'stories_created', count)
+            stories_mark.last_id = upper
+
+        interaction_day = func.date(StoryInteraction.created_at)
+        last_id = interactions_mark.last_id or 0
+        settled = settled_id(session, StoryInteraction.id, StoryInteraction.created_at, last_id)
+        for lower, upper in _id_ranges(last_id, settled, batch_size):
+            rows = session.execute(
+                select(Story.category, interaction_day, StoryInteraction.interaction_type, func.count())
+                .join(Story, Story.id == StoryInteraction.story_id)
+                .where(
+                    StoryInteraction.id > lower,
+                    StoryInteraction.id <= upper,
+                    StoryInteraction.interaction_type.in_(COUNTED_INTERACTIONS),
+                )
+                .group_by(Story.category, interaction_day, StoryInteraction.interaction_type)
+            )
+            for category, day, interaction_type, count in rows:
+                add(category, day, COUNTED_INTERACTIONS[interaction_type], count)
+            interactions_mark.last_id = upper
+
+        # Apply the increments; the watermarks move in the same transaction
+        add_category_stats(session, increments)
+        session.commit()
+
+        return {
+            'rows_updated': len(increments),
+            'last_story_id': stories_mark.last_id or 0,
+            'last_interaction_id': interactions_mark.last_id or 0,
+        }
+
+def unfolded_views_since(session):
+    """created_at of the oldest view update_category_stats has not counted yet, or None"""
+    mark = session.get(JobWatermark, INTERACTIONS_WATERMARK)
+    last_id = (mark.last_id or 0) if mark else 0
+    return session.execute(
+        select(func.min(StoryInteraction.created_at))
+        .where(StoryInteraction.id > last_id, StoryInteraction.interaction_type == 'view')
+    ).scalar()
+
+def _period_start(days, today):
+    today = today or datetime.utcnow().date()
+    return today - timedelta(days=days - 1)
+
+def get_category_totals(days=30, today=None):
+    """Per-category totals for the last `days` days, most viewed first"""
+    sums = [func.coalesce(func.sum(getattr(CategoryDailyStats, column)), 0) for column in STAT_COLUMNS]
+    query = (
+        select(CategoryDailyStats.category, *sums)
+        .where(CategoryDailyStats.day >= _period_start(days, today))
+        .group_by(CategoryDailyStats.category)
+    )
+    with get_db_session() as session:
+        rows = [CategoryStatsRow(row[0], *(int(value) for value in row[1:])) for row in session.execute(query)]
+    return sorted(rows, key=lambda row: (-row.views, row.category))
+
+def get_daily_totals(days=30, today=None, category=None):
+    """Totals per day for the last `days` days (oldest first), optionally for one category"""
+    sums = [func.coalesce(func.sum(getattr(CategoryDailyStats, column)), 0) for column in STAT_COLUMNS]
+    query = (
+        select(CategoryDailyStats.day, *sums)
+        .where(CategoryDailyStats.day >= _period_start(days, today))
+        .group_by(CategoryDailyStats.day)
+        .order_by(CategoryDailyStats.day)
+    )
+    if category:
+        query = query.where(CategoryDailyStats.category == category)
+    with get_db_session() as session:
+        return [DailyStatsRow(row[0], *(int(value) for value in row[1:])) for row in session.execute(query)]
@@ -1,12 +1,66 @@
 """
-Simple session management for ElderWise (without authentication)
+Simple session management for ElderWise
+
+Browsing and sharing need no account. Actions on a user's behalf, such as
+answering an elder's connection requests, need that user to sign in with the
+password stored (as a bcrypt hash) in users.password_hash.
 """
 
-import streamlit as st
-from typing import Dict, Any
+import bcrypt
+from typing import Dict, Any, NamedTuple, Optional
+
+class SignedInUser(NamedTuple):
+    """The user a session acts for"""
+    id: int
+    username: str
+    full_name: Optional[str]
+    user_type: str
+
+def hash_password(password):
+    """Hash a password for users.password_hash"""
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("ascii")
+
+def verify_password(password, password_hash):
+    """Check a password against a hash from hash_password()"""
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), (password_hash or "").encode("ascii"))
+    except ValueError:
+        return False
+
+def authenticate(username, password):
+    """The SignedInUser for a username and password, or None"""
+    from sqlalchemy import select
+    from src.database import get_db_session, User
+
+    query = select(User.id, User.username, User.full_name, User.user_type, User.password_hash).where(
+        User.username == (username or "").strip()
+    )
+    with get_db_session() as session:
+        row = session.execute(query).first()
+    if row is None or not password or not verify_password(password, row.password_hash):
+        return None
+    return SignedInUser(row.id, row.username, row.full_name, row.user_type)
+
+def set_password(username, password):
+    """Store a new password for a user; returns whether the user exists"""
+    from sqlalchemy import update
+    from src.database import get_db_session, User
+
+    if len(password or "") < 8:
+        raise ValueError("Passwords must be at least 8 characters")
+    if len(password.encode("utf-8")) > 72:
+        raise ValueError("Passwords must be at most 72 bytes")  # bcrypt's limit
+    with get_db_session() as session:
+        result = session.execute(
+            update(User).where(User.username == username).values(password_hash=hash_password(password))
+        )
+        session.commit()
+    return result.rowcount > 0
 
 def init_session_state():
     """Initialize a mock user session state."""
+    import streamlit as st  # Only the app needs it; CLI tools hash passwords without it
+
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = True
     if 'user' not in st.session_state:
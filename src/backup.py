@@ -0,0 +1,403 @@
+"""
+Online backup and restore for ElderWise application
+
+Copying data/elderwise.db while the app writes can produce a torn file, so
+backups never read the database files directly:
+
+- SQLite is copied with the online backup API, BACKUP_PAGES_PER_STEP pages
+  at a time. The copy pauses BACKUP_STEP_SLEEP_MS between steps so writers
+  get the lock. Each write from another connection restarts the copy. After
+  BACKUP_MAX_RESTARTS restarts, the rest is copied in one step.
+- PostgreSQL is exported table by table with COPY inside one read-only
+  REPEATABLE READ snapshot, so it needs no client binaries and takes no
+  locks writers wait on. The result is streamed to a gzipped plain SQL file
+  in the format of `pg_dump --data-only`, which psql can also load into a
+  schema created by init_database(). Only model tables are exported: the
+  story_interactions_archive_YYYYMM tables hold views that are already
+  counted in story_daily_stats. A restore drops, recreates and loads the
+  tables in one transaction, so a failed restore leaves the database as it
+  was.
+
+Media files (images/, audio/) are stored by SHA-256 in objects/ under
+BACKUP_DIR, shared by all backups. Each backup has a media.json that maps
+keys to hashes, so only new or changed files are copied. A file is only
+re-hashed if its size or mtime changed since the previous backup.
+
+Each backup is a timestamped directory with backup.json, which records what
+was copied and how long each phase took.
+"""
+
+import io
+import os
+import json
+import gzip
+import time
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy.engine import make_url
+from src.config import Config
+from src.database import Base, get_db_manager
+
+MANIFEST_NAME = "backup.json"
+MEDIA_MANIFEST_NAME = "media.json"
+SQLITE_FILE = "database.sqlite3"
+POSTGRES_FILE = "database.sql.gz"
+OBJECTS_DIR = "objects"
+
+class _BackupRestarted(Exception):
+    """The SQLite source kept changing under an incremental copy"""
+
+def _backup_root(backup_dir=None):
+    return Path(backup_dir or Config.BACKUP_DIR)
+
+def list_backups(backup_dir=None):
+    """Completed backup directories, oldest first"""
+    root = _backup_root(backup_dir)
+    if not root.is_dir():
+        return []
+    return sorted(path for path in root.iterdir() if (path / MANIFEST_NAME).is_file())
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# SQLite
+
+def _sqlite_path():
+    url = make_url(Config.get_database_url())
+    if not url.database or url.database == ":memory:":
+        raise ValueError("Only file-based SQLite databases can be backed up")
+    return url.database
+
+def _sqlite_copy(source, target, pages, on_progress=None):
+    """Copy one SQLite connection's database into another; returns (steps, restarts)"""
+    state = {"steps": 0, "restarts": 0, "remaining": None}
+
+    def progress(status, remaining, total):
+        state["steps"] += 1
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1  # Another connection wrote to the source
+            if pages > 0 and state["restarts"] > Config.BACKUP_MAX_RESTARTS:
+                raise _BackupRestarted(state["restarts"])
+        state["remaining"] = remaining
+        if on_progress is not None and total:
+            on_progress((total - remaining) / total)
+        if pages > 0 and remaining:
+            # No lock is held between steps; sqlite3 would otherwise start the next one at once
+            time.sleep(Config.BACKUP_STEP_SLEEP_MS / 1000)
+
+    source.backup(target, pages=pages, progress=progress)
+    return state["steps"], state["restarts"]
+
+def _backup_sqlite(destination, on_progress=None):
+    target_path = destination / SQLITE_FILE
+    source = sqlite3.connect(_sqlite_path(), timeout=30)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            steps, restarts = _sqlite_copy(source, target, Config.BACKUP_PAGES_PER_STEP, on_progress)
+            mode = "incremental"
+        except _BackupRestarted as e:
+            # Writers are too busy for the copy to finish; take the rest under one read lock
+            steps, restarts = _sqlite_copy(source, target, -1, on_progress)
+            restarts += e.args[0]
+            mode = "single step"
+        target.execute("PRAGMA integrity_check").fetchone()
+    finally:
+        target.close()
+        source.close()
+    return {
+        "file": SQLITE_FILE,
+        "bytes": target_path.stat().st_size,
+        "steps": steps,
+        "restarts": restarts,
+        "mode": mode,
+    }
+
+def _restore_sqlite(source_path, on_progress=None):
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(_sqlite_path(), timeout=30)
+    try:
+        _sqlite_copy(source, target, -1, on_progress)  # The app is stopped; one step is fastest
+    finally:
+        target.close()
+        source.close()
+
+# PostgreSQL
+
+def _detached_connection():
+    """A psycopg2 connection of our own, outside the pool"""
+    raw = get_db_manager().engine.raw_connection()
+    connection = raw.driver_connection  # Read before detach(), which clears it
+    raw.detach()
+    return connection
+
+def _copy_columns(table, preparer):
+    return ", ".join(preparer.quote(column.name) for column in table.columns)
+
+def _backup_postgres(destination, on_progress=None):
+    preparer = get_db_manager().engine.dialect.identifier_preparer
+    tables = Base.metadata.sorted_tables  # Dependency order, so the restore satisfies foreign keys
+    connection = _detached_connection()
+    rows = {}
+    try:
+        connection.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        cursor = connection.cursor()
+        with gzip.open(destination / POSTGRES_FILE, "wb", compresslevel=Config.BACKUP_GZIP_LEVEL) as out:
+            out.write(b"-- ElderWise data export (pg_dump --data-only format)\n")
+            out.write(b"SET client_encoding = 'UTF8';\n\n")
+            for index, table in enumerate(tables):
+                name = preparer.quote(table.name)
+                columns = _copy_columns(table, preparer)
+                out.write(f"COPY public.{name} ({columns}) FROM stdin;\n".encode("utf-8"))
+                # A query, because COPY cannot read a partitioned table directly
+                cursor.copy_expert(f"COPY (SELECT {columns} FROM {name}) TO STDOUT", out)
+                out.write(b"\\.\n\n")
+                rows[table.name] = cursor.rowcount
+
+                # Serial ids carry on from the restored rows, as in pg_dump
+                id_column = table.columns.get("id")
+                if id_column is not None and id_column.primary_key and rows[table.name]:
+                    cursor.execute(f"SELECT max(id) FROM {name}")
+                    out.write(
+                        f"SELECT pg_catalog.setval(pg_get_serial_sequence('public.{name}', 'id'), "
+                        f"{cursor.fetchone()[0]}, true);\n\n".encode("utf-8")
+                    )
+                if on_progress is not None:
+                    on_progress((index + 1) / len(tables))
+        connection.rollback()
+    finally:
+        connection.close()
+    return {
+        "file": POSTGRES_FILE,
+        "bytes": (destination / POSTGRES_FILE).stat().st_size,
+        "rows": rows,
+    }
+
+class _CopyData(io.RawIOBase):
+    """The data lines of one COPY block, read lazily from the export up to its \\. line"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = b""
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            line = next(self.lines, b"\\.\n")
+            if line == b"\\.\n":
+                self.finished = True
+            else:
+                self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+def _restore_postgres(source_path, on_progress=None):
+    """Drop, recreate and load every table in one transaction; any error rolls it all back"""
+    manager = get_db_manager()
+    table_count = len(Base.metadata.sorted_tables)
+    restored = 0
+    with manager.engine.connect() as connection:
+        try:
+            manager.drop_tables(connection)
+            manager.create_tables(connection)
+            cursor = connection.connection.driver_connection.cursor()  # Same transaction as the DDL
+            with gzip.open(source_path, "rb") as f:
+                lines = iter(f)
+                for line in lines:
+                    statement = line.decode("utf-8").strip()
+                    if not statement or statement.startswith("--"):
+                        continue
+                    if statement.startswith("COPY "):
+                        cursor.copy_expert(statement.replace(" FROM stdin;", " FROM STDIN"), _CopyData(lines))
+                        restored += 1
+                        if on_progress is not None:
+                            on_progress(restored / table_count)
+                    else:
+                        cursor.execute(statement)
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+
+# Media
+
+def _media_files():
+    """(key, path) for every local media file that is backed up"""
+    if Config.MEDIA_STORAGE != "local":
+        return
+    root = Config.MEDIA_ROOT
+    for directory in Config.BACKUP_MEDIA_DIRS:
+        base = root / directory
+        if not base.is_dir():
+            continue
+        for path in sorted(base.rglob("*")):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                yield path.relative_to(root).as_posix(), path
+
+def _read_media_manifest(backup):
+    try:
+        with open(backup / MEDIA_MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _object_path(root, sha256):
+    return root / OBJECTS_DIR / sha256[:2] / sha256
+
+def _backup_media(root, destination, previous):
+    """Copy new and changed media into the shared object store; returns stats"""
+    manifest = {}
+    copied = copied_bytes = hashed = total_bytes = 0
+    for key, path in _media_files():
+        stat = path.stat()
+        known = previous.get(key)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            sha256 = known["sha256"]
+        else:
+            sha256 = _file_sha256(path)
+            hashed += 1
+        target = _object_path(root, sha256)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = target.with_suffix(".tmp")
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, target)
+            copied += 1
+            copied_bytes += stat.st_size
+        manifest[key] = {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        total_bytes += stat.st_size
+
+    with open(destination / MEDIA_MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f)
+    return {
+        "files": len(manifest),
+        "bytes": total_bytes,
+        "hashed": hashed,
+        "copied": copied,
+        "copied_bytes": copied_bytes,
+    }
+
+def _restore_media(root, backup):
+    """Put back media files that are missing or differ; existing extra files are kept"""
+    restored = 0
+    for key, entry in _read_media_manifest(backup).items():
+        target = Config.MEDIA_ROOT / key
+        if target.is_file() and target.stat().st_size == entry["size"] and _file_sha256(target) == entry["sha256"]:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(_object_path(root, entry["sha256"]), target)
+        restored += 1
+    return restored
+
+def prune_backups(keep=None, backup_dir=None):
+    """Delete all but the newest `keep` backups and the media objects only they used"""
+    keep = Config.BACKUP_KEEP if keep is None else keep
+    root = _backup_root(backup_dir)
+    backups = list_backups(root)
+    if not keep or len(backups) <= keep:
+        return 0
+    removed = backups[:-keep]
+    for backup in removed:
+        shutil.rmtree(backup)
+
+    referenced = set()
+    for backup in backups[-keep:]:
+        referenced.update(entry["sha256"] for entry in _read_media_manifest(backup).values())
+    objects = root / OBJECTS_DIR
+    if objects.is_dir():
+        for path in objects.glob("*/*"):
+            if path.name not in referenced:
+                path.unlink()
+    return len(removed)
+
+# Entry points
+
+def create_backup(backup_dir=None, media=True, on_progress=None):
+    """Back up the database (and local media) into a new timestamped directory.
+
+    on_progress(phase, fraction) is called as the copy advances. Returns the
+    backup.json contents, including timings.
+    """
+    root = _backup_root(backup_dir)
+    started_at = datetime.utcnow()
+    destination = root / started_at.strftime("%Y%m%dT%H%M%S%fZ")
+    destination.mkdir(parents=True)
+    dialect = get_db_manager().engine.dialect.name
+    report = {"created_at": started_at.isoformat(), "dialect": dialect, "timings": {}}
+
+    def progress(phase):
+        return (lambda fraction: on_progress(phase, fraction)) if on_progress else None
+
+    try:
+        started = time.perf_counter()
+        if dialect == "sqlite":
+            report["database"] = _backup_sqlite(destination, progress("database"))
+        elif dialect == "postgresql":
+            report["database"] = _backup_postgres(destination, progress("database"))
+        else:
+            raise ValueError(f"Backups are not supported for {dialect} databases")
+        report["timings"]["database"] = round(time.perf_counter() - started, 3)
+
+        if media:
+            started = time.perf_counter()
+            previous = list_backups(root)
+            report["media"] = _backup_media(root, destination, _read_media_manifest(previous[-1]) if previous else {})
+            report["timings"]["media"] = round(time.perf_counter() - started, 3)
+    except BaseException:
+        shutil.rmtree(destination, ignore_errors=True)  # Never leave a half-written backup behind
+        raise
+
+    # Written last: a directory without backup.json is not a backup
+    with open(destination / MANIFEST_NAME, "w") as f:
+        json.dump(report, f, indent=2)
+    report["path"] = str(destination)
+    report["pruned"] = prune_backups(backup_dir=root)
+    return report
+
+def restore_backup(backup=None, backup_dir=None, media=True, on_progress=None):
+    """Restore the database (and media) from a backup directory, the newest by default.
+
+    Replaces every table, so stop the app and workers first. Returns timings.
+    """
+    root = _backup_root(backup_dir)
+    if backup is None:
+        backups = list_backups(root)
+        if not backups:
+            raise ValueError(f"No backups in {root}")
+        backup = backups[-1]
+    backup = Path(backup)
+    with open(backup / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+
+    dialect = get_db_manager().engine.dialect.name
+    if dialect != manifest["dialect"]:
+        raise ValueError(f"Backup is from {manifest['dialect']}, the database is {dialect}")
+
+    timings = {}
+    started = time.perf_counter()
+    phase_progress = (lambda fraction: on_progress("database", fraction)) if on_progress else None
+    if dialect == "sqlite":
+        _restore_sqlite(backup / manifest["database"]["file"], phase_progress)
+    else:
+        _restore_postgres(backup / manifest["database"]["file"], phase_progress)
+    timings["database"] = round(time.perf_counter() - started, 3)
+
+    restored_media = 0
+    if media and (backup / MEDIA_MANIFEST_NAME).is_file():
+        started = time.perf_counter()
+        restored_media = _restore_media(root, backup)
+        timings["media"] = round(time.perf_counter() - started, 3)
+
+    return {"path": str(backup), "media_restored": restored_media, "timings": timings}
@@ -0,0 +1,280 @@
+"""
+Cross-process change feed for ElderWise application
+
+Several Streamlit processes can serve the app at once, so anything cached in
+one process goes stale when another one commits. On PostgreSQL, triggers on
+the watched tables send a NOTIFY for every committed change and a listener
+thread in each process invalidates its caches. Other databases fall back to
+polling watermarks: Story.updated_at and, for connections, the latest
+request, answer and read time, each with the row count for deletes.
+Commits made by this process are applied locally straight away.
+
+Read APIs opt in with @versioned_cache(table). Their results are kept until
+the table changes, and are only cached while the listener is running.
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from functools import wraps
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'elderwise_changes'
+WATCHED_TABLES = ('stories', 'connections')
+
+_versions = {table: 0 for table in WATCHED_TABLES}
+_subscribers = {table: [] for table in WATCHED_TABLES}
+_lock = threading.Lock()
+
+def table_version(table):
+    """Number of changes seen for `table` by this process"""
+    return _versions.get(table, 0)
+
+def subscribe(table, callback):
+    """Call callback(event) for every change to `table`.
+
+    event is a dict with 'table', 'op' and, when known, 'id' and 'elder_id'.
+    """
+    with _lock:
+        _subscribers.setdefault(table, []).append(callback)
+
+def publish(event):
+    """Bump the table's version and notify the subscribers in this process"""
+    table = event.get('table')
+    if table not in _versions:
+        return
+    with _lock:
+        _versions[table] += 1
+        callbacks = list(_subscribers.get(table, ()))
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            logger.warning("Change feed subscriber failed for %s: %s", table, e)
+    if Config.METRICS_ENABLED:
+        from src.instrumentation import registry
+        registry.increment(
+            "elderwise_change_feed_events_total", "table", table,
+            help_text="Table changes applied to this process's caches"
+        )
+
+def _publish_all(op):
+    """Treat every watched table as changed, e.g. after missing events"""
+    for table in WATCHED_TABLES:
+        publish({'table': table, 'op': op})
+
+# Cached reads
+
+_MAX_CACHED_ENTRIES = 256
+
+def versioned_cache(table):
+    """Cache a read function's results until `table` changes.
+
+    Results are shared between sessions, so they must be immutable (tuples,
+    NamedTuples, lists nobody mutates). CHANGE_FEED_CACHE_SECONDS bounds how
+    long an entry can live if an event is lost.
+    """
+    def decorator(func):
+        cache = {}  # args -> (version, expiry, value)
+        cache_lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not listener_running():
+                return func(*args, **kwargs)
+            key = (args, tuple(sorted(kwargs.items())))
+            version, now = table_version(table), time.monotonic()
+            entry = cache.get(key)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                return entry[2]
+            value = func(*args, **kwargs)
+            with cache_lock:
+                if len(cache) >= _MAX_CACHED_ENTRIES:
+                    cache.clear()
+                cache[key] = (version, now + Config.CHANGE_FEED_CACHE_SECONDS, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_entries = lambda: len(cache)
+        return wrapper
+    return decorator
+
+# Local commits
+
+_WRITE_STATEMENT = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    match = _WRITE_STATEMENT.match(statement)
+    if match and match.group(1).lower() in _versions:
+        conn.info.setdefault('changed_tables', set()).add(match.group(1).lower())
+
+def _after_commit(conn):
+    for table in conn.info.pop('changed_tables', ()):
+        publish({'table': table, 'op': 'COMMIT'})
+
+def _after_rollback(conn):
+    conn.info.pop('changed_tables', None)
+
+def install_commit_hooks(engine):
+    """Publish this process's own committed writes without waiting for the feed (idempotent)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "commit", _after_commit)
+        event.listen(engine, "rollback", _after_rollback)
+
+# PostgreSQL triggers
+
+TRIGGER_FUNCTION_DDL = f"""
+CREATE OR REPLACE FUNCTION elderwise_notify_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+    PERFORM pg_notify('{CHANNEL}', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', row_data -> 'id',
+        'elder_id', row_data -> 'elder_id'
+    )::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+def install_change_triggers(bind):
+    """Create the NOTIFY triggers on the watched tables (PostgreSQL, idempotent).
+
+    Existing triggers are left alone: creating one locks its table against
+    writes, so it only happens the first time.
+    """
+    from sqlalchemy import text
+    from src.database import begin
+
+    with begin(bind) as connection:
+        connection.execute(text(TRIGGER_FUNCTION_DDL))
+        installed = set(connection.execute(text(
+            "SELECT c.relname FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+            "WHERE t.tgname = c.relname || '_notify_change' AND NOT t.tgisinternal"
+        )).scalars())
+        for table in WATCHED_TABLES:
+            if table in installed:
+                continue
+            connection.execute(text(
+                f"CREATE TRIGGER {table}_notify_change AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION elderwise_notify_change()"
+            ))
+
+# Listener
+
+class ChangeListener(threading.Thread):
+    """Daemon thread applying changes committed by other processes"""
+
+    def __init__(self, engine):
+        super().__init__(name="change-feed", daemon=True)
+        self.engine = engine
+        self._stopping = threading.Event()  # Not _stop, which Thread.join() relies on
+
+    def stop(self, timeout=None):
+        """Ask the thread to finish and wait for it"""
+        self._stopping.set()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join(timeout)
+
+    def run(self):
+        backoff = 1
+        while not self._stopping.is_set():
+            try:
+                if self.engine.dialect.name == 'postgresql':
+                    self._listen()
+                else:
+                    self._poll()
+            except Exception as e:
+                logger.warning("Change feed listener failed, retrying in %ss: %s", backoff, e)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30)
+                # Events may have been missed while disconnected
+                _publish_all('RESYNC')
+
+    def _listen(self):
+        import select
+
+        # A dedicated connection, detached from the pool, that only listens
+        connection = self.engine.raw_connection()
+        dbapi_connection = connection.driver_connection
+        connection.detach()
+        try:
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            logger.info("Listening for changes on %s", CHANNEL)
+            while not self._stopping.is_set():
+                ready, _, _ = select.select([dbapi_connection], [], [], Config.CHANGE_FEED_POLL_SECONDS)
+                if not ready:
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    try:
+                        publish(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning("Ignoring malformed change event: %s", notify.payload)
+        finally:
+            connection.close()
+
+    def _poll(self):
+        from sqlalchemy import select, func
+        from src.database import Story, Connection
+
+        queries = {
+            'stories': select(func.max(Story.updated_at), func.count(Story.id)),
+            # Connections have no updated_at; inserts, answers and reads each set one of these
+            'connections': select(
+                func.max(Connection.requested_at), func.max(Connection.responded_at),
+                func.max(Connection.read_at), func.count(Connection.id),
+            ),
+        }
+        watermarks = None
+        while not self._stopping.is_set():
+            with self.engine.connect() as connection:
+                current = {table: tuple(connection.execute(query).one()) for table, query in queries.items()}
+            for table, value in current.items():
+                if watermarks is not None and value != watermarks[table]:
+                    publish({'table': table, 'op': 'POLL'})
+            watermarks = current
+            self._stopping.wait(Config.CHANGE_FEED_POLL_SECONDS)
+
+_listener = None
+_listener_lock = threading.Lock()
+
+def start_change_listener():
+    """Start this process's listener thread (once per process)"""
+    global _listener
+    if not Config.CHANGE_FEED_ENABLED:
+        return None
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            from src.database import get_db_manager
+            _listener = ChangeListener(get_db_manager().engine)
+            _listener.start()
+    return _listener
+
+def stop_change_listener(timeout=None):
+    """Stop this process's listener thread, if it runs, and wait for it"""
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop(timeout)
+
+def listener_running():
+    return _listener is not None and _listener.is_alive()
@@ -0,0 +1,263 @@
+"""
+Transcript cold storage for ElderWise application
+
+Old stories are rarely read, but their transcripts make up most of the
+stories table and of every backup. The archive job compresses transcripts
+with zstd and moves them into story_text_archive, leaving '' in
+Story.transcript. A transcript is archived once it reaches
+COLD_STORAGE_MIN_LENGTH characters or its story is older than
+COLD_STORAGE_AFTER_DAYS. Summaries are short and are what listings show, so
+they stay inline.
+
+Short transcripts compress much better with a dictionary trained on the
+corpus (train_dictionary()). Dictionaries are stored in the database and
+never change, so any process can decompress any row.
+
+Readers get archived transcripts back with fill_transcripts() or
+load_transcripts(). A page with no archived stories costs no extra query.
+"""
+
+import time
+import threading
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import select, update, delete, func, or_, cast, LargeBinary
+from src.config import Config
+from src.database import get_db_session, Story, StoryTextArchive, CompressionDictionary
+
+class ColdStorageReport(NamedTuple):
+    """Space saved by the archive and what reading from it costs"""
+    archived_stories: int
+    inline_stories: int
+    raw_bytes: int  # Archived transcripts before compression
+    stored_bytes: int  # Archived transcripts as stored
+    inline_bytes: int  # Transcripts still in the stories table
+    dictionary_id: Optional[int]
+    inline_read_ms: float  # One batched read of `inline_sample` inline transcripts
+    archived_read_ms: float  # One batched read and decompression of `archived_sample` archived ones
+    inline_sample: int
+    archived_sample: int
+
+    @property
+    def ratio(self):
+        return self.raw_bytes / self.stored_bytes if self.stored_bytes else 0.0
+
+def _zstd():
+    import zstandard  # Only needed once something is archived
+    return zstandard
+
+@lru_cache(maxsize=8)
+def _dictionary(dictionary_id):
+    """A stored dictionary; safe to cache because dictionaries never change"""
+    with get_db_session() as session:
+        data = session.execute(
+            select(CompressionDictionary.data).where(CompressionDictionary.id == dictionary_id)
+        ).scalar_one()
+    return _zstd().ZstdCompressionDict(data)
+
+_decompressors = threading.local()  # zstd contexts are not thread-safe
+
+def _decompressor(dictionary_id):
+    cache = _decompressors.__dict__.setdefault("by_dictionary", {})
+    decompressor = cache.get(dictionary_id)
+    if decompressor is None:
+        dict_data = _dictionary(dictionary_id) if dictionary_id else None
+        decompressor = cache[dictionary_id] = _zstd().ZstdDecompressor(dict_data=dict_data)
+    return decompressor
+
+def compressor(dictionary_id=None, level=None):
+    """A zstd compressor, optionally with a stored dictionary; reuse it for a whole batch.
+
+    Setting up a high-level context (and loading its dictionary) costs more
+    than compressing a typical transcript. Not thread-safe.
+    """
+    dict_data = _dictionary(dictionary_id) if dictionary_id else None
+    return _zstd().ZstdCompressor(level=level or Config.COLD_STORAGE_LEVEL, dict_data=dict_data)
+
+def compress(text, dictionary_id=None, level=None, using=None):
+    """One zstd frame of the UTF-8 text, with `using` or a new compressor"""
+    using = using or compressor(dictionary_id, level)
+    return using.compress(text.encode("utf-8"))
+
+def decompress(blob, dictionary_id=None):
+    return _decompressor(dictionary_id).decompress(blob).decode("utf-8")
+
+def latest_dictionary_id(session):
+    return session.execute(select(func.max(CompressionDictionary.id))).scalar()
+
+def train_dictionary(sample_limit=2000):
+    """Train a dictionary on a sample of transcripts and store it; returns its id"""
+    zstd = _zstd()
+    with get_db_session() as session:
+        archived = session.execute(select(StoryTextArchive.story_id)).scalars().all()
+        samples = session.execute(
+            select(Story.transcript)
+            .where(Story.transcript != '')
+            .order_by(Story.id.desc())
+            .limit(sample_limit)
+        ).scalars().all()
+        samples = [text.encode("utf-8") for text in samples]
+        # Archived stories are part of the corpus too
+        if len(samples) < sample_limit and archived:
+            samples.extend(
+                text.encode("utf-8")
+                for text in load_transcripts(archived[:sample_limit - len(samples)], session).values()
+            )
+        try:
+            trained = zstd.train_dictionary(Config.COLD_STORAGE_DICT_SIZE, samples)
+        except zstd.ZstdError as e:
+            raise ValueError(f"Not enough transcript text to train a dictionary ({len(samples)} samples): {e}")
+        dictionary = CompressionDictionary(data=trained.as_bytes(), sample_count=len(samples))
+        session.add(dictionary)
+        session.commit()
+        return dictionary.id
+
+def _candidates(cutoff):
+    """Stories whose transcript is still inline and due for the archive"""
+    rules = [func.length(Story.transcript) >= Config.COLD_STORAGE_MIN_LENGTH]
+    if cutoff is not None:
+        rules.append(Story.created_at < cutoff)
+    return Story.transcript != '', or_(*rules)
+
+def archive_stories(batch_size=200, use_dictionary=None, now=None):
+    """Move due transcripts into story_text_archive; returns a summary dict"""
+    use_dictionary = Config.COLD_STORAGE_DICTIONARY if use_dictionary is None else use_dictionary
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=Config.COLD_STORAGE_AFTER_DAYS) if Config.COLD_STORAGE_AFTER_DAYS else None
+    archived = raw_bytes = stored_bytes = 0
+    last_id = 0
+    with get_db_session() as session:
+        dictionary_id = latest_dictionary_id(session) if use_dictionary else None
+    batch_compressor = compressor(dictionary_id)
+    while True:
+        with get_db_session() as session:
+            rows = session.execute(
+                select(Story.id, Story.transcript)
+                .where(Story.id > last_id, *_candidates(cutoff))
+                .order_by(Story.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for story_id, transcript in rows:
+                blob = compress(transcript, using=batch_compressor)
+                raw = len(transcript.encode("utf-8"))
+                session.add(StoryTextArchive(
+                    story_id=story_id, transcript=blob, dictionary_id=dictionary_id, raw_bytes=raw,
+                ))
+                raw_bytes += raw
+                stored_bytes += len(blob)
+            # Keep updated_at as it was: the text itself did not change
+            session.execute(
+                update(Story)
+                .where(Story.id.in_([row.id for row in rows]))
+                .values(transcript='', updated_at=Story.updated_at)
+            )
+            session.commit()
+            archived += len(rows)
+            last_id = rows[-1].id
+
+    return {
+        'stories_archived': archived,
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored_bytes,
+        'dictionary_id': dictionary_id,
+    }
+
+def load_transcripts(story_ids, session=None):
+    """Get {story_id: transcript} for the archived stories among `story_ids`"""
+    story_ids = list(story_ids)
+    if not story_ids:
+        return {}
+    query = (
+        select(StoryTextArchive.story_id, StoryTextArchive.transcript, StoryTextArchive.dictionary_id)
+        .where(StoryTextArchive.story_id.in_(story_ids))
+    )
+    if session is None:
+        with get_db_session() as session:
+            rows = session.execute(query).all()
+    else:
+        rows = session.execute(query).all()
+    return {story_id: decompress(blob, dictionary_id) for story_id, blob, dictionary_id in rows}
+
+def fill_transcripts(rows, session=None):
+    """Put archived transcripts back into NamedTuple rows with `id` and `transcript` fields"""
+    transcripts = load_transcripts([row.id for row in rows if row.transcript == ''], session)
+    if not transcripts:
+        return rows
+    filled = [
+        row._replace(transcript=transcripts[row.id]) if row.id in transcripts else row
+        for row in rows
+    ]
+    return tuple(filled) if isinstance(rows, tuple) else filled
+
+def restore_stories(story_ids=None, batch_size=200):
+    """Move archived transcripts back inline (all of them by default); returns how many"""
+    restored = 0
+    while True:
+        with get_db_session() as session:
+            query = select(StoryTextArchive.story_id).order_by(StoryTextArchive.story_id).limit(batch_size)
+            if story_ids is not None:
+                query = query.where(StoryTextArchive.story_id.in_(list(story_ids)))
+            batch = session.execute(query).scalars().all()
+            if not batch:
+                return restored
+            for story_id, transcript in load_transcripts(batch, session).items():
+                session.execute(
+                    update(Story).where(Story.id == story_id)
+                    .values(transcript=transcript, updated_at=Story.updated_at)
+                )
+            session.execute(delete(StoryTextArchive).where(StoryTextArchive.story_id.in_(batch)))
+            session.commit()
+            restored += len(batch)
+
+def _byte_length(session, column):
+    if session.get_bind().dialect.name == 'postgresql':
+        return func.octet_length(column)
+    return func.length(cast(column, LargeBinary))  # SQLite counts characters in text, bytes in blobs
+
+def storage_report(sample=100):
+    """Compare archived and inline transcripts by size and read latency"""
+    with get_db_session() as session:
+        archived, raw_bytes, stored_bytes = session.execute(
+            select(
+                func.count(StoryTextArchive.story_id),
+                func.coalesce(func.sum(StoryTextArchive.raw_bytes), 0),
+                func.coalesce(func.sum(func.length(StoryTextArchive.transcript)), 0),
+            )
+        ).one()
+        inline, inline_bytes = session.execute(
+            select(func.count(Story.id), func.coalesce(func.sum(_byte_length(session, Story.transcript)), 0))
+            .where(Story.transcript != '')
+        ).one()
+        dictionary_id = latest_dictionary_id(session)
+        archived_ids = session.execute(
+            select(StoryTextArchive.story_id).order_by(func.random()).limit(sample)
+        ).scalars().all()
+        inline_ids = session.execute(
+            select(Story.id).where(Story.transcript != '').order_by(func.random()).limit(sample)
+        ).scalars().all()
+
+    # One batched read of each kind, as a feed page or export batch would do
+    with get_db_session() as session:
+        load_transcripts(archived_ids[:1], session)  # Load dictionaries outside the timing
+        started = time.perf_counter()
+        session.execute(select(Story.id, Story.transcript).where(Story.id.in_(inline_ids))).all()
+        inline_read = time.perf_counter() - started
+        started = time.perf_counter()
+        load_transcripts(archived_ids, session)
+        archived_read = time.perf_counter() - started
+
+    return ColdStorageReport(
+        archived_stories=archived,
+        inline_stories=inline,
+        raw_bytes=int(raw_bytes),
+        stored_bytes=int(stored_bytes),
+        inline_bytes=int(inline_bytes),
+        dictionary_id=dictionary_id,
+        inline_read_ms=inline_read * 1000,
+        archived_read_ms=archived_read * 1000,
+        inline_sample=len(inline_ids),
+        archived_sample=len(archived_ids),
+    )
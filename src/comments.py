@@ -0,0 +1,152 @@
+"""
+Story comment threads for ElderWise application
+
+Comments are StoryInteraction rows with interaction_type='comment'. Threads are
+read newest first with keyset pagination on (created_at, id), and
+Story.comments_count is updated in the same transaction as every insert or
+delete so feeds can show counts without touching story_interactions.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy import select, update, and_, or_, func, case
+from src.config import Config
+from src.database import get_db_session, Story, StoryInteraction, User
+
+class CommentRow(NamedTuple):
+    """Read-only comment row"""
+    id: int
+    story_id: int
+    user_id: int
+    author_name: Optional[str]
+    comment_text: str
+    created_at: datetime
+
+COMMENT_ROW_COLUMNS = (
+    StoryInteraction.id, StoryInteraction.story_id, StoryInteraction.user_id,
+    User.full_name, StoryInteraction.comment_text, StoryInteraction.created_at,
+)
+
+def add_comment(story_id, user_id, comment_text):
+    """Add a comment and bump the story's comment count in one transaction"""
+    comment_text = (comment_text or "").strip()
+    if not comment_text:
+        raise ValueError("Comment text is required")
+    if len(comment_text) > Config.COMMENT_MAX_LENGTH:
+        raise ValueError(f"Comments are limited to {Config.COMMENT_MAX_LENGTH} characters")
+
+    with get_db_session() as session:
+        comment = StoryInteraction(
+            story_id=story_id,
+            user_id=user_id,
+            interaction_type='comment',
+            comment_text=comment_text,
+            created_at=datetime.utcnow(),
+        )
+        session.add(comment)
+        # Increment in SQL so concurrent comments can't lose updates
+        session.execute(
+            update(Story)
+            .where(Story.id == story_id)
+            .values(comments_count=func.coalesce(Story.comments_count, 0) + 1)
+        )
+        session.commit()
+        return comment.id
+
+def delete_comment(comment_id):
+    """Delete a comment and decrement the story's comment count in one transaction"""
+    with get_db_session() as session:
+        comment = session.get(StoryInteraction, comment_id)
+        if comment is None or comment.interaction_type != 'comment':
+            return False
+        story_id = comment.story_id
+        session.delete(comment)
+        session.execute(
+            update(Story)
+            .where(Story.id == story_id)
+            .values(comments_count=case((Story.comments_count > 0, Story.comments_count - 1), else_=0))
+        )
+        session.commit()
+        return True
+
+def get_comments(story_id, cursor=None, limit=None):
+    """Get one page of a story's comments, newest first.
+    
+    `cursor` is the (created_at, id) pair returned with the previous page.
+    Returns (comments, next_cursor); next_cursor is None on the last page.
+    """
+    limit = limit or Config.COMMENTS_PAGE_SIZE
+    query = (
+        select(*COMMENT_ROW_COLUMNS)
+        .outerjoin(User, User.id == StoryInteraction.user_id)
+        .where(StoryInteraction.story_id == story_id)
+        .where(StoryInteraction.interaction_type == 'comment')
+    )
+    if cursor is not None:
+        created_at, comment_id = cursor
+        query = query.where(or_(
+            StoryInteraction.created_at < created_at,
+            and_(StoryInteraction.created_at == created_at, StoryInteraction.id < comment_id),
+        ))
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(StoryInteraction.created_at.desc(), StoryInteraction.id.desc()).limit(limit + 1)
+
+    with get_db_session() as session:
+        comments = [CommentRow._make(row) for row in session.execute(query)]
+
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = (comments[-1].created_at, comments[-1].id)
+    return comments, next_cursor
+
+def get_recent_comments(story_ids, limit=None):
+    """Get {story_id: newest `limit` comments} for several stories in one query"""
+    story_ids = list(story_ids)
+    if not story_ids:
+        return {}
+    limit = limit or Config.COMMENTS_PAGE_SIZE
+    rank = func.row_number().over(
+        partition_by=StoryInteraction.story_id,
+        order_by=(StoryInteraction.created_at.desc(), StoryInteraction.id.desc()),
+    ).label('rank')
+    ranked = (
+        select(*COMMENT_ROW_COLUMNS, rank)
+        .outerjoin(User, User.id == StoryInteraction.user_id)
+        .where(StoryInteraction.story_id.in_(story_ids))
+        .where(StoryInteraction.interaction_type == 'comment')
+        .subquery()
+    )
+    query = (
+        select(*list(ranked.c)[:-1])  # COMMENT_ROW_COLUMNS without the rank
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.story_id, ranked.c.rank)
+    )
+    comments = {story_id: [] for story_id in story_ids}
+    with get_db_session() as session:
+        for row in session.execute(query):
+            comments[row.story_id].append(CommentRow._make(row))
+    return comments
+
+def get_comment_counts(story_ids):
+    """Get {story_id: comment count} for a whole page of stories in one query"""
+    story_ids = list(story_ids)
+    if not story_ids:
+        return {}
+    query = select(Story.id, func.coalesce(Story.comments_count, 0)).where(Story.id.in_(story_ids))
+    with get_db_session() as session:
+        counts = dict(session.execute(query).all())
+    return {story_id: counts.get(story_id, 0) for story_id in story_ids}
+
+def recount_comments():
+    """Recompute every story's comments_count from story_interactions (repair job)"""
+    counts = (
+        select(func.count(StoryInteraction.id))
+        .where(StoryInteraction.story_id == Story.id)
+        .where(StoryInteraction.interaction_type == 'comment')
+        .scalar_subquery()
+    )
+    with get_db_session() as session:
+        result = session.execute(update(Story).values(comments_count=counts))
+        session.commit()
+        return result.rowcount
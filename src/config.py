@@ -4,7 +4,6 @@ Configuration settings for ElderWise application
 
 import os
 from pathlib import Path
-import streamlit as st
 
 class Config:
     """Configuration settings for ElderWise application"""
@@ -27,6 +26,29 @@ class Config:
     MAX_UPLOAD_SIZE_MB = int(os.getenv('MAX_UPLOAD_SIZE_MB', '50'))
     ALLOWED_AUDIO_FORMATS = ['.mp3', '.wav', '.m4a', '.ogg']
     
+    # Media storage (see src/storage.py)
+    MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'local')  # 'local' or 's3'
+    MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', str(DATA_DIR)))
+    S3_BUCKET = os.getenv('S3_BUCKET', '')
+    S3_PREFIX = os.getenv('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None  # Set for MinIO, R2 and other S3-compatible stores
+    S3_REGION = os.getenv('S3_REGION') or None
+    S3_MULTIPART_CHUNK_MB = int(os.getenv('S3_MULTIPART_CHUNK_MB', '8'))
+    MEDIA_CACHE_DIR = Path(os.getenv('MEDIA_CACHE_DIR', str(DATA_DIR / "media_cache")))
+    MEDIA_CACHE_MAX_MB = int(os.getenv('MEDIA_CACHE_MAX_MB', '500'))
+    MEDIA_PREFETCH_WORKERS = int(os.getenv('MEDIA_PREFETCH_WORKERS', '4'))
+    
+    # Cover images (see src/images.py)
+    COVER_MAX_WIDTH = int(os.getenv('COVER_MAX_WIDTH', '800'))
+    COVER_JPEG_QUALITY = int(os.getenv('COVER_JPEG_QUALITY', '85'))
+    IMAGE_REDUCING_GAP = 3.0  # Resize in two steps once the image is 3x larger than the target
+    
+    # Cover upload limits, checked from the image header before decoding
+    MAX_IMAGE_UPLOAD_MB = int(os.getenv('MAX_IMAGE_UPLOAD_MB', '20'))
+    MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', '64000000'))  # 48MP phone photos fit
+    MAX_IMAGE_SIDE = int(os.getenv('MAX_IMAGE_SIDE', '12000'))
+    ALLOWED_IMAGE_FORMATS = ['JPEG', 'PNG']
+    
     # Database Configuration
     @staticmethod
     def get_database_url():
@@ -62,6 +84,115 @@ class Config:
         """Check if running in production environment"""
         return os.getenv('DATABASE_URL') is not None or os.getenv('POSTGRES_URL') is not None
     
+    # Story feed settings
+    FEED_PAGE_SIZE = int(os.getenv('FEED_PAGE_SIZE', '10'))
+    FEED_THUMBNAIL_WIDTH = int(os.getenv('FEED_THUMBNAIL_WIDTH', '360'))
+    FEED_THUMBNAIL_DIR = BASE_DIR / "static" / "thumbs"  # Streamlit's static folder, next to app.py
+    FEED_THUMBNAIL_URL = "app/static/thumbs"
+    COMMENTS_PAGE_SIZE = int(os.getenv('COMMENTS_PAGE_SIZE', '10'))
+    COMMENT_MAX_LENGTH = 2000
+    
+    # Next-page prefetching (see src/prefetch.py)
+    FEED_PREFETCH_ENABLED = os.getenv('FEED_PREFETCH_ENABLED', 'true') == 'true'
+    FEED_PREFETCH_WORKERS = int(os.getenv('FEED_PREFETCH_WORKERS', '2'))  # Shared by all sessions in a process
+    FEED_PREFETCH_MAX_PAGES = int(os.getenv('FEED_PREFETCH_MAX_PAGES', '32'))  # Prefetches queued or running per process
+    
+    # Admission control for story submissions (see src/admission.py)
+    SUBMIT_RATE_PER_MINUTE = float(os.getenv('SUBMIT_RATE_PER_MINUTE', '2'))  # Per session, after the burst
+    SUBMIT_BURST = int(os.getenv('SUBMIT_BURST', '3'))
+    HEAVY_WRITE_CONCURRENCY = int(os.getenv('HEAVY_WRITE_CONCURRENCY', '4'))  # Per process, well under the pool of 10
+    HEAVY_WRITE_QUEUE_MAX = int(os.getenv('HEAVY_WRITE_QUEUE_MAX', '20'))
+    HEAVY_WRITE_QUEUE_TIMEOUT_SECONDS = float(os.getenv('HEAVY_WRITE_QUEUE_TIMEOUT_SECONDS', '30'))
+    
+    # Elder connection inbox
+    INBOX_PAGE_SIZE = int(os.getenv('INBOX_PAGE_SIZE', '20'))
+    INBOX_UNREAD_CACHE_SECONDS = int(os.getenv('INBOX_UNREAD_CACHE_SECONDS', '30'))
+    
+    # Cross-process change feed (see src/change_feed.py)
+    CHANGE_FEED_ENABLED = os.getenv('CHANGE_FEED_ENABLED', 'true') == 'true'
+    CHANGE_FEED_POLL_SECONDS = float(os.getenv('CHANGE_FEED_POLL_SECONDS', '2'))  # SQLite watermark poll, PostgreSQL wakeup
+    CHANGE_FEED_CACHE_SECONDS = int(os.getenv('CHANGE_FEED_CACHE_SECONDS', '600'))  # Upper bound if an event is lost
+    
+    # Instrumentation (see src/instrumentation.py)
+    METRICS_ENABLED = os.getenv('ELDERWISE_METRICS', 'true') == 'true'
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0 disables the /metrics endpoint
+    METRICS_FILE = os.getenv('METRICS_FILE', '')  # Empty disables the file dump
+    METRICS_DUMP_INTERVAL_SECONDS = int(os.getenv('METRICS_DUMP_INTERVAL_SECONDS', '30'))
+    QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'false') == 'true'  # Raise instead of logging overruns
+    FEED_QUERY_BUDGET = int(os.getenv('FEED_QUERY_BUDGET', '8'))  # Statements per feed page, independent of page size
+    
+    # Health checks and warm-up (see src/health.py)
+    WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', '5'))  # Pooled connections opened before serving
+    WARMUP_ATTEMPTS = int(os.getenv('WARMUP_ATTEMPTS', '5'))  # serve.py exits after this many failed warm-ups
+    HEALTH_POOL_SATURATION = float(os.getenv('HEALTH_POOL_SATURATION', '0.9'))  # Not ready with more of the pool in use
+    HEALTH_DB_LATENCY_MS = float(os.getenv('HEALTH_DB_LATENCY_MS', '500'))  # Not ready with slower round trips
+    
+    # Rerun profiling (see src/profiling.py), disabled unless a sample rate is set
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # Fraction of reruns, 0 to 1
+    PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')  # 'cprofile' (pstats) or 'sample' (collapsed stacks)
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+    PROFILE_DIR = Path(os.getenv('PROFILE_DIR', str(DATA_DIR / "profiles")))
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+    
+    # Featured story scoring (see src/scoring.py)
+    SCORE_HALF_LIFE_HOURS = float(os.getenv('SCORE_HALF_LIFE_HOURS', '72'))
+    SCORE_JOB_INTERVAL_SECONDS = int(os.getenv('SCORE_JOB_INTERVAL_SECONDS', '300'))
+    WATERMARK_COMMIT_LAG_SECONDS = int(os.getenv('WATERMARK_COMMIT_LAG_SECONDS', '60'))  # Newer rows wait for the next job run
+    SCORE_WEIGHTS = {
+        "base": 1.0,  # Every story starts with a small score so new stories can surface
+        "view": 1.0,
+        "like": 4.0,
+        "save": 6.0,
+        "comment": 8.0,
+        "share": 10.0,
+    }
+    
+    # Story interaction storage (see src/interactions.py)
+    PARTITION_INTERACTIONS = os.getenv('PARTITION_INTERACTIONS', 'false') == 'true'  # PostgreSQL monthly partitions
+    INTERACTION_PARTITION_MONTHS_AHEAD = int(os.getenv('INTERACTION_PARTITION_MONTHS_AHEAD', '3'))
+    INTERACTION_ROLLUP_AFTER_DAYS = int(os.getenv('INTERACTION_ROLLUP_AFTER_DAYS', '30'))  # Newer views stay raw
+    INTERACTION_RETENTION_MONTHS = int(os.getenv('INTERACTION_RETENTION_MONTHS', '0'))  # 0 keeps raw views forever
+    INTERACTION_JOB_INTERVAL_SECONDS = int(os.getenv('INTERACTION_JOB_INTERVAL_SECONDS', '3600'))
+    
+    # Unique viewer sketches (see src/viewers.py)
+    HLL_PRECISION = 12  # 4 KB per sketch, ~1.6% error; changing it needs rebuild_view_sketches()
+    
+    # Transcript cold storage (see src/cold_storage.py)
+    COLD_STORAGE_MIN_LENGTH = int(os.getenv('COLD_STORAGE_MIN_LENGTH', '20000'))  # Characters; archive longer transcripts...
+    COLD_STORAGE_AFTER_DAYS = int(os.getenv('COLD_STORAGE_AFTER_DAYS', '365'))  # ...and those of older stories; 0 disables
+    COLD_STORAGE_LEVEL = int(os.getenv('COLD_STORAGE_LEVEL', '19'))  # zstd level; decompression speed doesn't depend on it
+    COLD_STORAGE_DICTIONARY = os.getenv('COLD_STORAGE_DICTIONARY', 'true') == 'true'  # Use the latest trained dictionary
+    COLD_STORAGE_DICT_SIZE = 112640  # Bytes, zstd's default dictionary size
+    COLD_STORAGE_JOB_INTERVAL_SECONDS = int(os.getenv('COLD_STORAGE_JOB_INTERVAL_SECONDS', '86400'))
+    
+    # Near-duplicate story detection (see src/dedupe.py)
+    DEDUPE_NUM_PERM = 128  # MinHash values per story; changing it needs a rebuild of the index
+    DEDUPE_BANDS = 16  # LSH bands of DEDUPE_NUM_PERM // DEDUPE_BANDS rows; ~0.7 similarity is found reliably
+    DEDUPE_SHINGLE_WORDS = 5
+    DEDUPE_BLOCK_THRESHOLD = float(os.getenv('DEDUPE_BLOCK_THRESHOLD', '0.9'))  # Refuse the submission
+    DEDUPE_WARN_THRESHOLD = float(os.getenv('DEDUPE_WARN_THRESHOLD', '0.7'))  # Share it, but point out the match
+    
+    # Static site export (see src/static_export.py)
+    STATIC_EXPORT_DIR = Path(os.getenv('STATIC_EXPORT_DIR', str(DATA_DIR / "site")))
+    STATIC_EXPORT_WORKERS = int(os.getenv('STATIC_EXPORT_WORKERS', '0'))  # 0 uses every CPU
+    STATIC_EXPORT_PAGE_SIZE = int(os.getenv('STATIC_EXPORT_PAGE_SIZE', '30'))  # Stories per index page
+    STATIC_EXPORT_COMMENTS = int(os.getenv('STATIC_EXPORT_COMMENTS', '50'))  # Newest comments on each story page
+    STATIC_EXPORT_INTERVAL_SECONDS = int(os.getenv('STATIC_EXPORT_INTERVAL_SECONDS', '600'))
+    
+    # Backups (see src/backup.py)
+    BACKUP_DIR = Path(os.getenv('BACKUP_DIR', str(DATA_DIR / "backups")))
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '7'))  # Newest backups kept; 0 keeps them all
+    BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '1024'))  # SQLite pages per step, 4 MB by default
+    BACKUP_STEP_SLEEP_MS = float(os.getenv('BACKUP_STEP_SLEEP_MS', '20'))  # Writers get the database between steps
+    BACKUP_MAX_RESTARTS = int(os.getenv('BACKUP_MAX_RESTARTS', '5'))  # Then copy the rest in one step
+    BACKUP_GZIP_LEVEL = int(os.getenv('BACKUP_GZIP_LEVEL', '6'))  # PostgreSQL exports
+    BACKUP_MEDIA_DIRS = ['images', 'audio']  # Under MEDIA_ROOT; S3 buckets have their own versioning
+    BACKUP_INTERVAL_SECONDS = int(os.getenv('BACKUP_INTERVAL_SECONDS', '86400'))
+    
+    # Category analytics (see src/analytics.py)
+    ANALYTICS_JOB_INTERVAL_SECONDS = int(os.getenv('ANALYTICS_JOB_INTERVAL_SECONDS', '300'))
+    
     # AI Configuration
     GEMINI_MODEL = "gemini-pro"
     
@@ -73,7 +204,8 @@ class Config:
         if api_key:
             return api_key
         
-        # Try session state
+        # Try session state (streamlit is imported lazily so CLI tools don't pay for it)
+        import streamlit as st
         if hasattr(st, 'session_state') and 'gemini_api_key' in st.session_state:
             return st.session_state.gemini_api_key
         
@@ -82,6 +214,7 @@ class Config:
     @staticmethod
     def set_gemini_api_key(api_key):
         """Set Gemini API key in session state"""
+        import streamlit as st
         st.session_state.gemini_api_key = api_key
     
     # Navigation options
@@ -0,0 +1,172 @@
+"""
+Elder connection-request inbox for ElderWise application
+
+Pending requests are read through the (elder_id, status, requested_at) index,
+responses are applied in bulk in one transaction, and unread counts are cached
+per elder so the inbox badge is cheap to show on every rerun. Counts are
+dropped when the change feed reports a write from another process.
+"""
+
+import time
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy import select, update, func
+from src.config import Config
+from src.database import get_db_session, Connection, User
+from src.change_feed import subscribe
+
+RESPONSE_STATUSES = ('accepted', 'declined')
+
+class ConnectionRequestRow(NamedTuple):
+    """Read-only pending request shown in an elder's inbox"""
+    id: int
+    seeker_id: int
+    seeker_name: Optional[str]
+    initial_message: Optional[str]
+    connection_reason: Optional[str]
+    topics: Optional[list]
+    preferred_contact: Optional[str]
+    requested_at: Optional[datetime]
+    read_at: Optional[datetime]
+
+REQUEST_ROW_COLUMNS = (
+    Connection.id, Connection.seeker_id, User.full_name, Connection.initial_message,
+    Connection.connection_reason, Connection.topics, Connection.preferred_contact,
+    Connection.requested_at, Connection.read_at,
+)
+
+# elder_id -> (unread count, monotonic expiry time)
+_unread_cache = {}
+_unread_cache_lock = threading.Lock()
+
+def invalidate_unread_count(elder_id=None):
+    """Drop the cached unread count for one elder, or for everyone"""
+    with _unread_cache_lock:
+        if elder_id is None:
+            _unread_cache.clear()
+        else:
+            _unread_cache.pop(elder_id, None)
+
+def _on_connection_change(event):
+    # Changes from other processes carry the elder; anything else clears all counts
+    invalidate_unread_count(event.get('elder_id'))
+
+subscribe('connections', _on_connection_change)
+
+def get_unread_count(elder_id):
+    """Pending requests the elder hasn't seen yet, cached per elder"""
+    now = time.monotonic()
+    cached = _unread_cache.get(elder_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    query = (
+        select(func.count(Connection.id))
+        .where(Connection.elder_id == elder_id)
+        .where(Connection.status == 'pending')
+        .where(Connection.read_at.is_(None))
+    )
+    with get_db_session() as session:
+        count = session.execute(query).scalar_one()
+
+    with _unread_cache_lock:
+        _unread_cache[elder_id] = (count, now + Config.INBOX_UNREAD_CACHE_SECONDS)
+    return count
+
+def get_pending_requests(elder_id, limit=None):
+    """Get an elder's pending requests, newest first"""
+    limit = limit or Config.INBOX_PAGE_SIZE
+    query = (
+        select(*REQUEST_ROW_COLUMNS)
+        .outerjoin(User, User.id == Connection.seeker_id)
+        .where(Connection.elder_id == elder_id)
+        .where(Connection.status == 'pending')
+        .order_by(Connection.requested_at.desc())
+        .limit(limit)
+    )
+    with get_db_session() as session:
+        return [ConnectionRequestRow._make(row) for row in session.execute(query)]
+
+def count_pending_requests(elder_id):
+    """Total pending requests for an elder, read or not"""
+    query = (
+        select(func.count(Connection.id))
+        .where(Connection.elder_id == elder_id)
+        .where(Connection.status == 'pending')
+    )
+    with get_db_session() as session:
+        return session.execute(query).scalar_one()
+
+def create_connection_request(elder_id, seeker_id, message, topics=None, preferred_contact=None, reason=None):
+    """Store a new pending request from a seeker to an elder"""
+    with get_db_session() as session:
+        connection = Connection(
+            elder_id=elder_id,
+            seeker_id=seeker_id,
+            status='pending',
+            initial_message=message,
+            connection_reason=reason,
+            topics=topics or [],
+            preferred_contact=preferred_contact,
+            requested_at=datetime.utcnow(),
+        )
+        session.add(connection)
+        session.commit()
+        connection_id = connection.id
+
+    invalidate_unread_count(elder_id)
+    return connection_id
+
+def _check_acting_user(elder_id, acting_user_id):
+    if acting_user_id != elder_id:
+        raise PermissionError("Only the elder can manage their own connection requests")
+
+def mark_requests_read(elder_id, connection_ids, acting_user_id):
+    """Mark the given requests as seen by the elder in one statement"""
+    _check_acting_user(elder_id, acting_user_id)
+    connection_ids = list(connection_ids)
+    if not connection_ids:
+        return 0
+    with get_db_session() as session:
+        result = session.execute(
+            update(Connection)
+            .where(Connection.elder_id == elder_id)
+            .where(Connection.id.in_(connection_ids))
+            .where(Connection.read_at.is_(None))
+            .values(read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+    if result.rowcount:
+        invalidate_unread_count(elder_id)
+    return result.rowcount
+
+def respond_to_requests(elder_id, connection_ids, status, acting_user_id):
+    """Accept or decline several pending requests in one transaction.
+    
+    Only the elder can answer, and only their own pending requests are
+    changed; returns how many were. Raises PermissionError for anyone else.
+    """
+    _check_acting_user(elder_id, acting_user_id)
+    if status not in RESPONSE_STATUSES:
+        raise ValueError(f"Status must be one of {', '.join(RESPONSE_STATUSES)}")
+    connection_ids = list(connection_ids)
+    if not connection_ids:
+        return 0
+
+    now = datetime.utcnow()
+    with get_db_session() as session:
+        result = session.execute(
+            update(Connection)
+            .where(Connection.elder_id == elder_id)
+            .where(Connection.id.in_(connection_ids))
+            .where(Connection.status == 'pending')
+            .values(status=status, responded_at=now, read_at=func.coalesce(Connection.read_at, now))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+    invalidate_unread_count(elder_id)
+    return result.rowcount
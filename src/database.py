@@ -2,15 +2,19 @@
 Database models and operations for ElderWise application
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, Date, DateTime, Boolean, ForeignKey, JSON, Float, LargeBinary, Index, select, inspect, text, func
 # from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.engine import Connection as EngineConnection
 from contextlib import contextmanager
 from datetime import datetime
+from typing import NamedTuple, Optional
 import os
+import threading
 from pathlib import Path
 from src.config import Config
+from src.change_feed import versioned_cache, install_commit_hooks
 
 # Load environment variables
 try:
@@ -68,6 +72,7 @@ class Story(Base):
     views_count = Column(Integer, default=0)
     likes_count = Column(Integer, default=0)
     shares_count = Column(Integer, default=0)
+    comments_count = Column(Integer, default=0, server_default='0')  # Kept in sync by src/comments.py
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -95,6 +100,13 @@ class StoryInteraction(Base):
     # Relationships
     user = relationship("User")
     story = relationship("Story", back_populates="interactions")
+    
+    __table_args__ = (
+        # Per-story lookups by type, e.g. keyset-paginated comment threads
+        Index('ix_story_interactions_story_type_created', 'story_id', 'interaction_type', 'created_at'),
+        # Time-range scans by type, e.g. compacting old views
+        Index('ix_story_interactions_type_created', 'interaction_type', 'created_at'),
+    )
 
 class Connection(Base):
     __tablename__ = 'connections'
@@ -113,10 +125,135 @@ class Connection(Base):
     # Timestamps
     requested_at = Column(DateTime, default=datetime.utcnow)
     responded_at = Column(DateTime)
+    read_at = Column(DateTime)  # When the elder first saw the request in their inbox
     
     # Relationships
     elder = relationship("User", foreign_keys=[elder_id], back_populates="connections_as_elder")
     seeker = relationship("User", foreign_keys=[seeker_id], back_populates="connections_as_seeker")
+    
+    __table_args__ = (
+        # Elder inbox: pending requests for one elder, newest first
+        Index('ix_connections_elder_status_requested', 'elder_id', 'status', 'requested_at'),
+    )
+
+class StoryScore(Base):
+    __tablename__ = 'story_scores'
+    
+    story_id = Column(Integer, ForeignKey('stories.id'), primary_key=True)
+    
+    # Scores are stored as log(forward-decayed engagement), see src/scoring.py.
+    # Every row decays at the same rate, so ordering by `score` is the ranking.
+    score = Column(Float, nullable=False)
+    interaction_score = Column(Float)  # Component from StoryInteraction events
+    counter_score = Column(Float)  # Component from views/likes/shares counters
+    
+    computed_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_story_scores_score', 'score'),
+    )
+
+class StoryDailyStats(Base):
+    __tablename__ = 'story_daily_stats'
+    
+    # Raw view events older than INTERACTION_ROLLUP_AFTER_DAYS are compacted
+    # into one row per story and day, see src/interactions.py
+    story_id = Column(Integer, ForeignKey('stories.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('ix_story_daily_stats_day', 'day'),
+    )
+
+class CategoryDailyStats(Base):
+    __tablename__ = 'category_daily_stats'
+    
+    # Maintained incrementally by src/analytics.py; the admin dashboard reads only this table
+    category = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    stories_created = Column(Integer, nullable=False, default=0, server_default='0')
+    views = Column(Integer, nullable=False, default=0, server_default='0')
+    likes = Column(Integer, nullable=False, default=0, server_default='0')
+    shares = Column(Integer, nullable=False, default=0, server_default='0')
+    
+    __table_args__ = (
+        Index('ix_category_daily_stats_day', 'day'),
+    )
+
+class StoryViewSketch(Base):
+    __tablename__ = 'story_view_sketches'
+    
+    # HyperLogLog registers of the users who viewed a story, see src/viewers.py
+    story_id = Column(Integer, ForeignKey('stories.id'), primary_key=True)
+    registers = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CategoryViewSketch(Base):
+    __tablename__ = 'category_view_sketches'
+    
+    # Distinct viewers of a category's stories per day; merged for longer periods
+    category = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_category_view_sketches_day', 'day'),
+    )
+
+class StorySignature(Base):
+    __tablename__ = 'story_signatures'
+    
+    # MinHash of the transcript's shingles for near-duplicate detection, see src/dedupe.py
+    story_id = Column(Integer, ForeignKey('stories.id'), primary_key=True)
+    minhash = Column(LargeBinary, nullable=False)  # DEDUPE_NUM_PERM little-endian uint32 values
+
+class StoryLshBucket(Base):
+    __tablename__ = 'story_lsh_buckets'
+    
+    # One row per LSH band of each signature; stories sharing a bucket are candidates
+    bucket = Column(BigInteger, primary_key=True)
+    story_id = Column(Integer, ForeignKey('stories.id'), primary_key=True)
+    
+    __table_args__ = (
+        Index('ix_story_lsh_buckets_story', 'story_id'),
+    )
+
+class CompressionDictionary(Base):
+    __tablename__ = 'compression_dictionaries'
+    
+    # zstd dictionaries trained on transcripts, see src/cold_storage.py; never modified once stored
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class StoryTextArchive(Base):
+    __tablename__ = 'story_text_archive'
+    
+    # zstd-compressed transcripts of cold stories; Story.transcript is '' while a row exists here
+    story_id = Column(Integer, ForeignKey('stories.id'), primary_key=True)
+    transcript = Column(LargeBinary, nullable=False)
+    dictionary_id = Column(Integer, ForeignKey('compression_dictionaries.id'))
+    raw_bytes = Column(Integer, nullable=False)  # UTF-8 size before compression
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class JobWatermark(Base):
+    __tablename__ = 'job_watermarks'
+    
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, default=0)  # Highest row id already processed
+    last_timestamp = Column(DateTime)  # Highest timestamp already processed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+@contextmanager
+def begin(bind):
+    """A transaction on an engine, or the one already open on a connection"""
+    if isinstance(bind, EngineConnection):
+        yield bind
+    else:
+        with bind.begin() as connection:
+            yield connection
 
 # Database configuration
 class DatabaseManager:
@@ -141,25 +278,114 @@ class DatabaseManager:
                 connect_args={"check_same_thread": False}  # SQLite specific
             )
         
+        if Config.METRICS_ENABLED:
+            from src.instrumentation import install_query_hooks
+            install_query_hooks(self.engine)
+        
+        # Statement counts for query budgets (see src/instrumentation.py)
+        from src.instrumentation import install_statement_counter
+        install_statement_counter(self.engine)
+        
+        # Local commits invalidate this process's read caches (see src/change_feed.py)
+        install_commit_hooks(self.engine)
+        
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
-    def create_tables(self):
-        """Create all database tables"""
-        Base.metadata.create_all(bind=self.engine)
+        # Monthly partitioned story_interactions, PostgreSQL only (see src/interactions.py)
+        self.partition_interactions = Config.PARTITION_INTERACTIONS and self.engine.dialect.name == 'postgresql'
+        
+        # Set once init_database() has created and upgraded the schema in this process
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        
+    def create_tables(self, bind=None):
+        """Create all database tables, on `bind` (a connection) if given so it can be one transaction"""
+        bind = bind or self.engine
+        if self.partition_interactions:
+            from src.interactions import create_partitioned_interactions_table
+            tables = [table for table in Base.metadata.sorted_tables if table.name != StoryInteraction.__tablename__]
+            Base.metadata.create_all(bind=bind, tables=tables)
+            create_partitioned_interactions_table(bind)
+        else:
+            Base.metadata.create_all(bind=bind)
+        self.upgrade_tables(bind)
+        if self.engine.dialect.name == 'postgresql':
+            from src.change_feed import install_change_triggers
+            install_change_triggers(bind)
+    
+    def upgrade_tables(self, bind=None):
+        """Add columns and indexes that were added to models after their table was created.
+        
+        create_all only creates missing tables, so this keeps existing databases
+        in step with the models for additive changes.
+        """
+        preparer = self.engine.dialect.identifier_preparer
+        with begin(bind or self.engine) as connection:
+            inspector = inspect(connection)
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    statement = f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column.name)} {column_type}"
+                    if column.server_default is not None:
+                        statement += f" DEFAULT {column.server_default.arg}"
+                    connection.execute(text(statement))
+                
+                existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing_indexes:
+                        index.create(bind=connection)
     
     def get_session(self) -> Session:
         """Get a database session"""
         return self.SessionLocal()
     
-    def drop_tables(self):
-        """Drop all tables (for development/testing)"""
-        Base.metadata.drop_all(bind=self.engine)
+    def drop_tables(self, bind=None):
+        """Drop all tables (for development/testing, and before a restore)"""
+        Base.metadata.drop_all(bind=bind or self.engine)
+        self._schema_ready = False
+
+# Global database instance, created on first use so importing this module
+# (models, CLI tools, workers) does not build an engine
+_db_manager = None
+_db_manager_lock = threading.Lock()
+
+def get_db_manager() -> DatabaseManager:
+    """Get the process-wide DatabaseManager, creating it on first use"""
+    global _db_manager
+    if _db_manager is None:
+        with _db_manager_lock:
+            if _db_manager is None:
+                _db_manager = DatabaseManager()
+    return _db_manager
 
-# Global database instance
-db_manager = DatabaseManager()
+def __getattr__(name):
+    # Keep `from src.database import db_manager` working without an import-time engine
+    if name == 'db_manager':
+        return get_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def init_database():
-    """Initialize the database with tables"""
+    """Initialize the database with tables.
+    
+    Runs once per process: the app calls this on every rerun, and checking
+    the schema each time costs over a hundred statements (and trigger DDL on
+    PostgreSQL). Later calls return at once.
+    """
+    manager = get_db_manager()
+    if manager._schema_ready:
+        return
+    with manager._schema_lock:
+        if not manager._schema_ready:
+            _init_database(manager)
+            manager._schema_ready = True
+
+def _init_database(manager):
     try:
         # Ensure data directory exists for SQLite
         if 'sqlite' in Config.get_database_url():
@@ -167,7 +393,7 @@ def init_database():
             Config.AUDIO_DIR.mkdir(parents=True, exist_ok=True)
         
         # Create tables
-        db_manager.create_tables()
+        manager.create_tables()
         
         # Create default users if they don't exist
         with get_db_session() as session:
@@ -209,7 +435,7 @@ def init_database():
 @contextmanager
 def get_db_session():
     """Get a database session with automatic cleanup"""
-    session = db_manager.get_session()
+    session = get_db_manager().get_session()
     try:
         yield session
     except Exception as e:
@@ -217,3 +443,76 @@ def get_db_session():
         raise
     finally:
         session.close()
+
+def dialect_insert(session, model):
+    """INSERT for `model` that supports on_conflict_do_* on both PostgreSQL and SQLite"""
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+@versioned_cache('stories')
+def get_story_categories():
+    """Get the distinct categories that have at least one story"""
+    with get_db_session() as session:
+        rows = session.query(Story.category).filter(Story.category.isnot(None)).distinct().all()
+    return tuple(sorted(row.category for row in rows))
+
+@versioned_cache('stories')
+def count_stories(category=None):
+    """Count stories, optionally within one category"""
+    with get_db_session() as session:
+        query = session.query(Story.id)
+        if category:
+            query = query.filter(Story.category == category)
+        return query.count()
+
+class StoryRow(NamedTuple):
+    """Read-only story feed row.
+
+    Built straight from column tuples, so it carries no ORM instance state or
+    relationships that could lazy-load after the session is closed.
+    """
+    id: int
+    title: str
+    category: Optional[str]
+    summary: Optional[str]
+    transcript: str
+    thumbnail_image_path: Optional[str]
+    created_at: Optional[datetime]
+    comments_count: int
+    author_name: Optional[str]
+
+# Columns selected for StoryRow, in field order; User comes from an outer join
+STORY_ROW_COLUMNS = (
+    Story.id, Story.title, Story.category, Story.summary,
+    Story.transcript, Story.thumbnail_image_path, Story.created_at,
+    func.coalesce(Story.comments_count, 0).label('comments_count'),
+    User.full_name.label('author_name'),
+)
+
+@versioned_cache('stories')
+def get_stories_page(page=0, page_size=None, category=None):
+    """Get one page of stories as StoryRow tuples, newest first"""
+    page_size = page_size or Config.FEED_PAGE_SIZE
+    query = select(*STORY_ROW_COLUMNS).outerjoin(User, User.id == Story.author_id)
+    if category:
+        query = query.where(Story.category == category)
+    query = (
+        query.order_by(Story.created_at.desc(), Story.id.desc())
+        .offset(page * page_size)
+        .limit(page_size)
+    )
+    from src.cold_storage import fill_transcripts
+    with get_db_session() as session:
+        return fill_transcripts(tuple(StoryRow._make(row) for row in session.execute(query)), session)
+
+def get_story_transcript(story_id):
+    """Get the full transcript of one story (from cold storage if archived), or None"""
+    from src.cold_storage import load_transcripts
+    with get_db_session() as session:
+        transcript = session.execute(select(Story.transcript).where(Story.id == story_id)).scalar_one_or_none()
+        if transcript == '':
+            transcript = load_transcripts([story_id], session).get(story_id, '')
+        return transcript
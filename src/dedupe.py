@@ -0,0 +1,344 @@
+"""
+Near-duplicate story detection for ElderWise application
+
+Each transcript is reduced to a MinHash signature: DEDUPE_NUM_PERM minimum
+hash values over its word shingles, where the share of equal values between
+two signatures estimates the Jaccard similarity of their shingle sets. The
+signature is split into DEDUPE_BANDS bands and each band is hashed into a
+bucket row, so finding candidates for a new story is one indexed lookup of a
+few bucket keys instead of a comparison with every stored transcript.
+
+Signatures are added in the same transaction as the story. claim_signature()
+locks the new signature's buckets in that transaction and checks them again,
+so two near-identical submissions at the same moment (a double click) can't
+both be stored. index_missing() backfills stories stored before the index
+existed, find_duplicate_groups() reports clusters of near-duplicates across
+the whole corpus and merge_duplicates() folds each cluster into its oldest
+story.
+"""
+
+import re
+import hashlib
+from functools import lru_cache
+from typing import NamedTuple
+from sqlalchemy import select, delete, update, func, text, false
+from src.config import Config
+from src.database import (
+    get_db_session, Story, StoryInteraction, StoryScore, StoryDailyStats, StoryViewSketch,
+    StorySignature, StoryLshBucket, StoryTextArchive,
+)
+from src.cold_storage import load_transcripts
+
+# Universal hash parameters, fixed so signatures stay comparable across processes
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SEED = 20240611
+
+_WORD = re.compile(r"\w+")
+
+# Story counters merge_duplicates() adds to the kept story
+MERGED_COUNTERS = ('views_count', 'likes_count', 'shares_count', 'comments_count')
+
+class DuplicateMatch(NamedTuple):
+    """An existing story that resembles a transcript"""
+    story_id: int
+    title: str
+    similarity: float
+
+class DuplicateStory(ValueError):
+    """A transcript is too similar to a stored story to be shared again"""
+
+    def __init__(self, match):
+        super().__init__(f"This story has already been shared as \"{match.title}\"")
+        self.match = match
+
+@lru_cache(maxsize=1)
+def _permutations():
+    import numpy as np
+
+    rng = np.random.RandomState(_SEED)
+    a = rng.randint(1, _MERSENNE_PRIME, size=Config.DEDUPE_NUM_PERM, dtype=np.uint64)
+    b = rng.randint(0, _MERSENNE_PRIME, size=Config.DEDUPE_NUM_PERM, dtype=np.uint64)
+    return a, b
+
+def shingles(text):
+    """Set of word k-grams of the normalized text"""
+    words = _WORD.findall((text or "").lower())
+    k = Config.DEDUPE_SHINGLE_WORDS
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def minhash(text):
+    """MinHash signature of a transcript as a uint32 array, or None for empty text"""
+    import numpy as np
+
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") for gram in grams),
+        dtype=np.uint64, count=len(grams),
+    )
+    a, b = _permutations()
+    # (a * h + b) mod p, truncated to 32 bits; uint64 overflow is intended, as in the usual formulation
+    permuted = ((np.outer(a, hashes) + b[:, None]) % np.uint64(_MERSENNE_PRIME)) & np.uint64(_MAX_HASH)
+    return permuted.min(axis=1).astype("<u4")
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures"""
+    return float((signature == other).mean())
+
+def _from_bytes(data):
+    import numpy as np
+    return np.frombuffer(data, dtype="<u4")
+
+def band_buckets(signature):
+    """One bucket key per LSH band (signed 63-bit, so it fits a BIGINT)"""
+    rows = Config.DEDUPE_NUM_PERM // Config.DEDUPE_BANDS
+    buckets = []
+    for band in range(Config.DEDUPE_BANDS):
+        digest = hashlib.blake2b(
+            signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8, person=band.to_bytes(2, "little")
+        ).digest()
+        buckets.append(int.from_bytes(digest, "little") >> 1)
+    return sorted(set(buckets))
+
+def index_story(session, story_id, transcript, signature=None):
+    """Store a story's signature and buckets in the caller's transaction"""
+    if signature is None:
+        signature = minhash(transcript)
+    session.execute(delete(StoryLshBucket).where(StoryLshBucket.story_id == story_id))
+    session.execute(delete(StorySignature).where(StorySignature.story_id == story_id))
+    if signature is None:
+        return
+    session.add(StorySignature(story_id=story_id, minhash=signature.tobytes()))
+    session.add_all(StoryLshBucket(bucket=bucket, story_id=story_id) for bucket in band_buckets(signature))
+
+def find_similar(transcript, threshold=None, limit=5, signature=None, session=None):
+    """Stories whose transcripts are at least `threshold` similar, most similar first"""
+    threshold = Config.DEDUPE_WARN_THRESHOLD if threshold is None else threshold
+    if signature is None:
+        signature = minhash(transcript)
+    if signature is None:
+        return []
+
+    candidates = (
+        select(StoryLshBucket.story_id)
+        .where(StoryLshBucket.bucket.in_(band_buckets(signature)))
+        .distinct()
+        .scalar_subquery()
+    )
+    query = (
+        select(Story.id, Story.title, StorySignature.minhash)
+        .join(StorySignature, StorySignature.story_id == Story.id)
+        .where(Story.id.in_(candidates))
+    )
+    if session is None:
+        with get_db_session() as session:
+            rows = session.execute(query).all()
+    else:
+        rows = session.execute(query).all()
+
+    matches = [
+        DuplicateMatch(story_id, title, similarity(signature, _from_bytes(data)))
+        for story_id, title, data in rows
+    ]
+    matches = [match for match in matches if match.similarity >= threshold]
+    return sorted(matches, key=lambda match: (-match.similarity, match.story_id))[:limit]
+
+def lock_signature(session, signature):
+    """Hold off other submissions that share a bucket with `signature` until the caller's transaction ends.
+
+    PostgreSQL takes one transaction advisory lock per bucket, in order, so
+    two submissions never deadlock. SQLite has one writer at a time, so an
+    empty write is enough to take its lock.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        for bucket in band_buckets(signature):
+            session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": bucket})
+    else:
+        session.execute(delete(StoryLshBucket).where(false()))
+
+def claim_signature(session, signature):
+    """Lock a new story's signature and check it again inside the transaction that stores the story.
+
+    Returns the similar stories to warn about. Raises DuplicateStory if one
+    is above DEDUPE_BLOCK_THRESHOLD, e.g. the other half of a double click.
+    """
+    if signature is None:
+        return []
+    lock_signature(session, signature)
+    similar = find_similar(None, signature=signature, session=session)
+    if similar and similar[0].similarity >= Config.DEDUPE_BLOCK_THRESHOLD:
+        raise DuplicateStory(similar[0])
+    return similar
+
+def index_missing(batch_size=500):
+    """Add signatures for stories that don't have one yet; returns how many were indexed"""
+    indexed = 0
+    while True:
+        with get_db_session() as session:
+            rows = session.execute(
+                select(Story.id, Story.transcript)
+                .outerjoin(StorySignature, StorySignature.story_id == Story.id)
+                .where(StorySignature.story_id.is_(None))
+                .order_by(Story.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return indexed
+            archived = load_transcripts([story_id for story_id, transcript in rows if transcript == ''], session)
+            for story_id, transcript in rows:
+                transcript = archived.get(story_id, transcript)
+                signature = minhash(transcript)
+                if signature is None:
+                    # Nothing to hash; an empty signature (and no buckets) marks it as indexed
+                    session.add(StorySignature(story_id=story_id, minhash=b""))
+                else:
+                    index_story(session, story_id, transcript, signature)
+            session.commit()
+            indexed += len(rows)
+
+def find_duplicate_groups(threshold=None):
+    """Groups of story ids (oldest first) whose transcripts are near-duplicates of each other.
+
+    Only pairs that share an LSH bucket are compared, then grouped transitively.
+    """
+    threshold = Config.DEDUPE_BLOCK_THRESHOLD if threshold is None else threshold
+    shared = (
+        select(StoryLshBucket.bucket)
+        .group_by(StoryLshBucket.bucket)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    with get_db_session() as session:
+        members = session.execute(
+            select(StoryLshBucket.bucket, StoryLshBucket.story_id)
+            .join(shared, shared.c.bucket == StoryLshBucket.bucket)
+            .order_by(StoryLshBucket.bucket, StoryLshBucket.story_id)
+        ).all()
+        story_ids = {story_id for _, story_id in members}
+        signatures = {
+            story_id: _from_bytes(data)
+            for story_id, data in session.execute(
+                select(StorySignature.story_id, StorySignature.minhash).where(StorySignature.story_id.in_(story_ids))
+            )
+        } if story_ids else {}
+
+    buckets = {}
+    for bucket, story_id in members:
+        buckets.setdefault(bucket, []).append(story_id)
+
+    # Union-find over verified candidate pairs
+    parent = {}
+
+    def root(story_id):
+        while parent.get(story_id, story_id) != story_id:
+            story_id = parent[story_id]
+        return story_id
+
+    checked = set()
+    for ids in buckets.values():
+        for i, first in enumerate(ids):
+            for second in ids[i + 1:]:
+                if (first, second) in checked:
+                    continue
+                checked.add((first, second))
+                if similarity(signatures[first], signatures[second]) >= threshold:
+                    first_root, second_root = root(first), root(second)
+                    if first_root != second_root:
+                        parent[max(first_root, second_root)] = min(first_root, second_root)
+
+    groups = {}
+    for story_id in parent:
+        groups.setdefault(root(story_id), set()).add(story_id)
+    for group_root, group in groups.items():
+        group.add(group_root)
+    return sorted(sorted(group) for group in groups.values())
+
+def _merge_view_sketches(session, keep, duplicates):
+    """Fold the duplicates' unique viewer sketches into the kept story's"""
+    from src.hyperloglog import HyperLogLog
+
+    rows = session.execute(
+        select(StoryViewSketch.registers).where(StoryViewSketch.story_id.in_(duplicates))
+    ).scalars().all()
+    if not rows:
+        return
+    kept = session.get(StoryViewSketch, keep)
+    sketch = HyperLogLog.merged(rows + ([kept.registers] if kept else []))
+    if kept is None:
+        session.add(StoryViewSketch(story_id=keep, registers=sketch.to_bytes()))
+    else:
+        kept.registers = sketch.to_bytes()
+
+def _merge_daily_views(session, keep, duplicates):
+    """Add the duplicates' compacted daily views to the kept story's"""
+    rows = session.execute(
+        select(StoryDailyStats.day, func.sum(StoryDailyStats.views))
+        .where(StoryDailyStats.story_id.in_(duplicates))
+        .group_by(StoryDailyStats.day)
+    ).all()
+    for day, views in rows:
+        kept = session.get(StoryDailyStats, (keep, day))
+        if kept is None:
+            session.add(StoryDailyStats(story_id=keep, day=day, views=views))
+        else:
+            kept.views += views
+    session.flush()
+
+def merge_duplicates(groups):
+    """Keep the oldest story of each group and fold the others into it.
+
+    Interactions (views, likes, comments), counters and compacted daily views
+    move to the kept story, and category_daily_stats is corrected to match;
+    the duplicates' rows and covers are removed. Returns how many stories
+    were removed.
+    """
+    from src.analytics import move_merged_story_stats
+    from src.storage import get_storage
+
+    removed, covers = 0, []
+    with get_db_session() as session:
+        for group in groups:
+            keep, duplicates = group[0], list(group[1:])
+            if not duplicates:
+                continue
+            move_merged_story_stats(session, keep, duplicates)
+            moved = session.execute(
+                select(*(func.coalesce(func.sum(getattr(Story, column)), 0) for column in MERGED_COUNTERS))
+                .where(Story.id.in_(duplicates))
+            ).one()
+            session.execute(
+                update(StoryInteraction)
+                .where(StoryInteraction.story_id.in_(duplicates))
+                .values(story_id=keep)
+                .execution_options(synchronize_session=False)
+            )
+            session.execute(
+                update(Story)
+                .where(Story.id == keep)
+                .values({
+                    column: func.coalesce(getattr(Story, column), 0) + count
+                    for column, count in zip(MERGED_COUNTERS, moved)
+                })
+            )
+            covers.extend(session.execute(
+                select(Story.thumbnail_image_path).where(Story.id.in_(duplicates))
+            ).scalars())
+            _merge_view_sketches(session, keep, duplicates)
+            _merge_daily_views(session, keep, duplicates)
+            for model in (StoryLshBucket, StorySignature, StoryScore, StoryDailyStats, StoryViewSketch, StoryTextArchive):
+                session.execute(delete(model).where(model.story_id.in_(duplicates)))
+            session.execute(delete(Story).where(Story.id.in_(duplicates)))
+            removed += len(duplicates)
+        session.commit()
+
+    for key in covers:
+        if key:
+            try:
+                get_storage().delete(key)
+            except Exception:
+                pass  # An orphaned cover is harmless
+    return removed
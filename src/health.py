@@ -0,0 +1,225 @@
+"""
+Health, readiness and warm-up for ElderWise application
+
+Left alone, a fresh process does its expensive first-time work on the first
+user's request:
+- checking and creating tables
+- opening pooled connections
+- running the first feed page's queries
+- writing that page's thumbnails
+
+warm_up() does all of this up front. serve.py runs it before Streamlit starts
+listening, so a platform health check on /_stcore/health only passes once
+the process is warm.
+
+health_report() describes the running process: a database round trip, pool
+saturation, and which read caches hold entries. It is served as /healthz
+(liveness) and /readyz (readiness) on the metrics port.
+"""
+
+import json
+import time
+import logging
+import importlib
+import threading
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Imported during warm-up so the first script run finds them in sys.modules
+PAGE_MODULES = ("pages.share_story", "pages.read_stories", "pages.inbox", "pages.analytics")
+
+_warm_up_state = {"done": False, "seconds": None, "steps": {}, "error": None}
+_warm_up_lock = threading.Lock()
+
+def _open_connections(count):
+    """Hold `count` pooled connections at once, so the pool keeps them open afterwards"""
+    from sqlalchemy import text
+    from src.database import get_db_manager
+
+    engine = get_db_manager().engine
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+def _warm_feed():
+    """Load the first feed page exactly as story_feed asks for it, thumbnails included"""
+    from src.database import get_story_categories, count_stories, get_stories_page
+    from src.rendering import render_story_grid_html
+
+    count_stories()
+    get_story_categories()
+    stories = get_stories_page(0, Config.FEED_PAGE_SIZE, None)
+    render_story_grid_html(stories)  # Writes missing thumbnails (and downloads remote covers)
+    return len(stories)
+
+def warm_up():
+    """Get this process ready to serve (once per process); returns {step: milliseconds}.
+
+    Raises if a step fails, so the caller can retry.
+    """
+    from src.database import init_database
+    from src.change_feed import start_change_listener
+
+    steps = (
+        ("database", init_database),
+        ("change_listener", start_change_listener),  # Feed reads are only cached while it runs
+        ("pool", lambda: _open_connections(Config.WARMUP_CONNECTIONS)),
+        ("imports", lambda: [importlib.import_module(name) for name in PAGE_MODULES]),
+        ("feed", _warm_feed),
+    )
+    with _warm_up_lock:
+        if _warm_up_state["done"]:
+            return dict(_warm_up_state["steps"])
+        started = time.perf_counter()
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                _warm_up_state["error"] = f"{name}: {e}"
+                raise
+            _warm_up_state["steps"][name] = round((time.perf_counter() - step_started) * 1000, 1)
+        _warm_up_state.update(done=True, seconds=round(time.perf_counter() - started, 3), error=None)
+        return dict(_warm_up_state["steps"])
+
+_warm_up_thread = None
+
+def start_warm_up():
+    """Run warm_up() in a background thread (once per process), e.g. under plain `streamlit run`"""
+    global _warm_up_thread
+    if _warm_up_state["done"] or _warm_up_thread is not None:
+        return
+
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning("Warm-up failed: %s", e)
+
+    _warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    _warm_up_thread.start()
+
+# Health report
+
+def pool_status():
+    """Connections checked out of the pool against what it can hand out"""
+    from src.database import get_db_manager
+
+    pool = get_db_manager().engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"class": type(pool).__name__}  # SQLite in-memory pools don't count connections
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+def database_check():
+    """Time a SELECT 1 through the pool"""
+    from sqlalchemy import text
+    from src.database import get_db_manager
+
+    started = time.perf_counter()
+    try:
+        with get_db_manager().engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    elapsed = time.perf_counter() - started
+    if Config.METRICS_ENABLED:
+        from src.instrumentation import registry
+        registry.histogram(
+            "elderwise_health_db_roundtrip_seconds", "check", "select_1",
+            "Database round trips made by health checks"
+        ).observe(elapsed)
+    return {"ok": True, "latency_ms": round(elapsed * 1000, 2)}
+
+def cache_status():
+    """Entries held by the shared read caches"""
+    from src.database import get_story_categories, count_stories, get_stories_page
+    from src.change_feed import listener_running
+    from src.rendering import cached_thumbnails
+    from src.prefetch import pending_pages
+
+    return {
+        "change_listener": listener_running(),
+        "feed_pages": get_stories_page.cache_entries(),
+        "story_counts": count_stories.cache_entries(),
+        "categories": get_story_categories.cache_entries(),
+        "thumbnails": cached_thumbnails(),
+        "prefetching_pages": pending_pages(),
+    }
+
+def health_report():
+    """Readiness of this process as a JSON-friendly dict; 'ready' is what load balancers want"""
+    pool = pool_status()
+    saturated = pool.get("saturation", 0) >= Config.HEALTH_POOL_SATURATION
+    # A check that waited for a connection from a full pool would only add to the queue
+    database = {"ok": None, "skipped": "pool saturated"} if saturated else database_check()
+
+    if not _warm_up_state["done"]:
+        status = "starting"
+    elif database["ok"] is False:
+        status = "unavailable"
+    elif saturated or database["latency_ms"] > Config.HEALTH_DB_LATENCY_MS:
+        status = "degraded"
+    else:
+        status = "ok"
+
+    return {
+        "status": status,
+        "ready": status == "ok",
+        "warm_up": dict(_warm_up_state),
+        "database": database,
+        "pool": pool,
+        "caches": cache_status(),
+    }
+
+# HTTP endpoints and metrics
+
+def _json_response(status, payload):
+    return status, "application/json", json.dumps(payload, default=str).encode("utf-8")
+
+def _liveness():
+    return _json_response(200, {"status": "alive", "warm": _warm_up_state["done"]})
+
+def _readiness():
+    report = health_report()
+    return _json_response(200 if report["ready"] else 503, report)
+
+def _collect_pool_gauges():
+    pool = pool_status()
+    if "checked_out" not in pool:
+        return
+    from src.instrumentation import registry
+    for state in ("checked_out", "idle", "overflow"):
+        registry.set_gauge(
+            "elderwise_db_pool_connections", "state", state, pool[state],
+            help_text="Connections in this process's database pool"
+        )
+    registry.set_gauge(
+        "elderwise_warm", "process", "app", int(_warm_up_state["done"]),
+        help_text="1 once warm-up has finished"
+    )
+
+def register_health_checks():
+    """Serve /healthz and /readyz from the metrics endpoint and export pool gauges"""
+    from src.instrumentation import add_route, registry
+
+    add_route("/healthz", _liveness)
+    add_route("/readyz", _readiness)
+    registry.add_collector(_collect_pool_gauges)
@@ -0,0 +1,64 @@
+"""
+HyperLogLog sketches for ElderWise application
+
+A sketch estimates how many distinct items it has seen from 2^precision
+one-byte registers (4 KB at the default precision of 12, about 1.6% standard
+error), whatever the number of items. Sketches with the same precision merge
+by taking the larger value of each register, so per-day sketches can be
+rolled up into any period without double counting repeat visitors.
+"""
+
+import math
+import hashlib
+from src.config import Config
+
+class HyperLogLog:
+    """Distinct-count sketch stored as a bytes value of 2^precision registers"""
+
+    def __init__(self, registers=None, precision=None):
+        if registers is None:
+            registers = bytes(1 << (precision or Config.HLL_PRECISION))
+        self.registers = bytearray(registers)
+        self.precision = len(self.registers).bit_length() - 1
+        if len(self.registers) != 1 << self.precision or not 4 <= self.precision <= 18:
+            raise ValueError(f"Invalid HyperLogLog register count: {len(self.registers)}")
+
+    def add(self, item):
+        """Add an item (hashed as text); returns whether the sketch changed"""
+        hashed = int.from_bytes(hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest(), "big")
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        rest = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1  # Position of the first 1 bit
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimated number of distinct items added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small sets
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def merged(cls, values, precision=None):
+        """One sketch from several stored register values (empty if there are none)"""
+        sketch = cls(precision=precision)
+        for value in values:
+            sketch.merge(cls(value))
+        return sketch
@@ -0,0 +1,137 @@
+"""
+Cover image processing for ElderWise application
+
+Phone photos are 12-48 megapixels but covers are shown at most COVER_MAX_WIDTH
+wide. JPEGs are therefore decoded with draft mode, which lets libjpeg scale
+the DCT by 1/2, 1/4 or 1/8 while decoding, so the full-size bitmap is never
+built. The remaining downscale uses reducing_gap, EXIF orientation is applied
+to the small image, and covers are saved as progressive JPEGs.
+
+Uploads are validated from the image header alone (format, dimensions and
+byte size) before anything is decoded, so decompression bombs are rejected
+without allocating their pixels.
+"""
+
+import io
+import os
+from typing import NamedTuple
+from src.config import Config
+
+class ImageInfo(NamedTuple):
+    """Header facts about an uploaded image"""
+    format: str
+    width: int
+    height: int
+    byte_size: int
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+_EXIF_ORIENTATION = 0x0112
+
+def _open(source):
+    """Open an image lazily (header only) with Pillow's bomb limit set from Config"""
+    from PIL import Image  # Imported on first use, it is slow to load
+
+    # Backstop for any decode path: Pillow refuses images over twice this size
+    Image.MAX_IMAGE_PIXELS = Config.MAX_IMAGE_PIXELS
+    return Image.open(source)
+
+def _byte_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, "size", None)  # Streamlit's UploadedFile
+    if isinstance(size, int):
+        return size
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+def validate_image(source):
+    """Check an upload's byte size, format and dimensions without decoding it.
+
+    Raises ValueError with a message for the user when a limit is exceeded.
+    File objects are rewound afterwards.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    byte_size = _byte_size(source)
+    if byte_size > Config.MAX_IMAGE_UPLOAD_MB * 1024 * 1024:
+        raise ValueError(f"Cover photos are limited to {Config.MAX_IMAGE_UPLOAD_MB} MB")
+
+    try:
+        with _open(source) as image:
+            image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        raise ValueError("This image has too many pixels to process")
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ValueError("This file is not a valid image")
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+    if image_format not in Config.ALLOWED_IMAGE_FORMATS:
+        raise ValueError(f"Please upload a {' or '.join(Config.ALLOWED_IMAGE_FORMATS)} image")
+    if width > Config.MAX_IMAGE_SIDE or height > Config.MAX_IMAGE_SIDE:
+        raise ValueError(f"Images can be at most {Config.MAX_IMAGE_SIDE} pixels wide or tall")
+    if width * height > Config.MAX_IMAGE_PIXELS:
+        raise ValueError(f"Images can be at most {Config.MAX_IMAGE_PIXELS // 1_000_000} megapixels")
+    return ImageInfo(image_format, width, height, byte_size)
+
+def _target_size(image, max_width, max_height):
+    """Size of `image` after fitting it in the box, in stored (pre-rotation) pixels"""
+    width, height = image.size
+    orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        max_width, max_height = max_height, max_width
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def _flatten(image):
+    """RGB copy of `image` with any transparency composited onto white"""
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+def load_image(source, max_width, max_height=None):
+    """Decode an image no larger than the box, upright and in RGB.
+
+    `source` is a path or a binary file object.
+    """
+    from PIL import Image, ImageOps
+
+    max_height = max_height or max_width * 4
+    with _open(source) as image:
+        target = _target_size(image, max_width, max_height)
+        if image.format == "JPEG":
+            # Decodes at the smallest DCT scale that is still >= target
+            image.draft("RGB", target)
+        if image.size != target:
+            image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=Config.IMAGE_REDUCING_GAP)
+        image = ImageOps.exif_transpose(image)
+        return _flatten(image)
+
+def encode_jpeg(image, quality=None):
+    """Encode an RGB image as a progressive JPEG"""
+    buffer = io.BytesIO()
+    image.save(
+        buffer, format="JPEG", quality=quality or Config.COVER_JPEG_QUALITY,
+        optimize=True, progressive=True
+    )
+    return buffer.getvalue()
+
+def process_cover(source, max_width=None):
+    """Resized, upright cover photo as progressive JPEG bytes"""
+    image = load_image(source, max_width or Config.COVER_MAX_WIDTH)
+    return encode_jpeg(image)
+
+def make_preview(source, width=300):
+    """Small JPEG preview of an upload for the share form"""
+    image = load_image(source, width)
+    return encode_jpeg(image, quality=80)
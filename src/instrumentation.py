@@ -0,0 +1,365 @@
+"""
+Query and request instrumentation for ElderWise application
+
+Records SQL latency per normalized statement, logs slow queries and times
+reruns and pages with spans. Metrics are exposed in the Prometheus text format,
+either through a small HTTP endpoint or a periodically written file. Query
+budgets count the statements a page or fragment runs, so an N+1 loop over a
+page of stories fails in testing instead of slowing production.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    """Thread-safe cumulative histogram with Prometheus-style buckets"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count)"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+class MetricsRegistry:
+    """Named histogram families, counters and gauges, keyed by a single label value"""
+
+    def __init__(self):
+        self.histograms = {}  # (metric, label_name, label_value) -> Histogram
+        self.counters = {}  # (metric, label_name, label_value) -> int
+        self.gauges = {}  # (metric, label_name, label_value) -> float
+        self.collectors = []  # Called before every render, e.g. to refresh gauges
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, metric, label_name, label_value, help_text=""):
+        key = (metric, label_name, label_value)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+                self.help.setdefault(metric, help_text)
+        return histogram
+
+    def increment(self, metric, label_name, label_value, amount=1, help_text=""):
+        key = (metric, label_name, label_value)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self.help.setdefault(metric, help_text)
+
+    def set_gauge(self, metric, label_name, label_value, value, help_text=""):
+        key = (metric, label_name, label_value)
+        with self._lock:
+            self.gauges[key] = value
+            self.help.setdefault(metric, help_text)
+
+    def add_collector(self, collector):
+        """Call collector() before each render (idempotent)"""
+        with self._lock:
+            if collector not in self.collectors:
+                self.collectors.append(collector)
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", getattr(collector, "__name__", collector), e)
+
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        seen = set()
+        for (metric, label_name, label_value), histogram in histograms:
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# HELP {metric} {self.help.get(metric, '')}")
+                lines.append(f"# TYPE {metric} histogram")
+            label = f'{label_name}="{_escape_label(label_value)}"'
+            cumulative, total, count = histogram.snapshot()
+            for bound, value in zip(histogram.buckets + ("+Inf",), cumulative):
+                lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {value}')
+            lines.append(f"{metric}_sum{{{label}}} {total:.6f}")
+            lines.append(f"{metric}_count{{{label}}} {count}")
+
+        for (metric, label_name, label_value), value in counters:
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# HELP {metric} {self.help.get(metric, '')}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f'{metric}{{{label_name}="{_escape_label(label_value)}"}} {value}')
+
+        for (metric, label_name, label_value), value in gauges:
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# HELP {metric} {self.help.get(metric, '')}")
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f'{metric}{{{label_name}="{_escape_label(label_value)}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_statement(statement, max_length=200):
+    """Collapse a SQL statement to a stable label: literals and IN lists become ?"""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return statement[:max_length]
+
+# SQL query instrumentation
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    elapsed = time.perf_counter() - started
+    label = normalize_statement(statement)
+    registry.histogram(
+        "elderwise_sql_query_duration_seconds", "statement", label,
+        "SQL query latency by normalized statement"
+    ).observe(elapsed)
+
+    if elapsed * 1000 >= Config.SLOW_QUERY_MS:
+        registry.increment(
+            "elderwise_sql_slow_queries_total", "statement", label,
+            help_text="Queries slower than SLOW_QUERY_MS"
+        )
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, label)
+
+def install_query_hooks(engine):
+    """Attach latency hooks to an engine (idempotent)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# Query budgets
+
+class QueryBudgetExceeded(AssertionError):
+    """A block issued more SQL statements than its budget allows"""
+
+class QueryCounter:
+    """Statements executed by the current thread while the counter is active"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+_active_counters = threading.local()
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_active_counters, "stack", ()):
+        counter.count += 1
+        counter.statements.append(normalize_statement(statement))
+
+def install_statement_counter(engine):
+    """Let count_queries() see an engine's statements (idempotent, cheap when unused)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "after_cursor_execute", _count_statement):
+        event.listen(engine, "after_cursor_execute", _count_statement)
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements this thread runs inside the block"""
+    counter = QueryCounter()
+    stack = _active_counters.__dict__.setdefault("stack", [])
+    stack.append(counter)
+    try:
+        yield counter
+    finally:
+        stack.remove(counter)
+
+@contextmanager
+def query_budget(name, limit):
+    """Flag blocks that run more than `limit` statements, e.g. an N+1 loop.
+
+    Overruns are counted and logged; with QUERY_BUDGET_STRICT (set by tests
+    and the load test) they raise QueryBudgetExceeded instead.
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count <= limit:
+        return
+    registry.increment(
+        "elderwise_query_budget_exceeded_total", "span", name,
+        help_text="Blocks that ran more SQL statements than their budget"
+    )
+    message = f"{name} ran {counter.count} SQL statements, budget is {limit}"
+    if Config.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message + ":\n  " + "\n  ".join(counter.statements))
+    logger.warning(message)
+
+def limit_queries(name, limit):
+    """Decorator form of query_budget"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(name, limit):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Timing spans
+
+@contextmanager
+def timed_span(name):
+    """Record the wall time of a block under elderwise_span_duration_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.histogram(
+            "elderwise_span_duration_seconds", "span", name,
+            "Wall time of app reruns, pages and fragments"
+        ).observe(time.perf_counter() - started)
+
+def timed(name):
+    """Decorator form of timed_span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Config.METRICS_ENABLED:
+                return func(*args, **kwargs)
+            with timed_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Export
+
+_last_dump = 0.0
+_dump_lock = threading.Lock()
+
+def dump_metrics(path=None):
+    """Write the current metrics to a file atomically"""
+    path = path or Config.METRICS_FILE
+    temp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(temp_path, "w") as f:
+        f.write(registry.render_prometheus())
+    os.replace(temp_path, path)
+
+def maybe_dump_metrics():
+    """Dump metrics to METRICS_FILE at most once per METRICS_DUMP_INTERVAL_SECONDS"""
+    global _last_dump
+    if not Config.METRICS_FILE:
+        return
+    now = time.monotonic()
+    if now - _last_dump < Config.METRICS_DUMP_INTERVAL_SECONDS:
+        return
+    with _dump_lock:
+        if now - _last_dump < Config.METRICS_DUMP_INTERVAL_SECONDS:
+            return
+        _last_dump = now
+    try:
+        dump_metrics()
+    except OSError as e:
+        logger.warning("Could not write metrics file: %s", e)
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+_routes = {}  # path -> handler() returning (status, content type, body bytes)
+
+def add_route(path, handler):
+    """Serve another path, e.g. a health check, from the metrics endpoint"""
+    _routes[path] = handler
+
+def start_metrics_server(port=None):
+    """Serve /metrics (and any add_route() paths) from a daemon thread (once per process)"""
+    global _metrics_server
+    port = port or Config.METRICS_PORT
+    if not port:
+        return None
+
+    with _metrics_server_lock:
+        if _metrics_server is not None:
+            return _metrics_server or None
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    status = 200
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                    body = registry.render_prometheus().encode("utf-8")
+                elif path in _routes:
+                    status, content_type, body = _routes[path]()
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the app log
+
+        try:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+        except OSError as e:
+            # Another process on this host already serves the port
+            logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+            _metrics_server = False  # Don't retry on every rerun
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server
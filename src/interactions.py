@@ -0,0 +1,422 @@
+"""
+Story interaction storage for ElderWise application
+
+Logged views make story_interactions the largest table, so raw view events are
+only kept for INTERACTION_ROLLUP_AFTER_DAYS. Older views are compacted into
+story_daily_stats (one row per story and day) and analytics read the rollups
+plus the raw events that are not compacted yet.
+
+On PostgreSQL with PARTITION_INTERACTIONS the table is range partitioned by
+month and retention drops whole partitions. Elsewhere compacted views are moved
+into monthly story_interactions_archive_YYYYMM tables, which retention drops
+the same way. Comments, likes and shares are never compacted or dropped.
+"""
+
+import re
+import logging
+from datetime import datetime, time, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import select, insert, delete, func, text, inspect, table, column
+from src.config import Config
+from src.database import begin, get_db_manager, get_db_session, Story, StoryInteraction, StoryDailyStats, JobWatermark
+from src.scoring import get_watermark
+
+logger = logging.getLogger(__name__)
+
+TABLE = StoryInteraction.__tablename__
+COLUMN_NAMES = [column.name for column in StoryInteraction.__table__.columns]
+
+# Watermark in job_watermarks: last_timestamp is the first day not compacted yet
+COMPACTION_WATERMARK = 'story_interactions.compacted'
+
+_PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+_ARCHIVE_NAME = re.compile(rf"^{TABLE}_archive_(\d{{4}})(\d{{2}})$")
+
+# Same columns as the StoryInteraction model. The partition key has to be part
+# of the primary key and cannot be NULL.
+PARTITIONED_TABLE_DDL = f"""
+CREATE TABLE {TABLE} (
+    id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    story_id INTEGER NOT NULL REFERENCES stories (id),
+    interaction_type VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    comment_text TEXT,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at)
+"""
+
+def month_start(moment):
+    """First instant of the month containing `moment`"""
+    return datetime(moment.year, moment.month, 1)
+
+def add_months(month, count):
+    """Month start `count` months after (or before) `month`"""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+def archive_name(month):
+    return f"{TABLE}_archive_{month.year:04d}{month.month:02d}"
+
+def _parse_month(pattern, name):
+    match = pattern.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def is_partitioned(connection):
+    """Whether story_interactions is a partitioned PostgreSQL table"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    return bool(connection.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:name)"), {"name": TABLE}
+    ).scalar())
+
+def _interactions_partitioned():
+    with get_db_manager().engine.connect() as connection:
+        return is_partitioned(connection)
+
+# PostgreSQL partitions
+
+def _partitions(connection):
+    """Monthly partitions of story_interactions as {month start: table name}"""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:name)"
+    ), {"name": TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        month = _parse_month(_PARTITION_NAME, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+def _ensure_partitions(connection, first_month, months_ahead):
+    """Create missing monthly partitions from `first_month` to `months_ahead` past now"""
+    existing = _partitions(connection)
+    last_month = add_months(month_start(datetime.utcnow()), months_ahead)
+    created = []
+    month = first_month
+    while month <= last_month:
+        if month not in existing:
+            name = partition_name(month)
+            bounds = f"FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            # Rows that landed in the default partition while this month had no
+            # partition have to move, otherwise the partition can't be attached
+            connection.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+            connection.execute(text(
+                f"WITH moved AS (DELETE FROM {TABLE}_default "
+                f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ), {"start": month, "end": add_months(month, 1)})
+            connection.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+def _create_partitioned_table(connection, first_month):
+    connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {TABLE}_id_seq"))
+    connection.execute(text(PARTITIONED_TABLE_DDL))
+    connection.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+    connection.execute(text(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"))
+    for index in StoryInteraction.__table__.indexes:
+        index.create(bind=connection)
+    _ensure_partitions(connection, first_month, Config.INTERACTION_PARTITION_MONTHS_AHEAD)
+
+def create_partitioned_interactions_table(bind):
+    """Create story_interactions as a monthly partitioned table if it doesn't exist"""
+    with begin(bind) as connection:
+        if not inspect(connection).has_table(TABLE):
+            _create_partitioned_table(connection, month_start(datetime.utcnow()))
+        elif is_partitioned(connection):
+            _ensure_partitions(connection, month_start(datetime.utcnow()), Config.INTERACTION_PARTITION_MONTHS_AHEAD)
+        else:
+            logger.warning(
+                "%s is not partitioned; run `python maintain_interactions.py --partition` to convert it", TABLE
+            )
+
+def partition_existing_interactions():
+    """Convert an existing plain story_interactions table into a partitioned one.
+
+    Runs in one transaction holding an exclusive lock, so the app should be
+    stopped or idle while it runs. Returns the number of rows copied.
+    """
+    engine = get_db_manager().engine
+    if engine.dialect.name != 'postgresql':
+        raise RuntimeError("Partitioning story_interactions requires PostgreSQL")
+
+    old_table = f"{TABLE}_unpartitioned"
+    columns = ", ".join(COLUMN_NAMES)
+    with engine.begin() as connection:
+        if is_partitioned(connection):
+            return 0
+        connection.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+        first = connection.execute(text(f"SELECT min(created_at) FROM {TABLE}")).scalar()
+
+        # Free the table, primary key and index names for the new table. The id
+        # sequence is reused so existing ids stay valid.
+        primary_key = inspect(connection).get_pk_constraint(TABLE)['name']
+        connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {old_table}"))
+        if primary_key:
+            connection.execute(text(f"ALTER TABLE {old_table} DROP CONSTRAINT {primary_key}"))
+        for index in StoryInteraction.__table__.indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+        _create_partitioned_table(connection, month_start(first or datetime.utcnow()))
+        values = columns.replace("created_at", "COALESCE(created_at, now() AT TIME ZONE 'utc')")
+        copied = connection.execute(text(
+            f"INSERT INTO {TABLE} ({columns}) SELECT {values} FROM {old_table}"
+        )).rowcount
+        connection.execute(text(f"DROP TABLE {old_table}"))
+    return copied
+
+def ensure_interaction_partitions(months_ahead=None):
+    """Create the coming months' partitions ahead of time (no-op unless partitioned)"""
+    months_ahead = Config.INTERACTION_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    with get_db_manager().engine.begin() as connection:
+        if not is_partitioned(connection):
+            return []
+        return _ensure_partitions(connection, month_start(datetime.utcnow()), months_ahead)
+
+# Compaction
+
+def _archive_views(session, start, end):
+    """Move one day's raw view rows into its monthly archive table"""
+    name = archive_name(start)
+    session.execute(text(f"CREATE TABLE IF NOT EXISTS {name} AS SELECT * FROM {TABLE} WHERE 1 = 0"))
+    archive = table(name, *(column(column_name) for column_name in COLUMN_NAMES))
+    day_views = (
+        (StoryInteraction.interaction_type == 'view')
+        & (StoryInteraction.created_at >= start)
+        & (StoryInteraction.created_at < end)
+    )
+    session.execute(insert(archive).from_select(COLUMN_NAMES, select(StoryInteraction.__table__).where(day_views)))
+    session.execute(delete(StoryInteraction).where(day_views))
+
+def compact_views(now=None):
+    """Roll raw views older than INTERACTION_ROLLUP_AFTER_DAYS up into story_daily_stats.
+
+    Works one day per transaction and advances the compaction watermark in
+    the same transaction, so an interrupted run never counts a day twice.
+    """
+    from src.analytics import unfolded_views_since
+
+    now = now or datetime.utcnow()
+    end = datetime.combine(now.date() - timedelta(days=Config.INTERACTION_ROLLUP_AFTER_DAYS), time.min)
+    with get_db_session() as session:
+        # Views only leave the table once the category analytics job has counted them
+        pending = unfolded_views_since(session)
+    if pending is not None:
+        end = min(end, datetime.combine(pending.date(), time.min))
+    archive = not _interactions_partitioned()
+    days, views = 0, 0
+
+    while True:
+        with get_db_session() as session:
+            mark = get_watermark(session, COMPACTION_WATERMARK)
+            query = select(func.min(StoryInteraction.created_at)).where(
+                StoryInteraction.interaction_type == 'view', StoryInteraction.created_at < end
+            )
+            if mark.last_timestamp is not None:
+                query = query.where(StoryInteraction.created_at >= mark.last_timestamp)
+            first = session.execute(query).scalar()
+
+            if first is None:
+                # Nothing left to compact before `end`; skip the empty stretch
+                if mark.last_timestamp is None or mark.last_timestamp < end:
+                    mark.last_timestamp = end
+                    session.commit()
+                break
+
+            start = datetime.combine(first.date(), time.min)
+            stop = start + timedelta(days=1)
+            counts = session.execute(
+                select(StoryInteraction.story_id, func.count())
+                .where(
+                    StoryInteraction.interaction_type == 'view',
+                    StoryInteraction.created_at >= start,
+                    StoryInteraction.created_at < stop,
+                )
+                .group_by(StoryInteraction.story_id)
+            ).all()
+            existing = {
+                stats.story_id: stats
+                for stats in session.query(StoryDailyStats).filter(
+                    StoryDailyStats.day == start.date(),
+                    StoryDailyStats.story_id.in_([story_id for story_id, _ in counts])
+                )
+            }
+            for story_id, count in counts:
+                stats = existing.get(story_id)
+                if stats is None:
+                    session.add(StoryDailyStats(story_id=story_id, day=start.date(), views=count))
+                else:
+                    stats.views = (stats.views or 0) + count
+                views += count
+
+            if archive:
+                _archive_views(session, start, stop)
+            mark.last_timestamp = stop
+            session.commit()
+            days += 1
+
+    return {'days_compacted': days, 'views_compacted': views}
+
+# Retention
+
+def _compacted_through(session):
+    """First day whose views are still raw, or None before the first compaction"""
+    mark = session.get(JobWatermark, COMPACTION_WATERMARK)
+    return mark.last_timestamp if mark else None
+
+def apply_retention(now=None):
+    """Drop raw interaction months older than INTERACTION_RETENTION_MONTHS.
+
+    Only months that are fully compacted are dropped. Partitions are
+    detached first and their non-view rows are put back into the table.
+    """
+    if Config.INTERACTION_RETENTION_MONTHS <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.utcnow()), -Config.INTERACTION_RETENTION_MONTHS)
+    with get_db_session() as session:
+        compacted = _compacted_through(session)
+    if compacted is None:
+        return []
+
+    dropped = []
+    columns = ", ".join(COLUMN_NAMES)
+    with get_db_manager().engine.begin() as connection:
+        if is_partitioned(connection):
+            for month, name in sorted(_partitions(connection).items()):
+                if month >= cutoff or add_months(month, 1) > compacted:
+                    continue
+                connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+                # The month has no partition now, so these land in the default partition
+                connection.execute(text(
+                    f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {name} "
+                    f"WHERE interaction_type <> 'view'"
+                ))
+                connection.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        else:
+            preparer = connection.dialect.identifier_preparer
+            for name in inspect(connection).get_table_names():
+                month = _parse_month(_ARCHIVE_NAME, name)
+                if month is not None and month < cutoff:
+                    connection.execute(text(f"DROP TABLE {preparer.quote(name)}"))
+                    dropped.append(name)
+    return dropped
+
+def run_maintenance(now=None):
+    """Create upcoming partitions, compact old views and apply retention"""
+    result = {'partitions_created': ensure_interaction_partitions()}
+    result.update(compact_views(now))
+    result['tables_dropped'] = apply_retention(now)
+    return result
+
+# Analytics reads
+
+class StoryViewsRow(NamedTuple):
+    """Views of one story over a period"""
+    story_id: int
+    title: str
+    category: Optional[str]
+    views: int
+
+def get_story_view_counts(story_ids=None, since=None):
+    """Views per story from the rollups plus raw views not compacted yet.
+
+    `since` is an optional first day (date) to count from.
+    """
+    with get_db_session() as session:
+        compacted = _compacted_through(session)
+        totals = {}
+
+        if compacted is not None:
+            query = select(StoryDailyStats.story_id, func.sum(StoryDailyStats.views)).group_by(StoryDailyStats.story_id)
+            if story_ids is not None:
+                query = query.where(StoryDailyStats.story_id.in_(story_ids))
+            if since is not None:
+                query = query.where(StoryDailyStats.day >= since)
+            for story_id, views in session.execute(query):
+                totals[story_id] = totals.get(story_id, 0) + int(views or 0)
+
+        lower = compacted
+        if since is not None:
+            since_start = datetime.combine(since, time.min)
+            lower = since_start if lower is None else max(lower, since_start)
+        query = (
+            select(StoryInteraction.story_id, func.count())
+            .where(StoryInteraction.interaction_type == 'view')
+            .group_by(StoryInteraction.story_id)
+        )
+        if story_ids is not None:
+            query = query.where(StoryInteraction.story_id.in_(story_ids))
+        if lower is not None:
+            query = query.where(StoryInteraction.created_at >= lower)
+        for story_id, views in session.execute(query):
+            totals[story_id] = totals.get(story_id, 0) + views
+
+    return totals
+
+def get_daily_views(story_id=None, days=30, today=None):
+    """Views per day for the last `days` days (oldest first), for one story or all"""
+    today = today or datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    series = {first_day + timedelta(days=offset): 0 for offset in range(days)}
+
+    with get_db_session() as session:
+        compacted = _compacted_through(session)
+
+        if compacted is not None:
+            query = (
+                select(StoryDailyStats.day, func.sum(StoryDailyStats.views))
+                .where(StoryDailyStats.day >= first_day)
+                .group_by(StoryDailyStats.day)
+            )
+            if story_id is not None:
+                query = query.where(StoryDailyStats.story_id == story_id)
+            for day, views in session.execute(query):
+                if day in series:
+                    series[day] += int(views or 0)
+
+        lower = datetime.combine(first_day, time.min)
+        if compacted is not None:
+            lower = max(lower, compacted)
+        raw_day = func.date(StoryInteraction.created_at)
+        query = (
+            select(raw_day, func.count())
+            .where(StoryInteraction.interaction_type == 'view', StoryInteraction.created_at >= lower)
+            .group_by(raw_day)
+        )
+        if story_id is not None:
+            query = query.where(StoryInteraction.story_id == story_id)
+        for day, views in session.execute(query):
+            # SQLite returns date() as text
+            day = datetime.strptime(day, "%Y-%m-%d").date() if isinstance(day, str) else day
+            if day in series:
+                series[day] += views
+
+    return sorted(series.items())
+
+def get_most_viewed_stories(days=30, limit=10, today=None):
+    """The `limit` most viewed stories of the last `days` days, most views first"""
+    today = today or datetime.utcnow().date()
+    counts = get_story_view_counts(since=today - timedelta(days=days - 1))
+    top = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    if not top:
+        return []
+    with get_db_session() as session:
+        stories = {
+            row.id: row
+            for row in session.execute(
+                select(Story.id, Story.title, Story.category).where(Story.id.in_([story_id for story_id, _ in top]))
+            )
+        }
+    return [
+        StoryViewsRow(story_id, stories[story_id].title, stories[story_id].category, views)
+        for story_id, views in top
+        if story_id in stories
+    ]
@@ -0,0 +1,155 @@
+"""
+Next-page prefetching for ElderWise application
+
+Once a feed page is rendered, the reader is most likely to click "Next"
+next. Without prefetching, that click pays for the page query and for
+writing (and on S3, downloading) ten cover thumbnails. prefetch_page()
+starts that work on a small thread pool shared by every session in the
+process:
+
+- The rows are read through get_stories_page(), so they land in its
+  versioned cache (src/change_feed.py) like any other feed read. That cache
+  alone decides how long a page stays fresh.
+- The thumbnails are written to the static folder the feed serves them from.
+
+Only prefetches that are queued or running are tracked here, at most
+FEED_PREFETCH_MAX_PAGES per process. get_feed_page() joins one that is
+still loading for the page it wants, so the query never runs twice, and
+otherwise reads through the cache.
+
+Each session schedules its prefetches through a PrefetchHandle. When the
+category filter changes, the session cancels its handle, which drops the
+prefetches that have not finished. A prefetch that is already running stops
+before its next thumbnail.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from typing import NamedTuple
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+class _Prefetch(NamedTuple):
+    future: object
+    handle: object
+
+class PrefetchHandle:
+    """One session's prefetches, so they can be cancelled together"""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop this handle's prefetches and drop the ones that have not finished"""
+        self.cancelled.set()
+        with _pending_lock:
+            dropped = [key for key, entry in _pending.items() if entry.handle is self]
+            dropped = [_pending.pop(key) for key in dropped]
+        # Outside the lock: cancel() runs the done callback, which takes it
+        for entry in dropped:
+            entry.future.cancel()
+            _count("cancelled")
+
+_pending = OrderedDict()  # (page, page_size, category) -> _Prefetch still loading, oldest first
+_pending_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.FEED_PREFETCH_WORKERS, thread_name_prefix="feed-prefetch"
+                )
+    return _executor
+
+def _count(result):
+    if Config.METRICS_ENABLED:
+        from src.instrumentation import registry
+        registry.increment(
+            "elderwise_feed_prefetch_total", "result", result,
+            help_text="Feed pages by prefetch outcome (scheduled, joined, direct, cancelled)"
+        )
+
+def _load(handle, page, page_size, category):
+    """Read one page's rows and warm its thumbnails, unless the handle is cancelled"""
+    from src.database import get_stories_page
+    from src.rendering import thumbnail_url, missing_thumbnails
+    from src.storage import get_storage
+
+    if handle.cancelled.is_set():
+        raise CancelledError()
+    stories = get_stories_page(page, page_size, category)
+    keys = missing_thumbnails([story.thumbnail_image_path for story in stories])
+    storage = get_storage()
+    if storage.is_remote:
+        storage.prefetch(keys)  # Downloads in parallel on the media pool
+    for key in keys:
+        if handle.cancelled.is_set():
+            break
+        thumbnail_url(key)
+    return stories
+
+def _finished(key, future):
+    with _pending_lock:
+        entry = _pending.get(key)
+        if entry is not None and entry.future is future:
+            del _pending[key]
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Prefetching feed page %s failed: %s", key, future.exception())
+
+def prefetch_page(handle, page, page_size=None, category=None):
+    """Start loading a feed page in the background, unless it is loading already"""
+    if not Config.FEED_PREFETCH_ENABLED or handle.cancelled.is_set():
+        return
+    page_size = page_size or Config.FEED_PAGE_SIZE
+    key = (page, page_size, category)
+    with _pending_lock:
+        if key in _pending:
+            return
+        dropped = []
+        while len(_pending) >= Config.FEED_PREFETCH_MAX_PAGES:
+            dropped.append(_pending.popitem(last=False)[1])
+        future = _get_executor().submit(_load, handle, page, page_size, category)
+        _pending[key] = _Prefetch(future, handle)
+    for entry in dropped:
+        entry.future.cancel()
+    future.add_done_callback(lambda done: _finished(key, done))
+    _count("scheduled")
+
+def _join(key):
+    """The rows of a prefetch that is loading this page right now, waiting for it"""
+    with _pending_lock:
+        entry = _pending.get(key)
+    if entry is None:
+        return None
+    # Still queued behind other prefetches: reading the page directly is quicker
+    if entry.future.cancel():
+        return None
+    try:
+        return entry.future.result()
+    except Exception:
+        return None  # Cancelled, or failed and logged by _finished
+
+def get_feed_page(page=0, page_size=None, category=None):
+    """One page of stories, joining a prefetch of it that is still loading"""
+    from src.database import get_stories_page
+
+    page_size = page_size or Config.FEED_PAGE_SIZE
+    if Config.FEED_PREFETCH_ENABLED:
+        stories = _join((page, page_size, category))
+        if stories is not None:
+            _count("joined")
+            return stories
+        _count("direct")
+    return get_stories_page(page, page_size, category)
+
+def pending_pages():
+    """Prefetches queued or running in this process"""
+    return len(_pending)
@@ -0,0 +1,128 @@
+"""
+Opt-in rerun profiling for ElderWise application
+
+A configurable fraction of reruns is profiled either with cProfile (pstats
+files) or with a stack sampler (collapsed stacks, ready for flamegraph.pl or
+speedscope). Files are rotated in PROFILE_DIR; aggregate them with
+profile_report.py. When PROFILE_SAMPLE_RATE is 0 the decorator returns the
+function unchanged, so there is no overhead.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from functools import wraps
+from pathlib import Path
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Only one profile per thread: pages run inside app.main and are covered by it
+_active = threading.local()
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def _profile_path(name, extension):
+    directory = Path(Config.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{int(time.time() * 1000)}-{name}-{os.getpid()}.{extension}"
+
+def rotate_profiles(max_files=None):
+    """Delete the oldest profile files beyond PROFILE_MAX_FILES"""
+    max_files = max_files or Config.PROFILE_MAX_FILES
+    directory = Path(Config.PROFILE_DIR)
+    files = sorted(
+        (path for path in directory.glob("*") if path.suffix in (".prof", ".collapsed")),
+        key=lambda path: path.stat().st_mtime
+    )
+    for path in files[:max(0, len(files) - max_files)]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+def _run_profiled(name, func, args, kwargs):
+    """Run func under the configured profiler and write the result"""
+    if Config.PROFILE_MODE == "sample":
+        sampler = StackSampler(threading.get_ident(), Config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            try:
+                sampler.write(_profile_path(name, "collapsed"))
+                rotate_profiles()
+            except OSError as e:
+                logger.warning("Could not write profile for %s: %s", name, e)
+
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger) is already active
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        try:
+            profiler.dump_stats(_profile_path(name, "prof"))
+            rotate_profiles()
+        except OSError as e:
+            logger.warning("Could not write profile for %s: %s", name, e)
+
+def profiled(name):
+    """Profile a sampled fraction of calls to the decorated function"""
+    def decorator(func):
+        if Config.PROFILE_SAMPLE_RATE <= 0:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_active, "running", False) or random.random() >= Config.PROFILE_SAMPLE_RATE:
+                return func(*args, **kwargs)
+            _active.running = True
+            try:
+                return _run_profiled(name, func, args, kwargs)
+            finally:
+                _active.running = False
+        return wrapper
+    return decorator
@@ -0,0 +1,196 @@
+"""
+HTML rendering for story cards
+
+A whole page of story cards is rendered into a single pre-escaped HTML block so
+the feed is sent to the browser as one element instead of several per story.
+The block is re-sent whenever the feed fragment reruns, so it is kept small:
+cards carry the preview text only, and thumbnails are JPEG files in the app's
+static folder that the browser fetches (and caches) by URL.
+This module does not depend on Streamlit, so it can also be used by scripts.
+"""
+
+import html
+import os
+import uuid
+import hashlib
+from string import Template
+from src.config import Config
+from src.images import load_image, encode_jpeg
+from src.storage import get_storage
+
+def _compact(markup):
+    """Join markup into a single line without indentation.
+
+    Markdown treats indented lines as code and blank lines as the end of an
+    HTML block, so everything sent through st.markdown is kept on one line.
+    """
+    return "".join(line.strip() for line in markup.strip().splitlines())
+
+def _compile(template_text):
+    """Compile a compacted HTML template"""
+    return Template(_compact(template_text))
+
+STORY_GRID_CSS = _compact("""
+<style>
+.story-grid { display: flex; flex-direction: column; gap: 1rem; }
+.story-grid .story-card { display: flex; gap: 1.5rem; align-items: flex-start; }
+.story-grid .story-cover { flex: 0 0 33%; max-width: 33%; }
+.story-grid .story-cover img { width: 100%; border-radius: 8px; }
+.story-grid .story-cover-missing { background: #f0f2f6; border-radius: 8px; padding: 2rem 1rem; text-align: center; color: #555; }
+.story-grid .story-body { flex: 1; min-width: 0; }
+.story-grid .story-body h3 { margin: 0 0 0.5rem 0; color: #2c3e50; }
+.story-grid .category-badge { background: #667eea; color: white; padding: 0.2rem 0.7rem; border-radius: 15px; font-size: 0.8rem; }
+.story-grid .story-preview { color: #444; line-height: 1.6; margin: 0.75rem 0; }
+.story-grid .story-meta { color: #777; font-size: 0.9rem; }
+</style>
+""")
+
+STORY_CARD_TEMPLATE = _compile("""
+<div class="story-card" id="story-$story_id">
+    <div class="story-cover">$cover</div>
+    <div class="story-body">
+        <h3>$title</h3>
+        $badge
+        <p class="story-preview">$preview</p>
+        <div class="story-meta">$meta</div>
+    </div>
+</div>
+""")
+
+STORY_GRID_TEMPLATE = _compile("""
+<div class="story-grid">$cards</div>
+""")
+
+COMMENT_TEMPLATE = _compile("""
+<div class="story-comment">
+    <div class="story-comment-meta">👤 $author · $date</div>
+    <div>$text</div>
+</div>
+""")
+
+STORY_TEXT_CSS = _compact("""
+<style>
+.story-full { line-height: 1.7; color: #262730; }
+</style>
+""")
+
+STORY_TEXT_TEMPLATE = _compile("""
+<div class="story-full">$text</div>
+""")
+
+COMMENTS_CSS = _compact("""
+<style>
+.story-comment { border-left: 3px solid #667eea; padding: 0.4rem 0.8rem; margin: 0.5rem 0; background: #f8f9fa; border-radius: 0 8px 8px 0; }
+.story-comment-meta { color: #777; font-size: 0.8rem; margin-bottom: 0.2rem; }
+</style>
+""")
+
+MISSING_COVER_HTML = '<div class="story-cover-missing">📷 No cover photo available</div>'
+
+def escape_text(text):
+    """Escape user text for HTML, keeping line breaks"""
+    return html.escape(text or "", quote=True).replace("\r\n", "\n").replace("\n", "<br>")
+
+def category_label(category):
+    """Human readable label for a stored category key"""
+    return (category or "").replace('_', ' ').title()
+
+def preview_text(text, max_length=150):
+    """First `max_length` characters of a story with an ellipsis"""
+    text = text or ""
+    return text[:max_length] + "..." if len(text) > max_length else text
+
+def _write_thumbnail(path, width, target):
+    """Downscale a cover into `target`, replacing it atomically"""
+    image = load_image(path, width, width * 2)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        temp_path.write_bytes(encode_jpeg(image, quality=80))
+        os.replace(temp_path, target)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+def _thumbnail_name(key, width):
+    return hashlib.sha1(f"{key}@{width or Config.FEED_THUMBNAIL_WIDTH}".encode("utf-8")).hexdigest() + ".jpg"
+
+def missing_thumbnails(keys, width=None):
+    """The cover keys among `keys` whose thumbnails have not been written yet"""
+    return [key for key in keys if key and not (Config.FEED_THUMBNAIL_DIR / _thumbnail_name(key, width)).exists()]
+
+def thumbnail_url(key, width=None):
+    """Get the URL of a small thumbnail for a stored cover image, or None.
+
+    The thumbnail is written once per key and width; after that this is a
+    stat, with no storage access (cover keys are never reused).
+    """
+    if not key:
+        return None
+    width = width or Config.FEED_THUMBNAIL_WIDTH
+    name = _thumbnail_name(key, width)
+    target = Config.FEED_THUMBNAIL_DIR / name
+    if not target.exists():
+        path = get_storage().local_path(key)
+        if path is None:
+            return None
+        try:
+            _write_thumbnail(path, width, target)
+        except Exception:
+            return None
+    return f"{Config.FEED_THUMBNAIL_URL}/{name}"
+
+def cached_thumbnails():
+    """Thumbnail files written so far"""
+    try:
+        return sum(1 for entry in os.scandir(Config.FEED_THUMBNAIL_DIR) if entry.name.endswith(".jpg"))
+    except FileNotFoundError:
+        return 0
+
+def _comment_label(count):
+    count = count or 0
+    return "1 comment" if count == 1 else f"{count} comments"
+
+def render_story_card_html(story):
+    """Render one story as an HTML card"""
+    url = thumbnail_url(story.thumbnail_image_path)
+    if url:
+        cover = f'<img src="{html.escape(url)}" alt="Story cover" loading="lazy">'
+    else:
+        cover = MISSING_COVER_HTML
+
+    badge = ""
+    if story.category:
+        badge = f'<span class="category-badge">{escape_text(category_label(story.category))}</span>'
+
+    story_date = story.created_at.strftime("%B %d, %Y") if story.created_at else "Unknown date"
+    author = escape_text(story.author_name or "Anonymous")
+
+    return STORY_CARD_TEMPLATE.substitute(
+        story_id=int(story.id),
+        cover=cover,
+        title=escape_text(story.title),
+        badge=badge,
+        preview=escape_text(preview_text(story.transcript)),
+        meta=f"👤 {author} · 📅 Shared on {story_date} · 💬 {_comment_label(story.comments_count)}",
+    )
+
+def render_story_grid_html(stories):
+    """Render a page of stories as one HTML block, styles included"""
+    cards = "".join(render_story_card_html(story) for story in stories)
+    return STORY_GRID_CSS + STORY_GRID_TEMPLATE.substitute(cards=cards)
+
+def render_story_text_html(text):
+    """Render a full story transcript as one HTML block"""
+    return STORY_TEXT_CSS + STORY_TEXT_TEMPLATE.substitute(text=escape_text(text))
+
+def render_comments_html(comments):
+    """Render a list of comments as one HTML block"""
+    items = "".join(
+        COMMENT_TEMPLATE.substitute(
+            author=escape_text(comment.author_name or "Anonymous"),
+            date=comment.created_at.strftime("%B %d, %Y at %I:%M %p") if comment.created_at else "",
+            text=escape_text(comment.comment_text),
+        )
+        for comment in comments
+    )
+    return COMMENTS_CSS + items
@@ -0,0 +1,240 @@
+"""
+Featured story scoring for ElderWise application
+
+Scores use forward decay: an event of weight w at time t contributes
+w * exp(rate * (t - SCORE_EPOCH)). Because every story decays by the same
+factor as time passes, stored scores never need to be re-decayed and ordering
+by them always gives the current ranking. Values are kept in log space so they
+cannot overflow.
+"""
+
+import math
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from src.config import Config
+from src.database import get_db_session, dialect_insert, Story, StoryInteraction, StoryScore, JobWatermark, User
+from src.cold_storage import load_transcripts
+
+SCORE_EPOCH = datetime(2024, 1, 1)
+
+# Watermark names in the job_watermarks table
+INTERACTIONS_WATERMARK = 'story_scores.interactions'
+STORIES_WATERMARK = 'story_scores.stories'
+
+def decay_rate():
+    """Decay rate per second derived from the configured half-life"""
+    return math.log(2) / (Config.SCORE_HALF_LIFE_HOURS * 3600)
+
+def log_weight(weight, timestamp, rate):
+    """Log of a forward-decayed weight observed at `timestamp`"""
+    return math.log(weight) + rate * (timestamp - SCORE_EPOCH).total_seconds()
+
+def log_add(a, b):
+    """Numerically stable log(exp(a) + exp(b)), treating None as zero"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+def current_score(log_score, now=None):
+    """Convert a stored log score into the decayed engagement value at `now`"""
+    now = now or datetime.utcnow()
+    return math.exp(log_score - decay_rate() * (now - SCORE_EPOCH).total_seconds())
+
+def get_watermark(session, name):
+    """Get (or create) the named job watermark, locked until the caller's transaction ends.
+
+    The upsert writes the row, which takes its row lock on PostgreSQL and the
+    database write lock on SQLite. Concurrent runs of a job therefore take
+    turns and never fold the same rows twice.
+    """
+    session.execute(
+        dialect_insert(session, JobWatermark)
+        .values(name=name, last_id=0, updated_at=datetime.utcnow())
+        .on_conflict_do_update(index_elements=['name'], set_={'updated_at': datetime.utcnow()})
+    )
+    return session.get(JobWatermark, name, populate_existing=True)
+
+def commit_lag_cutoff(now=None):
+    """Rows created after this may still have lower-id neighbours in uncommitted transactions"""
+    return (now or datetime.utcnow()) - timedelta(seconds=Config.WATERMARK_COMMIT_LAG_SECONDS)
+
+def settled_id(session, id_column, created_column, last_id, now=None):
+    """Highest id an id watermark may move to without skipping rows that commit late.
+
+    Ids are handed out at insert, not at commit, so on PostgreSQL a lower id
+    can become visible after a higher one has been processed. The watermark
+    stops before the first row created within the commit-lag window, which
+    leaves any lower id still in flight to the next run.
+    """
+    cutoff = commit_lag_cutoff(now)
+    first_recent = session.execute(
+        select(func.min(id_column)).where(id_column > last_id, created_column >= cutoff)
+    ).scalar()
+    query = select(func.max(id_column)).where(id_column > last_id, created_column < cutoff)
+    if first_recent is not None:
+        query = query.where(id_column < first_recent)
+    return session.execute(query).scalar() or last_id
+
+def _counter_score(row, rate):
+    """Log score for a story's base weight and aggregate counters"""
+    weights = Config.SCORE_WEIGHTS
+    total = (
+        weights['base']
+        + weights['view'] * (row.views_count or 0)
+        + weights['like'] * (row.likes_count or 0)
+        + weights['share'] * (row.shares_count or 0)
+    )
+    # Counters carry no timestamps, so they decay with the story's age
+    return log_weight(total, row.created_at or SCORE_EPOCH, rate)
+
+def _read_watermark(session, name):
+    """(last_id, last_timestamp) of a job watermark, read without locking or creating it"""
+    mark = session.get(JobWatermark, name)
+    return (mark.last_id or 0, mark.last_timestamp) if mark else (0, None)
+
+def _scan(session, last_id, last_timestamp, rate, now, batch_size):
+    """Scores of the stories and interactions changed since the watermarks; only reads"""
+    # Counter components are absolute, so recomputing a story is idempotent
+    counter_scores = {}
+    latest_update = last_timestamp
+    query = session.query(
+        Story.id, Story.created_at, Story.updated_at,
+        Story.views_count, Story.likes_count, Story.shares_count
+    )
+    if last_timestamp is not None:
+        # Re-read the commit-lag window too: updates that committed late carry older timestamps
+        since = last_timestamp - timedelta(seconds=Config.WATERMARK_COMMIT_LAG_SECONDS)
+        query = query.filter(Story.updated_at >= since)
+    for row in query.yield_per(batch_size):
+        counter_scores[row.id] = _counter_score(row, rate)
+        if row.updated_at and (latest_update is None or row.updated_at > latest_update):
+            latest_update = row.updated_at
+
+    # Interaction components are incremental, keyed by the last processed id
+    interaction_scores = {}
+    settled = settled_id(session, StoryInteraction.id, StoryInteraction.created_at, last_id, now)
+    processed = 0
+    while last_id < settled:
+        rows = (
+            session.query(
+                StoryInteraction.id, StoryInteraction.story_id,
+                StoryInteraction.interaction_type, StoryInteraction.created_at
+            )
+            .filter(StoryInteraction.id > last_id, StoryInteraction.id <= settled)
+            .order_by(StoryInteraction.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for row in rows:
+            weight = Config.SCORE_WEIGHTS.get(row.interaction_type)
+            if weight and row.created_at:
+                interaction_scores[row.story_id] = log_add(
+                    interaction_scores.get(row.story_id),
+                    log_weight(weight, row.created_at, rate)
+                )
+        last_id = rows[-1].id
+        processed += len(rows)
+    return counter_scores, interaction_scores, last_id, latest_update, processed
+
+def run_scoring_job(batch_size=1000, max_attempts=5):
+    """Fold interactions and story changes since the last run into story_scores.
+
+    The scan only reads, so on SQLite it doesn't hold the write lock while
+    stories and views are being written. Scores and watermarks are then
+    written in one short transaction that locks the watermarks; if another
+    run moved them in the meantime, the scan is repeated from where it
+    stopped, so no interaction is counted twice.
+    """
+    rate = decay_rate()
+    for attempt in range(max_attempts):
+        now = datetime.utcnow()
+        with get_db_session() as session:
+            start_id, _ = _read_watermark(session, INTERACTIONS_WATERMARK)
+            _, start_timestamp = _read_watermark(session, STORIES_WATERMARK)
+            counter_scores, interaction_scores, last_id, latest_update, processed = _scan(
+                session, start_id, start_timestamp, rate, now, batch_size
+            )
+
+        with get_db_session() as session:
+            interactions_mark = get_watermark(session, INTERACTIONS_WATERMARK)
+            stories_mark = get_watermark(session, STORIES_WATERMARK)
+            if (interactions_mark.last_id or 0, stories_mark.last_timestamp) != (start_id, start_timestamp):
+                session.rollback()
+                continue
+
+            # Upsert the touched stories only
+            story_ids = list(set(counter_scores) | set(interaction_scores))
+            for start in range(0, len(story_ids), batch_size):
+                chunk = story_ids[start:start + batch_size]
+                existing = {
+                    score.story_id: score
+                    for score in session.query(StoryScore).filter(StoryScore.story_id.in_(chunk))
+                }
+                for story_id in chunk:
+                    score = existing.get(story_id)
+                    if score is None:
+                        score = StoryScore(story_id=story_id)
+                    if story_id in counter_scores:
+                        score.counter_score = counter_scores[story_id]
+                    if story_id in interaction_scores:
+                        score.interaction_score = log_add(score.interaction_score, interaction_scores[story_id])
+                    score.score = log_add(score.interaction_score, score.counter_score)
+                    score.computed_at = now
+                    if score.score is not None:
+                        session.add(score)
+
+            interactions_mark.last_id = last_id
+            stories_mark.last_timestamp = latest_update
+            session.commit()
+
+        return {
+            'stories_rescored': len(story_ids),
+            'interactions_processed': processed,
+            'last_interaction_id': last_id,
+        }
+    raise RuntimeError(f"Other scoring runs kept moving the watermarks ({max_attempts} attempts)")
+
+def _story_card_dict(row, transcript=None):
+    """Shape a story row the way create_story_card expects it"""
+    transcript = transcript or row.transcript or ''
+    return {
+        'id': row.id,
+        'title': row.title,
+        'category': row.category or '',
+        'summary': row.summary or (transcript[:150] + '...' if len(transcript) > 150 else transcript),
+        'transcript': transcript,
+        'created_at': row.created_at.isoformat() if row.created_at else '',
+        'contributor_name': row.full_name or 'Anonymous',
+    }
+
+def get_featured_stories(limit=3):
+    """Get the top `limit` stories by score, newest first if nothing is scored yet"""
+    columns = (
+        Story.id, Story.title, Story.category, Story.summary,
+        Story.transcript, Story.created_at, User.full_name
+    )
+    with get_db_session() as session:
+        rows = (
+            session.query(*columns)
+            .join(StoryScore, StoryScore.story_id == Story.id)
+            .outerjoin(User, User.id == Story.author_id)
+            .order_by(StoryScore.score.desc())
+            .limit(limit)
+            .all()
+        )
+        if not rows:
+            rows = (
+                session.query(*columns)
+                .outerjoin(User, User.id == Story.author_id)
+                .order_by(Story.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+        archived = load_transcripts([row.id for row in rows if row.transcript == ''], session)
+
+    return [_story_card_dict(row, archived.get(row.id)) for row in rows]
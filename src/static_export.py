@@ -0,0 +1,383 @@
+"""
+Static site export for ElderWise application
+
+Renders the story archive (one page per story, paginated indexes for all
+stories and for each category, cover photos and thumbnails) into a directory
+that any static file server can serve, so anonymous readers need no Streamlit
+session or database query.
+
+Builds are incremental. manifest.json records every story's updated_at, and
+only stories that are new or changed since the last build are re-rendered;
+that work is spread over a process pool. Index pages are regenerated on every
+build that changes anything, but a file is only rewritten when its contents
+differ, so unchanged pages keep their mtimes (and HTTP caches stay valid).
+"""
+
+import os
+import re
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple, Optional
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from sqlalchemy import select, func
+from src.config import Config
+from src.database import get_db_session, Story, User
+from src.rendering import _compact, _compile, escape_text, category_label, preview_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when templates change so the next build re-renders every story
+EXPORT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+RENDER_BATCH_SIZE = 50
+
+class ExportStory(NamedTuple):
+    """Everything needed to render one story page, picklable for the workers"""
+    id: int
+    title: str
+    category: Optional[str]
+    transcript: str
+    thumbnail_image_path: Optional[str]
+    created_at: Optional[datetime]
+    author_name: Optional[str]
+    comments: tuple  # CommentRow tuples, newest first
+
+class IndexEntry(NamedTuple):
+    """One story as listed on an index page"""
+    id: int
+    title: str
+    category: Optional[str]
+    preview: str
+    created_at: Optional[datetime]
+    author_name: Optional[str]
+    comments_count: int
+
+SITE_CSS = """
+body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif; max-width: 60rem; margin: 0 auto; padding: 1rem; color: #262730; }
+a { color: #667eea; }
+header { border-bottom: 1px solid #e1e5e9; margin-bottom: 1rem; }
+nav.categories a { margin-right: 0.75rem; }
+.story-card { display: flex; gap: 1.5rem; align-items: flex-start; margin: 1rem 0; }
+.story-card .story-cover { flex: 0 0 30%; max-width: 30%; }
+.story-cover img, .story-full-cover img { width: 100%; border-radius: 8px; }
+.story-cover-missing { background: #f0f2f6; border-radius: 8px; padding: 2rem 1rem; text-align: center; color: #555; }
+.story-card h3 { margin: 0 0 0.5rem 0; }
+.category-badge { background: #667eea; color: white; padding: 0.2rem 0.7rem; border-radius: 15px; font-size: 0.8rem; }
+.story-preview { color: #444; line-height: 1.6; }
+.story-meta { color: #777; font-size: 0.9rem; }
+.story-full { line-height: 1.7; }
+.story-comment { border-left: 3px solid #667eea; padding: 0.4rem 0.8rem; margin: 0.5rem 0; background: #f8f9fa; border-radius: 0 8px 8px 0; }
+.story-comment-meta { color: #777; font-size: 0.8rem; margin-bottom: 0.2rem; }
+.pagination { display: flex; justify-content: space-between; margin: 2rem 0; }
+"""
+
+PAGE_TEMPLATE = _compile("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title</title>
+<link rel="stylesheet" href="${root}style.css">
+</head>
+<body>
+<header><h1><a href="${root}index.html">$app_name</a></h1>$nav</header>
+<main>$body</main>
+</body>
+</html>
+""")
+
+INDEX_CARD_TEMPLATE = _compile("""
+<div class="story-card">
+    <div class="story-cover">$cover</div>
+    <div>
+        <h3><a href="${root}stories/$story_id.html">$title</a></h3>
+        $badge
+        <p class="story-preview">$preview</p>
+        <div class="story-meta">$meta</div>
+    </div>
+</div>
+""")
+
+STORY_PAGE_TEMPLATE = _compile("""
+<article>
+    <h2>$title</h2>
+    $badge
+    <p class="story-meta">$meta</p>
+    <div class="story-full-cover">$cover</div>
+    <div class="story-full">$full_text</div>
+</article>
+<section><h3>💬 Comments</h3>$comments</section>
+""")
+
+COMMENT_TEMPLATE = _compile("""
+<div class="story-comment">
+    <div class="story-comment-meta">👤 $author · $date</div>
+    <div>$text</div>
+</div>
+""")
+
+MISSING_COVER_HTML = '<div class="story-cover-missing">📷 No cover photo available</div>'
+
+def _slug(category):
+    """Directory name for a category"""
+    return re.sub(r"[^a-z0-9_-]+", "-", (category or "uncategorized").lower()).strip("-") or "uncategorized"
+
+def _write_if_changed(path, data):
+    """Write bytes atomically unless the file already holds them; returns whether it was written"""
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+    return True
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _badge(category):
+    if not category:
+        return ""
+    return f'<span class="category-badge">{escape_text(category_label(category))}</span>'
+
+def _meta(author_name, created_at, comments_count=None):
+    story_date = created_at.strftime("%B %d, %Y") if created_at else "Unknown date"
+    meta = f"👤 {escape_text(author_name or 'Anonymous')} · 📅 Shared on {story_date}"
+    if comments_count is not None:
+        meta += f" · 💬 {comments_count} comment{'' if comments_count == 1 else 's'}"
+    return meta
+
+def _page(title, body, root, categories):
+    nav = "".join(
+        f'<a href="{root}categories/{_slug(category)}/index.html">{escape_text(category_label(category))}</a>'
+        for category in categories
+    )
+    return PAGE_TEMPLATE.substitute(
+        title=escape_text(title), root=root, app_name=escape_text(Config.APP_NAME),
+        nav=f'<nav class="categories">{nav}</nav>' if nav else "", body=body,
+    ).encode("utf-8")
+
+# Story pages (run in the worker processes)
+
+def _export_images(story, output_dir):
+    """Copy the cover and write its thumbnail; returns whether the story has a cover"""
+    from src.images import load_image, encode_jpeg
+    from src.storage import get_storage
+
+    cover_path = output_dir / "covers" / f"{story.id}.jpg"
+    thumb_path = output_dir / "thumbs" / f"{story.id}.jpg"
+    source = get_storage().local_path(story.thumbnail_image_path) if story.thumbnail_image_path else None
+    if source is None:
+        _remove(cover_path)
+        _remove(thumb_path)
+        return False
+    try:
+        with open(source, "rb") as f:
+            _write_if_changed(cover_path, f.read())
+        thumbnail = load_image(source, Config.FEED_THUMBNAIL_WIDTH, Config.FEED_THUMBNAIL_WIDTH * 2)
+        _write_if_changed(thumb_path, encode_jpeg(thumbnail, quality=80))
+        return True
+    except Exception as e:
+        logger.warning("Could not export the cover of story %s: %s", story.id, e)
+        return False
+
+def render_story(story, output_dir, categories):
+    """Write one story's page and images; returns (story id, has cover)"""
+    output_dir = Path(output_dir)
+    has_cover = _export_images(story, output_dir)
+    cover = f'<img src="../covers/{story.id}.jpg" alt="Story cover">' if has_cover else MISSING_COVER_HTML
+    comments = "".join(
+        COMMENT_TEMPLATE.substitute(
+            author=escape_text(comment.author_name or "Anonymous"),
+            date=comment.created_at.strftime("%B %d, %Y at %I:%M %p") if comment.created_at else "",
+            text=escape_text(comment.comment_text),
+        )
+        for comment in story.comments
+    ) or "<p>No comments yet.</p>"
+    body = STORY_PAGE_TEMPLATE.substitute(
+        title=escape_text(story.title),
+        badge=_badge(story.category),
+        meta=_meta(story.author_name, story.created_at),
+        cover=cover,
+        full_text=escape_text(story.transcript),
+        comments=comments,
+    )
+    _write_if_changed(output_dir / "stories" / f"{story.id}.html", _page(story.title, body, "../", categories))
+    return story.id, has_cover
+
+def _render_batch(stories, output_dir, categories):
+    return [render_story(story, output_dir, categories) for story in stories]
+
+# Index pages
+
+def _index_pages(entries, covers, prefix, root, title, categories):
+    """{relative path: html} for one paginated listing"""
+    page_size = Config.STATIC_EXPORT_PAGE_SIZE
+    page_count = max(1, (len(entries) + page_size - 1) // page_size)
+
+    def page_name(number):
+        return f"{prefix}index.html" if number == 1 else f"{prefix}page-{number}.html"
+
+    pages = {}
+    for number in range(1, page_count + 1):
+        cards = "".join(
+            INDEX_CARD_TEMPLATE.substitute(
+                root=root,
+                story_id=entry.id,
+                cover=(f'<img src="{root}thumbs/{entry.id}.jpg" alt="Story cover" loading="lazy">'
+                       if covers.get(entry.id) else MISSING_COVER_HTML),
+                title=escape_text(entry.title),
+                badge=_badge(entry.category),
+                preview=escape_text(preview_text(entry.preview)),
+                meta=_meta(entry.author_name, entry.created_at, entry.comments_count),
+            )
+            for entry in entries[(number - 1) * page_size:number * page_size]
+        )
+        previous_link = (f'<a href="{os.path.basename(page_name(number - 1))}">◀ Newer stories</a>'
+                         if number > 1 else "<span></span>")
+        next_link = (f'<a href="{os.path.basename(page_name(number + 1))}">Older stories ▶</a>'
+                     if number < page_count else "<span></span>")
+        body = (f"<h2>{escape_text(title)}</h2>{cards or '<p>No stories yet.</p>'}"
+                f'<div class="pagination">{previous_link}<span>Page {number} of {page_count}</span>{next_link}</div>')
+        pages[page_name(number)] = _page(title, body, root, categories)
+    return pages
+
+def _load_index_entries(session):
+    query = (
+        select(
+            # Archived transcripts are '' inline; their summary starts with the same text
+            Story.id, Story.title, Story.category,
+            func.coalesce(func.nullif(func.substr(Story.transcript, 1, 200), ''), Story.summary, ''),
+            Story.created_at, User.full_name, func.coalesce(Story.comments_count, 0),
+        )
+        .outerjoin(User, User.id == Story.author_id)
+        .order_by(Story.created_at.desc(), Story.id.desc())
+    )
+    return [IndexEntry._make(row) for row in session.execute(query)]
+
+def _load_stories(story_ids):
+    """ExportStory tuples for a batch of ids, with their recent comments"""
+    from src.comments import get_recent_comments
+    from src.cold_storage import fill_transcripts
+
+    query = (
+        select(
+            Story.id, Story.title, Story.category, Story.transcript,
+            Story.thumbnail_image_path, Story.created_at, User.full_name,
+        )
+        .outerjoin(User, User.id == Story.author_id)
+        .where(Story.id.in_(story_ids))
+    )
+    with get_db_session() as session:
+        rows = session.execute(query).all()
+    comments = get_recent_comments(story_ids, Config.STATIC_EXPORT_COMMENTS)
+    return fill_transcripts([ExportStory(*row, comments=tuple(comments.get(row.id, ()))) for row in rows])
+
+# Build
+
+def _read_manifest(output_dir):
+    try:
+        with open(output_dir / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == EXPORT_VERSION else None
+
+def export_site(output_dir=None, full=False, workers=None):
+    """Bring the static site in `output_dir` up to date with the database.
+
+    Returns a summary dict with counts of rendered and removed stories.
+    """
+    output_dir = Path(output_dir or Config.STATIC_EXPORT_DIR)
+    workers = workers or Config.STATIC_EXPORT_WORKERS or os.cpu_count() or 1
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = None if full else _read_manifest(output_dir)
+    previous = (manifest or {}).get("stories", {})
+
+    with get_db_session() as session:
+        versions = {
+            str(story_id): updated_at.isoformat() if updated_at else ""
+            for story_id, updated_at in session.execute(select(Story.id, Story.updated_at))
+        }
+        categories = sorted(row[0] for row in session.execute(select(Story.category).distinct()) if row[0])
+
+    # A new or emptied category changes the navigation on every story page
+    rerender_all = manifest is None or manifest.get("categories") != categories
+    changed = sorted(
+        int(story_id) for story_id, version in versions.items()
+        if rerender_all or previous.get(story_id, {}).get("updated_at") != version
+    )
+    removed = [story_id for story_id in previous if story_id not in versions]
+
+    covers = {int(story_id): entry.get("cover", False) for story_id, entry in previous.items() if story_id in versions}
+    batches = [changed[i:i + RENDER_BATCH_SIZE] for i in range(0, len(changed), RENDER_BATCH_SIZE)]
+    if workers > 1 and len(batches) > 1:
+        # Batches are loaded here and rendered in the pool, with a bounded number in flight
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for batch in batches:
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        covers.update(future.result())
+                pending.add(pool.submit(_render_batch, _load_stories(batch), output_dir, categories))
+            for future in pending:
+                covers.update(future.result())
+    else:
+        for batch in batches:
+            covers.update(_render_batch(_load_stories(batch), output_dir, categories))
+
+    for story_id in removed:
+        for path in (f"stories/{story_id}.html", f"covers/{story_id}.jpg", f"thumbs/{story_id}.jpg"):
+            _remove(output_dir / path)
+
+    pages_written = 0
+    pages = {}
+    if changed or removed or manifest is None:
+        with get_db_session() as session:
+            entries = _load_index_entries(session)
+        pages.update(_index_pages(entries, covers, "", "", "All Stories", categories))
+        for category in categories:
+            pages.update(_index_pages(
+                [entry for entry in entries if entry.category == category], covers,
+                f"categories/{_slug(category)}/", "../../", category_label(category), categories,
+            ))
+        _write_if_changed(output_dir / "style.css", _compact(SITE_CSS).encode("utf-8"))
+        pages_written = sum(_write_if_changed(output_dir / path, html) for path, html in pages.items())
+        # Index pages that no longer exist (fewer stories, or a category that emptied)
+        for path in (manifest or {}).get("pages", []):
+            if path not in pages:
+                _remove(output_dir / path)
+    else:
+        pages = dict.fromkeys(manifest.get("pages", []))
+
+    # Written last, so an interrupted build is redone next time
+    manifest = {
+        "version": EXPORT_VERSION,
+        "built_at": datetime.utcnow().isoformat(),
+        "categories": categories,
+        "stories": {
+            story_id: {"updated_at": version, "cover": covers.get(int(story_id), False)}
+            for story_id, version in versions.items()
+        },
+        "pages": sorted(pages),
+    }
+    _write_if_changed(output_dir / MANIFEST_NAME, json.dumps(manifest, indent=1).encode("utf-8"))
+
+    return {
+        'stories_rendered': len(changed),
+        'stories_removed': len(removed),
+        'index_pages_written': pages_written,
+        'total_stories': len(versions),
+    }
@@ -0,0 +1,313 @@
+"""
+Media storage for ElderWise application
+
+Cover photos and audio are stored under keys such as "images/<uuid>.jpg"
+(that is what Story.thumbnail_image_path holds) in a pluggable backend:
+
+- LocalStorage keeps files under MEDIA_ROOT, as before.
+- S3Storage keeps them in an S3-compatible bucket (AWS, MinIO, R2, ...), so
+  app nodes hold no state. Uploads are streamed with multipart transfers and
+  reads go through a size-bounded local disk cache. Covers for upcoming feed
+  pages can be prefetched in the background.
+
+Paths stored before keys existed (e.g. "data/images/<uuid>.jpg") still
+resolve as plain filesystem paths.
+"""
+
+import io
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+def _safe_join(root, key):
+    """Join a storage key under root, refusing keys that escape it"""
+    root = Path(root).resolve()
+    path = (root / key).resolve()
+    if root != path and root not in path.parents:
+        raise ValueError(f"Invalid storage key: {key}")
+    return path
+
+class MediaStorage:
+    """Interface shared by the storage backends"""
+
+    is_remote = False
+
+    def save(self, key, data, content_type=None):
+        """Store bytes or a binary file object under `key` and return the key"""
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Path of a local file with the object's contents, or None if it doesn't exist"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        return self.local_path(key) is not None
+
+    def open(self, key):
+        """Open an object for binary reading"""
+        path = self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        return open(path, "rb")
+
+    def prefetch(self, keys):
+        """Start fetching objects in the background (no-op for local storage)"""
+        return []
+
+    @staticmethod
+    def _legacy_path(key):
+        # Story rows written before storage keys held filesystem paths; only
+        # called for keys that passed _safe_join
+        return key if key and os.path.isfile(key) else None
+
+class LocalStorage(MediaStorage):
+    """Files under a local directory"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or Config.MEDIA_ROOT)
+
+    def save(self, key, data, content_type=None):
+        path = _safe_join(self.root, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A temp file of its own, so concurrent writers of one key don't share it
+        f = tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+        try:
+            with f:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f)
+            os.replace(f.name, path)
+        finally:
+            if os.path.exists(f.name):
+                os.remove(f.name)
+        return key
+
+    def local_path(self, key):
+        if not key:
+            return None
+        try:
+            path = _safe_join(self.root, key)
+        except ValueError:
+            return None  # Keys that escape the root get no legacy fallback either
+        return str(path) if path.is_file() else self._legacy_path(key)
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if path is not None:
+            os.remove(path)
+
+class S3Storage(MediaStorage):
+    """Objects in an S3-compatible bucket with a local read-through cache"""
+
+    is_remote = True
+
+    def __init__(self, bucket=None, prefix=None, endpoint_url=None, cache_dir=None):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise RuntimeError("MEDIA_STORAGE=s3 needs boto3: pip install boto3")
+
+        self.bucket = bucket or Config.S3_BUCKET
+        if not self.bucket:
+            raise RuntimeError("MEDIA_STORAGE=s3 needs S3_BUCKET")
+        self.prefix = Config.S3_PREFIX if prefix is None else prefix
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or Config.S3_ENDPOINT_URL,
+            region_name=Config.S3_REGION,
+        )
+        chunk_size = Config.S3_MULTIPART_CHUNK_MB * 1024 * 1024
+        self.transfer_config = TransferConfig(multipart_threshold=chunk_size, multipart_chunksize=chunk_size)
+        self.cache_dir = Path(cache_dir or Config.MEDIA_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._executor = ThreadPoolExecutor(max_workers=Config.MEDIA_PREFETCH_WORKERS, thread_name_prefix="media-prefetch")
+        self._inflight = {}  # key -> Future of the download
+        self._lock = threading.RLock()  # Done callbacks can run inside _fetch
+        self._cache_bytes = None  # Bytes in the cache directory, counted on first use
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def save(self, key, data, content_type=None):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = io.BytesIO(data)
+        # Write the local copy first, this node will most likely read it next,
+        # then stream it up; parts above the threshold are uploaded concurrently
+        path = self._store_in_cache(key, data)
+        extra_args = {"ContentType": content_type} if content_type else None
+        with open(path, "rb") as f:
+            self.client.upload_fileobj(
+                f, self.bucket, self._object_key(key), ExtraArgs=extra_args, Config=self.transfer_config
+            )
+        return key
+
+    def _cache_path(self, key):
+        return _safe_join(self.cache_dir, key)
+
+    def _write_to_cache(self, key, write):
+        """Write a cache file through a temp file, which is removed if `write` fails"""
+        path = self._cache_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+        try:
+            with f:
+                write(f)
+            size = os.path.getsize(f.name)
+            os.replace(f.name, path)
+        finally:
+            if os.path.exists(f.name):
+                os.remove(f.name)
+        self._cache_added(size)
+        return path
+
+    def _store_in_cache(self, key, fileobj):
+        return self._write_to_cache(key, lambda f: shutil.copyfileobj(fileobj, f))
+
+    def _download(self, key):
+        """Fetch an object into the cache; returns the cached path or None if it doesn't exist"""
+        from botocore.exceptions import ClientError
+
+        try:
+            path = self._write_to_cache(
+                key,
+                lambda f: self.client.download_fileobj(self.bucket, self._object_key(key), f, Config=self.transfer_config)
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        return str(path)
+
+    def _fetch(self, key):
+        """Start (or join) the download of one key"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._download, key)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _, key=key: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def local_path(self, key):
+        if not key:
+            return None
+        try:
+            path = self._cache_path(key)
+        except ValueError:
+            return None  # Keys that escape the cache get no legacy fallback either
+        legacy = self._legacy_path(key)
+        if legacy:
+            return legacy
+        if path.is_file():
+            return str(path)
+        try:
+            return self._fetch(key).result()
+        except Exception as e:
+            logger.warning("Could not fetch %s from storage: %s", key, e)
+            return None
+
+    def prefetch(self, keys):
+        futures = []
+        for key in keys:
+            if not key:
+                continue
+            try:
+                if self._cache_path(key).is_file() or self._legacy_path(key):
+                    continue
+            except ValueError:
+                continue
+            futures.append(self._fetch(key))
+        return futures
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        try:
+            path = self._cache_path(key)
+            size = path.stat().st_size
+            path.unlink()
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            if self._cache_bytes is not None:
+                self._cache_bytes -= size
+
+    def _cache_added(self, size):
+        """Count a new cache file and trim the cache once it is over MEDIA_CACHE_MAX_MB"""
+        limit = Config.MEDIA_CACHE_MAX_MB * 1024 * 1024
+        with self._lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = self._cache_size()
+            else:
+                self._cache_bytes += size
+            if self._cache_bytes <= limit:
+                return
+            # Trim down to 90% of the limit, so the next downloads don't walk the cache again
+            self._cache_bytes = self._trim_cache(int(limit * 0.9))
+
+    def _cached_files(self):
+        for path in self.cache_dir.rglob("*"):
+            try:
+                if path.is_file():
+                    stat = path.stat()
+                    yield stat.st_mtime, stat.st_size, path
+            except OSError:
+                continue
+
+    def _cache_size(self):
+        return sum(size for _, size, _ in self._cached_files())
+
+    def _trim_cache(self, target):
+        """Delete the oldest cached files until at most `target` bytes are left; returns the bytes left"""
+        files = list(self._cached_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        return total
+
+# Process-wide storage, created on first use
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> MediaStorage:
+    """Get the configured media storage backend"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if Config.MEDIA_STORAGE == "s3":
+                    _storage = S3Storage()
+                else:
+                    _storage = LocalStorage()
+    return _storage
@@ -1,4 +1,5 @@
 import os
+import html
 import streamlit as st
 from pathlib import Path
 import json
@@ -85,18 +86,14 @@ def validate_audio_file(uploaded_file):
     return True, "Valid file"
 
 def save_uploaded_audio(uploaded_file, story_id):
-    """Save uploaded audio file and return file path"""
-    from src.config import Config
-    config = Config()
+    """Save uploaded audio file and return its storage key"""
+    from src.storage import get_storage
     
     file_extension = uploaded_file.name.split('.')[-1]
-    audio_filename = f"{story_id}.{file_extension}"
-    audio_path = config.AUDIO_DIR / audio_filename
-    
-    with open(audio_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    audio_key = f"audio/{story_id}.{file_extension}"
     
-    return str(audio_path)
+    uploaded_file.seek(0)
+    return get_storage().save(audio_key, uploaded_file, getattr(uploaded_file, "type", None))
 
 def get_sample_prompts(category):
     """Get sample prompts for a category"""
@@ -120,7 +117,14 @@ def create_story_card(story, show_full=False):
     }
     
     emoji = category_emoji.get(story.get('category', ''), "📚")
-    category_name = story.get('category', '').replace('_', ' ').title()
+    category_name = html.escape(story.get('category', '').replace('_', ' ').title())
+    
+    # User text is escaped before it is interpolated into the card markup
+    title = html.escape(story.get('title', 'Untitled Story'))
+    transcript = story.get('transcript', '')
+    preview = story.get('summary', transcript[:150] + '...' if len(transcript) > 150 else transcript)
+    preview = html.escape(preview or '').replace('\n', '<br>')
+    contributor_name = html.escape(story.get('contributor_name', 'Anonymous'))
     
     with st.container():
         st.markdown(f"""
@@ -133,16 +137,16 @@ def create_story_card(story, show_full=False):
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
         ">
             <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
-                <h4 style="margin: 0; color: #2c3e50;">{emoji} {story.get('title', 'Untitled Story')}</h4>
+                <h4 style="margin: 0; color: #2c3e50;">{emoji} {title}</h4>
                 <span style="background: #667eea; color: white; padding: 0.3rem 0.8rem; border-radius: 15px; font-size: 0.8rem;">
                     {category_name}
                 </span>
             </div>
             <p style="color: #555; margin: 0.5rem 0; line-height: 1.6;">
-                {story.get('summary', story.get('transcript', '')[:150] + '...' if len(story.get('transcript', '')) > 150 else story.get('transcript', ''))}
+                {preview}
             </p>
             <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 1rem; font-size: 0.9rem; color: #777;">
-                <span>👤 {story.get('contributor_name', 'Anonymous')}</span>
+                <span>👤 {contributor_name}</span>
                 <span>📅 {format_date(story.get('created_at', ''))}</span>
                 <span>⏱️ {format_duration(story.get('duration', 0))}</span>
             </div>
@@ -156,7 +160,7 @@ def create_story_card(story, show_full=False):
             
             if story.get('tags'):
                 st.markdown("**Tags:**")
-                tags_html = " ".join([f"<span style='background: #e3f2fd; padding: 0.2rem 0.6rem; border-radius: 10px; margin: 0.2rem; font-size: 0.8rem;'>{tag}</span>" for tag in story['tags']])
+                tags_html = " ".join([f"<span style='background: #e3f2fd; padding: 0.2rem 0.6rem; border-radius: 10px; margin: 0.2rem; font-size: 0.8rem;'>{html.escape(str(tag))}</span>" for tag in story['tags']])
                 st.markdown(tags_html, unsafe_allow_html=True)
 
 def create_user_profile_form(user_type):
@@ -331,10 +335,9 @@ def display_impact_metrics(user_data, user_type):
 
 def create_featured_story_carousel():
     """Create a carousel of featured stories"""
-    from src.data_manager import DataManager
+    from src.scoring import get_featured_stories
     
-    data_manager = DataManager()
-    featured_stories = data_manager.get_featured_stories(limit=3)
+    featured_stories = get_featured_stories(limit=3)
     
     if not featured_stories:
         st.info("No featured stories yet. Be the first to share your wisdom!")
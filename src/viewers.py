@@ -0,0 +1,153 @@
+"""
+Unique viewer counts for ElderWise application
+
+Counting distinct viewers from raw 'view' rows needs COUNT(DISTINCT user_id)
+over story_interactions, and compaction (src/interactions.py) eventually
+drops the user ids altogether. Instead, record_view() adds the viewer to
+HyperLogLog sketches in the same transaction as the view row: one per story
+(all time) and one per category and day. A story's unique viewers are then
+one 4 KB row read, and a category's over any period is a merge of one row
+per day.
+
+The story reader (pages/read_stories.py) records a view the first time a
+session opens a story's full text.
+"""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy import select, delete, func, false
+from sqlalchemy.exc import IntegrityError
+from src.database import get_db_session, Story, StoryInteraction, StoryViewSketch, CategoryViewSketch
+from src.hyperloglog import HyperLogLog
+from src.analytics import UNCATEGORIZED, _as_date
+
+class CategoryViewersRow(NamedTuple):
+    """Estimated distinct viewers of one category over a period"""
+    category: str
+    unique_viewers: int
+
+def _lock_sketches(session):
+    """On SQLite, take the write lock before reading any sketch.
+
+    SQLite reads outside a write transaction, so two views of the same story
+    could both read a sketch and the second write would drop the first
+    viewer. An empty write makes the next view wait instead. PostgreSQL
+    locks each row as _add_to_sketch() reads it.
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        session.execute(delete(StoryViewSketch).where(false()))
+
+def _add_to_sketch(session, model, key, user_id, **columns):
+    """Add a viewer to one sketch row, creating it if needed"""
+    query = select(model).filter_by(**key)
+    if session.get_bind().dialect.name == 'postgresql':
+        query = query.with_for_update()  # Concurrent views of the same story must not lose registers
+    row = session.execute(query).scalar_one_or_none()
+    if row is None:
+        sketch = HyperLogLog()
+        sketch.add(user_id)
+        session.add(model(**key, registers=sketch.to_bytes(), **columns))
+        return
+    sketch = HyperLogLog(row.registers)
+    if sketch.add(user_id):  # Repeat viewers usually leave every register as it was
+        row.registers = sketch.to_bytes()
+
+def record_view(story_id, user_id, viewed_at=None, viewer=None):
+    """Store a view and count the viewer in the story and category sketches.
+
+    `viewer` is what the sketches count, user_id by default; readers who are
+    not signed in pass a key of their own (their browser session) so they
+    aren't all counted as the default user.
+    """
+    viewed_at = viewed_at or datetime.utcnow()
+    viewer = user_id if viewer is None else viewer
+    for attempt in range(2):
+        try:
+            with get_db_session() as session:
+                _lock_sketches(session)
+                category = session.execute(select(Story.category).where(Story.id == story_id)).scalar()
+                session.add(StoryInteraction(
+                    story_id=story_id, user_id=user_id, interaction_type='view', created_at=viewed_at
+                ))
+                _add_to_sketch(session, StoryViewSketch, {'story_id': story_id}, viewer)
+                _add_to_sketch(
+                    session, CategoryViewSketch,
+                    {'category': category or UNCATEGORIZED, 'day': viewed_at.date()}, viewer,
+                )
+                session.commit()
+                return
+        except IntegrityError:
+            # Another process created the sketch row first; the retry updates it
+            if attempt:
+                raise
+
+def get_unique_viewers(story_ids):
+    """Get {story_id: estimated distinct viewers} from the story sketches"""
+    story_ids = list(story_ids)
+    if not story_ids:
+        return {}
+    query = select(StoryViewSketch.story_id, StoryViewSketch.registers).where(StoryViewSketch.story_id.in_(story_ids))
+    with get_db_session() as session:
+        counts = {story_id: HyperLogLog(registers).count() for story_id, registers in session.execute(query)}
+    return {story_id: counts.get(story_id, 0) for story_id in story_ids}
+
+def _period_start(days, today):
+    today = today or datetime.utcnow().date()
+    return today - timedelta(days=days - 1)
+
+def get_category_unique_viewers(days=30, today=None):
+    """Distinct viewers per category over the last `days` days, most first"""
+    query = (
+        select(CategoryViewSketch.category, CategoryViewSketch.registers)
+        .where(CategoryViewSketch.day >= _period_start(days, today))
+    )
+    sketches = {}
+    with get_db_session() as session:
+        for category, registers in session.execute(query):
+            sketches.setdefault(category, HyperLogLog()).merge(HyperLogLog(registers))
+    rows = [CategoryViewersRow(category, sketch.count()) for category, sketch in sketches.items()]
+    return sorted(rows, key=lambda row: (-row.unique_viewers, row.category))
+
+def get_total_unique_viewers(days=30, today=None, category=None):
+    """Distinct viewers across all (or one) categories over the last `days` days"""
+    query = select(CategoryViewSketch.registers).where(CategoryViewSketch.day >= _period_start(days, today))
+    if category:
+        query = query.where(CategoryViewSketch.category == category)
+    with get_db_session() as session:
+        return HyperLogLog.merged(session.execute(query).scalars()).count()
+
+def rebuild_view_sketches(batch_size=500):
+    """Recreate every sketch from the raw 'view' rows (after changing HLL_PRECISION, or to backfill).
+
+    Views already compacted into story_daily_stats have no user ids and are not counted,
+    and readers who were not signed in are counted as one viewer.
+    """
+    story_sketches, category_sketches = {}, {}
+    view_day = func.date(StoryInteraction.created_at)
+    with get_db_session() as session:
+        story_ids = session.execute(select(Story.id).order_by(Story.id)).scalars().all()
+        for start in range(0, len(story_ids), batch_size):
+            chunk = story_ids[start:start + batch_size]
+            rows = session.execute(
+                select(StoryInteraction.story_id, StoryInteraction.user_id, Story.category, view_day)
+                .join(Story, Story.id == StoryInteraction.story_id)
+                .where(StoryInteraction.interaction_type == 'view', StoryInteraction.story_id.in_(chunk))
+            )
+            for story_id, user_id, category, day in rows:
+                story_sketches.setdefault(story_id, HyperLogLog()).add(user_id)
+                key = (category or UNCATEGORIZED, _as_date(day))
+                category_sketches.setdefault(key, HyperLogLog()).add(user_id)
+
+        session.execute(delete(StoryViewSketch))
+        session.execute(delete(CategoryViewSketch))
+        session.add_all(
+            StoryViewSketch(story_id=story_id, registers=sketch.to_bytes())
+            for story_id, sketch in story_sketches.items()
+        )
+        session.add_all(
+            CategoryViewSketch(category=category, day=day, registers=sketch.to_bytes())
+            for (category, day), sketch in category_sketches.items()
+        )
+        session.commit()
+
+    return {'stories': len(story_sketches), 'category_days': len(category_sketches)}
@@ -0,0 +1,33 @@
+"""
+Shared pytest setup for ElderWise tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import Config
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh SQLite database (and media root) for this test, set up by init_database()"""
+    import src.database
+    import src.storage
+    from src.database import init_database, get_db_manager
+    from src.change_feed import stop_change_listener
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'elderwise.db'}")
+    monkeypatch.setattr(Config, "MEDIA_ROOT", tmp_path / "media")
+    monkeypatch.setattr(Config, "MEDIA_STORAGE", "local")
+    monkeypatch.setattr(Config, "FEED_THUMBNAIL_DIR", tmp_path / "thumbs")
+    monkeypatch.setattr(src.database, "_db_manager", None)
+    monkeypatch.setattr(src.storage, "_storage", None)
+    init_database()
+    yield get_db_manager()
+    # A listener left running would keep polling, and reopen the default database once DATABASE_URL is restored
+    stop_change_listener()
+    get_db_manager().engine.dispose()
@@ -0,0 +1,43 @@
+"""
+The analytics tab stays closed until an admin user signs in
+"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+from src.config import Config
+
+APP_PATH = str(Config.BASE_DIR / "app.py")
+PASSWORD = "correct horse battery"
+
+@pytest.fixture
+def app(database, monkeypatch):
+    import src.health
+    from src.auth import set_password
+
+    monkeypatch.setattr(Config, "CHANGE_FEED_ENABLED", False)
+    monkeypatch.setitem(src.health._warm_up_state, "done", True)
+    set_password("admin_user", PASSWORD)
+    set_password("elder_user", PASSWORD)
+    return AppTest.from_file(APP_PATH, default_timeout=60).run()
+
+def sign_in(app, username):
+    app.text_input(key="analytics_username").input(username)
+    app.text_input(key="analytics_password").input(PASSWORD)
+    app.button(key="FormSubmitter:analytics_sign_in-🔐 Sign In").click().run()
+    assert not app.exception, app.exception[0].message
+
+def signed_in(app):
+    return any(button.key == "analytics_sign_out" for button in app.button)
+
+def test_only_admins_see_the_dashboard(app):
+    assert not signed_in(app)
+
+    sign_in(app, "elder_user")
+    assert not signed_in(app)
+    assert any("admin account" in error.value for error in app.error)
+
+    sign_in(app, "admin_user")
+    assert signed_in(app)
@@ -0,0 +1,40 @@
+"""
+The SQLite change feed sees other processes' connection changes and stops with its database
+"""
+
+import time
+
+from src.config import Config
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_listener_polls_connections_and_stops(database, monkeypatch):
+    from sqlalchemy import create_engine, insert, update
+    from src.database import Connection
+    from src.change_feed import start_change_listener, stop_change_listener, table_version
+
+    monkeypatch.setattr(Config, "CHANGE_FEED_ENABLED", True)
+    monkeypatch.setattr(Config, "CHANGE_FEED_POLL_SECONDS", 0.05)
+    listener = start_change_listener()
+    # A second engine has no commit hooks, like another app process
+    other = create_engine(database.engine.url)
+    try:
+        wait_for(lambda: listener.is_alive())
+        time.sleep(0.2)  # Let the first poll record its watermarks
+        version = table_version('connections')
+        with other.begin() as connection:
+            connection.execute(insert(Connection).values(elder_id=1, seeker_id=3, status='pending'))
+        wait_for(lambda: table_version('connections') > version)
+
+        version = table_version('connections')
+        with other.begin() as connection:
+            connection.execute(update(Connection).values(read_at=Connection.requested_at))
+        wait_for(lambda: table_version('connections') > version)
+    finally:
+        other.dispose()
+        stop_change_listener()
+    assert not listener.is_alive()
@@ -0,0 +1,78 @@
+"""
+Duplicate submissions are refused under a lock and merging keeps every count
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.config import Config
+
+TRANSCRIPT = "We walked to the river every Sunday and my father taught me to fish. " * 10
+
+def add_story(session, title, category, transcript, created_at, **counts):
+    from src.database import Story
+    from src.dedupe import minhash, index_story
+
+    story = Story(
+        title=title, transcript=transcript, category=category, thumbnail_image_path=None,
+        author_id=1, created_at=created_at, **counts
+    )
+    session.add(story)
+    session.flush()
+    index_story(session, story.id, transcript, minhash(transcript))
+    return story.id
+
+def test_claim_signature_refuses_a_stored_story(database):
+    from src.database import get_db_session
+    from src.dedupe import minhash, claim_signature, DuplicateStory
+
+    with get_db_session() as session:
+        add_story(session, "Fishing", "life_lessons", TRANSCRIPT, datetime.utcnow())
+        session.commit()
+
+    with get_db_session() as session:
+        with pytest.raises(DuplicateStory, match="Fishing"):
+            claim_signature(session, minhash(TRANSCRIPT))
+        assert claim_signature(session, minhash("A different story about a garden and roses " * 10)) == []
+        assert claim_signature(session, None) == []
+
+def test_merge_duplicates_keeps_counters_and_category_stats(database, monkeypatch):
+    from sqlalchemy import select
+    from src.database import get_db_session, Story, StoryInteraction, StoryDailyStats
+    from src.analytics import add_category_stats, update_category_stats, get_category_totals
+    from src.dedupe import merge_duplicates
+
+    monkeypatch.setattr(Config, "WATERMARK_COMMIT_LAG_SECONDS", 0)
+    earlier = datetime.utcnow() - timedelta(hours=1)
+    with get_db_session() as session:
+        keep = add_story(session, "Fishing", "life_lessons", TRANSCRIPT, earlier,
+                         views_count=3, likes_count=1, shares_count=0, comments_count=0)
+        duplicate = add_story(session, "Fishing again", "family_stories", TRANSCRIPT, earlier,
+                              views_count=5, likes_count=2, shares_count=1, comments_count=0)
+        for user_id, kind in [(1, 'view'), (2, 'view'), (2, 'like'), (3, 'share')]:
+            session.add(StoryInteraction(story_id=duplicate, user_id=user_id, interaction_type=kind, created_at=earlier))
+        # Views compacted after they were folded into category_daily_stats
+        compacted_day = (earlier - timedelta(days=40)).date()
+        session.add(StoryDailyStats(story_id=duplicate, day=compacted_day, views=3))
+        add_category_stats(session, {("family_stories", compacted_day): {"views": 3}})
+        session.commit()
+    update_category_stats()
+    before = {row.category: row for row in get_category_totals(days=60)}
+    assert before["family_stories"].views == 5 and before["family_stories"].stories_created == 1
+
+    assert merge_duplicates([[keep, duplicate]]) == 1
+    update_category_stats()
+
+    with get_db_session() as session:
+        kept = session.get(Story, keep)
+        assert (kept.views_count, kept.likes_count, kept.shares_count) == (8, 3, 1)
+        assert session.execute(select(Story.id)).scalars().all() == [keep]
+        assert session.execute(select(StoryDailyStats.story_id, StoryDailyStats.views)).all() == [(keep, 3)]
+    after = {row.category: row for row in get_category_totals(days=60)}
+    family = after["family_stories"]
+    assert (family.stories_created, family.views, family.likes, family.shares) == (0, 0, 0, 0)
+    life = after["life_lessons"]
+    assert (life.stories_created, life.views, life.likes, life.shares) == (1, 5, 1, 1)
@@ -0,0 +1,110 @@
+"""
+The story feed stays within FEED_QUERY_BUDGET statements per page, whatever the page size
+"""
+
+import io
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+from src.config import Config
+
+APP_PATH = str(Config.BASE_DIR / "app.py")
+STORY_COUNT = 45  # More than one page at every page size below
+CATEGORIES = ["life_lessons", "family_stories", "career_journey"]
+
+def seed(manager):
+    """Stories from several authors and categories, with covers, comments and likes"""
+    from PIL import Image
+    from src.database import get_db_session, Story, StoryInteraction, User
+    from src.storage import get_storage
+
+    cover = io.BytesIO()
+    Image.new("RGB", (640, 480), (102, 126, 234)).save(cover, "JPEG")
+    rng = random.Random(7)
+    with get_db_session() as session:
+        authors = [
+            User(username=f"author{i}", email=f"author{i}@example.com", full_name=f"Author {i}", user_type="elder")
+            for i in range(5)
+        ]
+        session.add_all(authors)
+        session.flush()
+        for i in range(STORY_COUNT):
+            key = f"images/cover-{i}.jpg"
+            get_storage().save(key, cover.getvalue(), "image/jpeg")
+            story = Story(
+                title=f"Story {i}", transcript=f"Story {i} " + "once upon a time " * 50,
+                category=CATEGORIES[i % len(CATEGORIES)], author_id=authors[i % len(authors)].id,
+                thumbnail_image_path=key, comments_count=i % 4,
+                created_at=datetime.utcnow() - timedelta(hours=i),
+            )
+            session.add(story)
+            session.flush()
+            for j in range(story.comments_count):
+                session.add(StoryInteraction(
+                    story_id=story.id, user_id=rng.choice(authors).id,
+                    interaction_type="comment", comment_text=f"Comment {j}",
+                ))
+            session.add(StoryInteraction(story_id=story.id, user_id=authors[0].id, interaction_type="like"))
+        session.commit()
+
+@pytest.fixture
+def strict_app(database, monkeypatch):
+    """The app with strict query budgets and no read caches, so every rerun pays full price"""
+    import src.health
+
+    monkeypatch.setattr(Config, "QUERY_BUDGET_STRICT", True)
+    monkeypatch.setattr(Config, "CHANGE_FEED_ENABLED", False)  # Feed reads are only cached while it runs
+    monkeypatch.setattr(Config, "FEED_PREFETCH_ENABLED", False)
+    monkeypatch.setitem(src.health._warm_up_state, "done", True)
+    seed(database)
+    return AppTest.from_file(APP_PATH, default_timeout=60)
+
+def assert_ok(app):
+    assert not app.exception, app.exception[0].message
+    assert not [error.value for error in app.error]
+
+def feed_html(app):
+    return next(block.value for block in app.markdown if 'class="story-grid"' in block.value)
+
+@pytest.mark.parametrize("page_size", [2, 10, 40])
+def test_feed_pages_stay_within_budget(strict_app, monkeypatch, page_size):
+    monkeypatch.setattr(Config, "FEED_PAGE_SIZE", page_size)
+    app = strict_app.run()
+    assert_ok(app)
+    assert feed_html(app).count('class="story-card"') == page_size
+
+    app.button(key="feed_next").click().run()
+    assert_ok(app)
+    assert feed_html(app).count('class="story-card"') == min(page_size, STORY_COUNT - page_size)
+
+    app.selectbox(key="category_filter").select(CATEGORIES[1]).run()
+    assert_ok(app)
+
+    app.toggle(key="show_full_story").set_value(True).run()
+    assert_ok(app)
+
+def test_budget_overrun_fails(strict_app, monkeypatch):
+    monkeypatch.setattr(Config, "FEED_PAGE_SIZE", 10)
+    app = strict_app.run()
+    assert_ok(app)
+
+    # One extra query per story, as a lazy relationship in the card loop would cost
+    import src.rendering
+    from src.database import get_db_session, Story
+
+    render_card = src.rendering.render_story_card_html
+
+    def render_card_with_lookup(story):
+        with get_db_session() as session:
+            session.get(Story, story.id)
+        return render_card(story)
+
+    monkeypatch.setattr(src.rendering, "render_story_card_html", render_card_with_lookup)
+    app.button(key="feed_next").click().run()
+    assert app.exception
+    assert "budget is" in app.exception[0].message, app.exception[0].message
@@ -0,0 +1,52 @@
+"""
+Analytics reads give the same view counts before and after raw views are compacted
+"""
+
+from datetime import datetime, timedelta
+
+from src.config import Config
+
+def test_view_counts_survive_compaction(database, monkeypatch):
+    from sqlalchemy import select, func
+    from src.database import get_db_session, Story, StoryInteraction
+    from src.analytics import update_category_stats
+    from src.interactions import compact_views, get_story_view_counts, get_daily_views, get_most_viewed_stories
+
+    monkeypatch.setattr(Config, "WATERMARK_COMMIT_LAG_SECONDS", 0)
+    now = datetime.utcnow()
+    with get_db_session() as session:
+        stories = [Story(title=f"Story {i}", transcript="Once upon a time", category="life_lessons", author_id=1,
+                         created_at=now - timedelta(days=60)) for i in range(2)]
+        session.add_all(stories)
+        session.flush()
+        # Old views on three days (compacted below), and recent ones that stay raw
+        for days_ago, story, count in [(45, 0, 3), (44, 0, 1), (44, 1, 2), (40, 1, 4), (2, 0, 5), (1, 1, 1)]:
+            for user_id in range(count):
+                session.add(StoryInteraction(
+                    story_id=stories[story].id, user_id=user_id + 1, interaction_type='view',
+                    created_at=now - timedelta(days=days_ago),
+                ))
+        session.commit()
+        story_ids = [story.id for story in stories]
+
+    def snapshot():
+        return (
+            get_story_view_counts(story_ids),
+            get_story_view_counts(story_ids, since=(now - timedelta(days=44)).date()),
+            [get_daily_views(story_id, days=60) for story_id in story_ids],
+            get_most_viewed_stories(days=90),
+        )
+
+    before = snapshot()
+    assert before[0] == {story_ids[0]: 9, story_ids[1]: 7}
+    assert [row.views for row in before[3]] == [9, 7]
+
+    update_category_stats()  # Views are only compacted once the category job has counted them
+    assert compact_views(now)['views_compacted'] == 10
+
+    with get_db_session() as session:
+        raw = session.execute(
+            select(func.count()).where(StoryInteraction.interaction_type == 'view')
+        ).scalar_one()
+    assert raw == 6
+    assert snapshot() == before
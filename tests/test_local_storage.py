@@ -0,0 +1,56 @@
+"""
+Local media storage: atomic writes and keys that may not leave MEDIA_ROOT
+"""
+
+import io
+import threading
+
+import pytest
+
+from src.storage import LocalStorage
+
+def stored_files(root):
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob("*") if path.is_file())
+
+def test_concurrent_saves_of_one_key(tmp_path):
+    storage = LocalStorage(tmp_path)
+    payloads = [bytes([i]) * 100_000 for i in range(8)]
+    threads = [threading.Thread(target=storage.save, args=("images/a.jpg", data)) for data in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stored_files(tmp_path) == ["images/a.jpg"]
+    assert (tmp_path / "images/a.jpg").read_bytes() in payloads
+
+def test_failed_save_leaves_nothing_behind(tmp_path):
+    class Broken(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            raise OSError("connection reset")
+
+    storage = LocalStorage(tmp_path)
+    with pytest.raises(OSError):
+        storage.save("images/a.jpg", Broken())
+    assert stored_files(tmp_path) == []
+
+def test_keys_outside_the_root_are_refused(tmp_path, monkeypatch):
+    root = tmp_path / "media"
+    secret = tmp_path / "secret.txt"
+    secret.write_text("not media")
+    storage = LocalStorage(root)
+
+    assert storage.local_path(str(secret)) is None
+    assert storage.local_path("../secret.txt") is None
+    with pytest.raises(ValueError):
+        storage.save("../secret.txt", b"overwritten")
+    assert secret.read_text() == "not media"
+
+    # Paths stored before keys existed still resolve, relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data/images").mkdir(parents=True)
+    (tmp_path / "data/images/old.jpg").write_bytes(b"cover")
+    assert storage.local_path("data/images/old.jpg") == "data/images/old.jpg"
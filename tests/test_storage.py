@@ -0,0 +1,103 @@
+"""
+S3 media storage against a mocked bucket (moto)
+"""
+
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from src.config import Config
+from src.storage import S3Storage
+
+BUCKET = "elderwise-test"
+
+@pytest.fixture
+def bucket(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(Config, "S3_REGION", "us-east-1")
+    monkeypatch.setattr(Config, "S3_ENDPOINT_URL", None)
+    with moto.mock_aws():
+        import boto3
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield
+
+def make_storage(tmp_path, name="cache"):
+    """A storage node with its own empty cache"""
+    return S3Storage(bucket=BUCKET, prefix="media/", cache_dir=tmp_path / name)
+
+def cached_files(storage):
+    return [path for path in storage.cache_dir.rglob("*") if path.is_file()]
+
+def test_save_then_read_on_another_node(bucket, tmp_path):
+    make_storage(tmp_path, "writer").save("images/a.jpg", b"cover bytes", "image/jpeg")
+
+    reader = make_storage(tmp_path, "reader")
+    path = reader.local_path("images/a.jpg")
+
+    assert path is not None
+    with open(path, "rb") as f:
+        assert f.read() == b"cover bytes"
+    assert reader.exists("images/a.jpg")
+
+def test_prefetch_downloads_into_the_cache(bucket, tmp_path):
+    writer = make_storage(tmp_path, "writer")
+    keys = [f"images/{i}.jpg" for i in range(5)]
+    for key in keys:
+        writer.save(key, key.encode())
+
+    reader = make_storage(tmp_path, "reader")
+    futures = reader.prefetch(keys + [None])
+    assert len(futures) == len(keys)
+    for future in futures:
+        future.result()
+
+    assert all((reader.cache_dir / key).is_file() for key in keys)
+    assert reader.prefetch(keys) == []  # Already cached
+
+def test_missing_object_is_none(bucket, tmp_path):
+    storage = make_storage(tmp_path)
+
+    assert storage.local_path("images/missing.jpg") is None
+    assert not storage.exists("images/missing.jpg")
+    assert cached_files(storage) == []
+
+def test_failed_download_leaves_no_temp_file(bucket, tmp_path, monkeypatch):
+    from botocore.exceptions import EndpointConnectionError
+
+    storage = make_storage(tmp_path)
+
+    def unreachable(*args, **kwargs):
+        raise EndpointConnectionError(endpoint_url="http://s3.invalid")
+
+    monkeypatch.setattr(storage.client, "download_fileobj", unreachable)
+
+    assert storage.local_path("images/a.jpg") is None
+    assert cached_files(storage) == []
+
+def test_cache_is_trimmed_to_its_limit(bucket, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MEDIA_CACHE_MAX_MB", 1)
+    writer = make_storage(tmp_path, "writer")
+    keys = [f"images/{i}.jpg" for i in range(8)]
+    for key in keys:
+        writer.save(key, bytes(256 * 1024))
+
+    reader = make_storage(tmp_path, "reader")
+    for key in keys:
+        assert reader.local_path(key) is not None
+
+    cached = sum(path.stat().st_size for path in cached_files(reader))
+    assert cached <= 1024 * 1024
+    assert reader._cache_bytes == cached
+    assert (reader.cache_dir / keys[-1]).is_file()  # The newest download is kept
+
+def test_delete_removes_object_and_cached_copy(bucket, tmp_path):
+    storage = make_storage(tmp_path)
+    storage.save("audio/a.wav", b"audio")
+    assert storage.local_path("audio/a.wav") is not None
+
+    storage.delete("audio/a.wav")
+
+    assert not storage.exists("audio/a.wav")
+    assert not (storage.cache_dir / "audio/a.wav").exists()
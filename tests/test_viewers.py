@@ -0,0 +1,82 @@
+"""
+Opening a story's full text records one view per session for the Unique Readers metric
+"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+from src.config import Config
+
+APP_PATH = str(Config.BASE_DIR / "app.py")
+
+@pytest.fixture
+def app_factory(database, monkeypatch):
+    import src.health
+    from src.database import get_db_session, Story
+
+    monkeypatch.setattr(Config, "CHANGE_FEED_ENABLED", False)
+    monkeypatch.setattr(Config, "FEED_PREFETCH_ENABLED", False)
+    monkeypatch.setitem(src.health._warm_up_state, "done", True)
+    with get_db_session() as session:
+        session.add(Story(title="Fishing", transcript="We walked to the river. " * 20, category="life_lessons", author_id=1))
+        session.commit()
+    return lambda: AppTest.from_file(APP_PATH, default_timeout=60)
+
+def read_full_story(app):
+    app.toggle(key="show_full_story").set_value(True).run()
+    assert not app.exception, app.exception[0].message
+
+def test_reading_a_story_counts_each_session_once(app_factory):
+    from sqlalchemy import select, func
+    from src.database import get_db_session, StoryInteraction
+    from src.viewers import get_total_unique_viewers
+
+    first = app_factory().run()
+    read_full_story(first)
+    first.toggle(key="show_full_story").set_value(False).run()
+    read_full_story(first)
+    read_full_story(app_factory().run())
+
+    with get_db_session() as session:
+        views = session.execute(
+            select(func.count()).where(StoryInteraction.interaction_type == 'view')
+        ).scalar_one()
+    assert views == 2
+    assert get_total_unique_viewers() == 2
+
+def test_concurrent_views_keep_every_viewer(database):
+    import threading
+    from sqlalchemy import select
+    from src.database import get_db_session, Story, StoryViewSketch
+    from src.hyperloglog import HyperLogLog
+    from src.viewers import record_view, get_unique_viewers
+
+    with get_db_session() as session:
+        story = Story(title="Fishing", transcript="We walked to the river.", category="life_lessons", author_id=1)
+        session.add(story)
+        session.commit()
+        story_id = story.id
+
+    viewers = [f"session:{i}" for i in range(80)]
+    barrier = threading.Barrier(8)
+
+    def read(batch):
+        barrier.wait()
+        for viewer in batch:
+            record_view(story_id, 1, viewer=viewer)
+
+    threads = [threading.Thread(target=read, args=(viewers[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = HyperLogLog()
+    for viewer in viewers:
+        expected.add(viewer)
+    with get_db_session() as session:
+        registers = session.execute(select(StoryViewSketch.registers)).scalar_one()
+    assert registers == expected.to_bytes()
+    assert get_unique_viewers([story_id]) == {story_id: expected.count()}
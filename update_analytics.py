@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Category analytics job for ElderWise
+
+Run once (e.g. from cron) or keep running with --every SECONDS.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.config import Config
+from src.database import init_database
+from src.analytics import update_category_stats
+from src.viewers import rebuild_view_sketches
+
+def run_once():
+    """Run a single analytics pass and print a short summary"""
+    started = time.perf_counter()
+    result = update_category_stats()
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Updated {result['rows_updated']} category days in {elapsed:.2f}s "
+        f"(watermarks: story {result['last_story_id']}, interaction {result['last_interaction_id']})"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Update category analytics")
+    parser.add_argument(
+        "--every", type=int, nargs="?", const=Config.ANALYTICS_JOB_INTERVAL_SECONDS, default=None,
+        help="Keep running and update every N seconds (default interval from ANALYTICS_JOB_INTERVAL_SECONDS)"
+    )
+    parser.add_argument(
+        "--rebuild-viewers", action="store_true",
+        help="Recreate the unique viewer sketches from the raw view rows, then exit"
+    )
+    args = parser.parse_args()
+
+    init_database()
+
+    if args.rebuild_viewers:
+        result = rebuild_view_sketches()
+        print(f"✅ Rebuilt viewer sketches for {result['stories']} stories and {result['category_days']} category days")
+        return
+
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"❌ Analytics update failed: {e}")
+            if args.every is None:
+                sys.exit(1)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()